@@ -0,0 +1,122 @@
+"""Sunrise, noon and sunset for a place, worked out ahead as epoch times.
+
+Building the table needs astral, but that's done once (and saved);
+lookups after that are a bisect on plain integer arrays.
+"""
+import json
+import logging
+import os
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+LOG = logging.getLogger('solar-lights')
+
+FIELDS = ('midnight', 'sunrise', 'noon', 'sunset')
+
+
+class Almanac:
+    """One row per local day: midnight, sunrise, noon and sunset."""
+
+    def __init__(self, key, rows):
+        """Set up from a place key and the per-day epoch times."""
+        self.key = key
+        for ix, field in enumerate(FIELDS):
+            setattr(self, field, array('q', [row[ix] for row in rows]))
+
+    @classmethod
+    def build(cls, location, start, days=400):
+        """Work out the table for a LocationInfo from a start date."""
+        from astral.sun import sun
+
+        tzinfo = location.tzinfo
+        rows = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            midnight = tzinfo.localize(
+                datetime.combine(day, datetime.min.time())
+            )
+            try:
+                params = sun(location.observer, date=day, tzinfo=tzinfo)
+            except ValueError:
+                # Sun never rises (or sets); call it a day with no daylight.
+                noon = int(midnight.timestamp()) + 12 * 60 * 60
+                rows.append((int(midnight.timestamp()), noon, noon, noon))
+                continue
+            rows.append((
+                int(midnight.timestamp()),
+                int(params['sunrise'].timestamp()),
+                int(params['noon'].timestamp()),
+                int(params['sunset'].timestamp()),
+            ))
+        key = get_key(
+            location.latitude, location.longitude, location.timezone
+        )
+        return cls(key, rows)
+
+    @classmethod
+    def load(cls, path):
+        """Return a saved almanac, or None if there isn't a usable one."""
+        try:
+            with open(path, 'r') as fp:
+                saved = json.load(fp)
+            return cls(tuple(saved['key']), list(zip(
+                *[saved[field] for field in FIELDS]
+            )))
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path):
+        """Save the table as JSON, replacing any old file in one go."""
+        saved = {field: list(getattr(self, field)) for field in FIELDS}
+        saved['key'] = list(self.key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as fp:
+                json.dump(saved, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(tmp_path, path)
+        except OSError:
+            LOG.exception("Failed to save almanac.")
+
+    def covers(self, epoch, days=0):
+        """Return True if the table runs from epoch for `days` more days."""
+        return (
+            len(self.midnight) > 0 and
+            self.midnight[0] <= epoch and
+            epoch + days * 24 * 60 * 60 < self.midnight[-1]
+        )
+
+    def get_index(self, epoch):
+        """Return the row for the local day containing epoch."""
+        ix = bisect_right(self.midnight, epoch) - 1
+        if ix < 0 or ix >= len(self.midnight):
+            raise IndexError(f"Almanac doesn't cover {epoch}.")
+        return ix
+
+    def get_sun(self, epoch):
+        """Return (sunrise, noon, sunset) for the day containing epoch."""
+        ix = self.get_index(epoch)
+        return self.sunrise[ix], self.noon[ix], self.sunset[ix]
+
+    def is_daylight(self, epoch):
+        """Return True if the sun is up at epoch."""
+        ix = self.get_index(epoch)
+        return self.sunrise[ix] < epoch < self.sunset[ix]
+
+    def get_daylight_seconds(self, epoch):
+        """Return seconds of daylight on the day containing epoch."""
+        ix = self.get_index(epoch)
+        return self.sunset[ix] - self.sunrise[ix]
+
+    def get_next(self, field, epoch):
+        """Return the first sunrise/noon/sunset (etc.) after epoch."""
+        times = getattr(self, field)
+        ix = bisect_right(times, epoch)
+        return times[ix] if ix < len(times) else None
+
+
+def get_key(latitude, longitude, timezone):
+    """Return what identifies a place's almanac."""
+    return (round(latitude, 4), round(longitude, 4), timezone)
@@ -0,0 +1,107 @@
+"""Animation timing from a monotonic clock, independent of loop speed."""
+import time
+
+# A frame due within this much of a frame from now is the one being drawn
+# (times off a clock only go so fine), so the one after it is next.
+DUE_MARGIN_FRAMES = 1e-3
+
+
+class Animator:
+    """Work out which animation step to show, and when to draw next.
+
+    The step follows the clock, so a slow frame (or a stalled loop)
+    doesn't slow the animation down: frames that can't be drawn in time
+    are dropped instead. Frames are due on a fixed grid of 1/fps, and
+    how late each one is drawn is kept as jitter stats.
+    """
+
+    def __init__(
+        self, steps, step_secs, fps, fade_secs=2, clock=time.monotonic
+    ):
+        """Set up a cycle of `steps` steps, each lasting step_secs."""
+        self.steps = steps
+        self.step_secs = step_secs
+        self.frame_secs = 1. / fps
+        self.fade_secs = fade_secs
+        self.clock = clock
+        self.started = clock()
+        self._due = None
+        self._last_frame = None
+        self._fade_started = None
+        self.stats = {
+            'fps': None,
+            'frames': 0,
+            'dropped': 0,
+            'jitter_ms': None,
+            'max_jitter_ms': 0,
+        }
+
+    def set_timing(self, step_secs, fps, now=None):
+        """Change the step length and frame rate, keeping our place.
+
+        The start is moved so the step (and how far through it we are)
+        carries on from where it was, rather than jumping.
+        """
+        now = self.clock() if now is None else now
+        steps = (now - self.started) / self.step_secs % self.steps
+        self.step_secs = step_secs
+        self.frame_secs = 1. / fps
+        self.started = now - steps * step_secs
+
+    def get_step(self, now=None):
+        """Return the animation step for now."""
+        now = self.clock() if now is None else now
+        return int((now - self.started) / self.step_secs) % self.steps
+
+    def get_delay(self, now=None):
+        """Return seconds until the next frame is due; never about 0."""
+        now = self.clock() if now is None else now
+        frames = int(
+            (now - self.started) / self.frame_secs + DUE_MARGIN_FRAMES
+        ) + 1
+        self._due = self.started + frames * self.frame_secs
+        return self._due - now
+
+    def record_frame(self, now=None):
+        """Note that the frame due last was drawn at now."""
+        now = self.clock() if now is None else now
+        stats = self.stats
+        stats['frames'] += 1
+        if self._last_frame is not None and now > self._last_frame:
+            fps = 1. / (now - self._last_frame)
+            if stats['fps'] is not None:
+                fps = stats['fps'] + 0.1 * (fps - stats['fps'])
+            stats['fps'] = round(fps, 2)
+        self._last_frame = now
+        if self._due is None:
+            return
+        late = max(now - self._due, 0)
+        stats['dropped'] += int(late / self.frame_secs)
+        jitter_ms = late * 1000
+        if stats['jitter_ms'] is not None:
+            jitter_ms = stats['jitter_ms'] + 0.1 * (
+                jitter_ms - stats['jitter_ms']
+            )
+        stats['jitter_ms'] = round(jitter_ms, 3)
+        stats['max_jitter_ms'] = round(
+            max(stats['max_jitter_ms'], late * 1000), 3
+        )
+        self._due = None
+
+    def start_fade(self, now=None):
+        """Start crossfading to new frames."""
+        self._fade_started = self.clock() if now is None else now
+
+    def get_fade(self, now=None):
+        """Return how far through a crossfade we are, or None if not.
+
+        A fade_secs of 0 turns crossfades off.
+        """
+        if self._fade_started is None or not self.fade_secs:
+            return None
+        now = self.clock() if now is None else now
+        pct = (now - self._fade_started) / self.fade_secs
+        if pct >= 1:
+            self._fade_started = None
+            return None
+        return max(pct, 0.)
@@ -0,0 +1,440 @@
+"""Measure what the pixel, scheduling and render hot paths cost per call.
+
+- frames: makes frames (and pushes them to a stand-in Blinkt) for a day
+  and a night display, either drawing every frame or using the
+  animation frame table, with the peak memory allocated within each
+  frame and how many blocks are left allocated afterwards
+- pixels: get_pixels() by day and night, spread_pixels and blend_pixel
+- schedule: get_refresh_interval and sun_params
+- renderers: each built in renderer's show(), against stand-ins for
+  blinkt, pygame and rpi_ws281x
+- configurator: the web UI's /lights, for a new reading and for 304s
+- strips: drawing LED strips of up to 1000 pixels, with the NumPy
+  layout against drawing each pixel in Python
+
+Results can be saved as a JSON baseline (e.g. on a Pi Zero), and later
+runs compared with it, exiting with 1 if anything is slower by more
+than the threshold:
+
+    python bench.py --frames 1000 --save baseline.json
+    python bench.py --compare baseline.json --threshold 0.2
+    python bench.py --only pixels renderers
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+from unittest.mock import patch
+
+from framebuffer import FrameBuffer
+from layout import DAY_SEGMENTS, get_segment_sizes
+from power import SolarLights
+from renderers import RENDERERS, BlinktRenderer, Frame, Output
+from shared import SharedSnapshotFile
+
+STRIP_LENGTHS = (8, 60, 150, 300, 1000)
+# Slower than the baseline by more than this fraction is a regression.
+THRESHOLD = 0.2
+# Timings are the best of this many runs, to keep out the noise.
+REPEATS = 3
+
+DATA = {
+    'production': 1.7, 'consumption': 0.9, 'grid': 0.8, 'direction': 'export'
+}
+SUMMARY = {'FeedIn': 3000, 'SelfConsumption': 2000, 'Consumption': 4000}
+
+
+def get_fake_blinkt():
+    """Return a blinkt module that draws nothing."""
+    blinkt = types.ModuleType('blinkt')
+    blinkt.NUM_PIXELS = 8
+    blinkt.clear = blinkt.show = lambda: None
+    blinkt.set_pixel = lambda ix, red, green, blue: None
+    blinkt.set_brightness = lambda brightness: None
+    return blinkt
+
+
+def get_fake_pygame():
+    """Return a pygame module that draws nothing."""
+    pygame = types.ModuleType('pygame')
+    pygame.QUIT = 256
+    pygame.init = pygame.quit = lambda: None
+    pygame.display = types.SimpleNamespace(
+        set_mode=lambda size, flags, depth: None, update=lambda: None
+    )
+    pygame.draw = types.SimpleNamespace(
+        rect=lambda surface, colour, rect: None
+    )
+    pygame.event = types.SimpleNamespace(get=lambda: [])
+    return pygame
+
+
+class FakePixelStrip:
+    """An rpi_ws281x PixelStrip that lights nothing."""
+
+    def __init__(self, num, pin):
+        """Set up num pixels."""
+        self._pixels = [0] * num
+
+    def begin(self):
+        """Start driving the strip."""
+
+    def numPixels(self):
+        """Return the number of pixels."""
+        return len(self._pixels)
+
+    def setBrightness(self, brightness):
+        """Set the brightness, 0-255."""
+
+    def setPixelColorRGB(self, ix, red, green, blue):
+        """Set a pixel's colour."""
+        self._pixels[ix] = red << 16 | green << 8 | blue
+
+    def show(self):
+        """Send the pixels to the strip."""
+
+
+def get_fake_modules():
+    """Return stand-ins for the renderers' hardware libraries by name."""
+    ws281x = types.ModuleType('rpi_ws281x')
+    ws281x.PixelStrip = FakePixelStrip
+    return {
+        'blinkt': get_fake_blinkt(),
+        'pygame': get_fake_pygame(),
+        'rpi_ws281x': ws281x,
+    }
+
+
+def fix_display(daylight):
+    """Return a patch for day or night, neither dimmed nor off."""
+    return patch.multiple(
+        SolarLights,
+        is_daylight=property(lambda self: daylight),
+        should_dim=property(lambda self: False),
+        should_off=property(lambda self: False),
+    )
+
+
+def measure(lights, frames, make_frame):
+    """Return (secs, peak bytes, blocks left over) per frame."""
+    def frame():
+        make_frame()
+        lights.render()
+        lights._step += 1
+
+    for _ in range(lights._pulse_max_renders):
+        frame()
+    secs = min(
+        time_frames(frame, frames, warm=False) for _ in range(REPEATS)
+    )
+
+    tracemalloc.start()
+    peak_bytes = 0
+    before = tracemalloc.take_snapshot()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        frame()
+        peak_bytes += tracemalloc.get_traced_memory()[1] - current
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, 'lineno')
+        if stat.traceback[0].filename != tracemalloc.__file__
+    )
+    return secs, peak_bytes / frames, blocks / frames
+
+
+def draw_strip_per_pixel(lights, frame, sizes):
+    """Draw the day display over a strip one pixel at a time."""
+    settings = lights.settings
+    frame.clear()
+    frame.spread(
+        sizes[0], settings.PRODUCTION_COLOUR, lights.get_production_level()
+    )
+    for _ in range(sizes[1]):
+        colour = lights.get_direction_colour()
+        frame.put(colour[0], colour[1], colour[2])
+    colour, pct = lights.get_tilt()
+    for _ in range(sizes[2]):
+        frame.blend(settings.NEUTRAL_COLOUR, colour, pct)
+    frame.spread(
+        sizes[3], settings.CONSUMPTION_COLOUR, lights.get_consumption_level(),
+        reverse=True
+    )
+
+
+def time_frames(make_frame, frames, warm=True):
+    """Return seconds per call of make_frame."""
+    if warm:
+        make_frame()
+    start = time.perf_counter()
+    for _ in range(frames):
+        make_frame()
+    return (time.perf_counter() - start) / frames
+
+
+def get_timing(make_frame, frames):
+    """Return the result for make_frame: its best microseconds per call."""
+    secs = min(time_frames(make_frame, frames) for _ in range(REPEATS))
+    return {'us': round(secs * 1e6, 2)}
+
+
+def get_lights():
+    """Return lights showing DATA, or SUMMARY by night."""
+    lights = SolarLights(with_solaredge=False)
+    lights._data = DATA
+    lights._summary = SUMMARY
+    return lights
+
+
+def bench_frames(frames):
+    """Return results for making day and night frames."""
+    lights = get_lights()
+    # Not started, so the Blinkt is driven from the render loop.
+    lights._outputs = [Output(BlinktRenderer(lights))]
+    results = {}
+    with patch.dict(sys.modules, {'blinkt': get_fake_blinkt()}):
+        for name, daylight in (('day', True), ('night', False)):
+            for method in (lights.draw_frame, lights.update_frame):
+                with fix_display(daylight):
+                    secs, peak_bytes, blocks = measure(
+                        lights, frames, method
+                    )
+                results[f"frame {name} {method.__name__}"] = {
+                    'us': round(secs * 1e6, 2),
+                    'peak_bytes': round(peak_bytes, 1),
+                    'blocks': round(blocks, 3),
+                }
+    return results
+
+
+def bench_pixels(frames):
+    """Return results for working out pixels."""
+    lights = get_lights()
+    results = {}
+    for name, daylight in (('day', True), ('night', False)):
+        with fix_display(daylight):
+            results[f"get_pixels {name}"] = get_timing(
+                lights.get_pixels, frames
+            )
+    colour = lights.settings.PRODUCTION_COLOUR
+    results['spread_pixels'] = get_timing(
+        lambda: lights.spread_pixels(3, colour, 0.6), frames
+    )
+    results['blend_pixel'] = get_timing(
+        lambda: lights.blend_pixel(
+            lights.settings.NEUTRAL_COLOUR, lights.settings.EXPORT_COLOUR, 0.4
+        ),
+        frames
+    )
+    return results
+
+
+def bench_schedule(frames):
+    """Return results for working out refreshes and sun times."""
+    lights = get_lights()
+    return {
+        'get_refresh_interval': get_timing(
+            lights.get_refresh_interval, frames
+        ),
+        'sun_params': get_timing(lambda: lights.sun_params, frames),
+    }
+
+
+def bench_renderers(frames):
+    """Return results for showing a frame with each built in renderer."""
+    lights = get_lights()
+    with fix_display(True):
+        lights.update_frame()
+        lights.update_output()
+    frame = Frame(
+        bytes(lights.frame.data), bytes(lights.output.data), 0.5, DATA, None
+    )
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(
+        sys.modules, get_fake_modules()
+    ):
+        lights.html_path = os.path.join(tmp_dir, 'lights.html')
+        for name, renderer_class in RENDERERS.items():
+            renderer = renderer_class(lights)
+            renderer.setup()
+            results[f"render {name}"] = get_timing(
+                lambda: renderer.show(frame), frames
+            )
+            renderer.close()
+    return results
+
+
+def bench_configurator(frames):
+    """Return results for the web UI's /lights."""
+    import configurator
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp_dir.name, 'lights.snapshot')
+    shared = SharedSnapshotFile(path, n_pixels=8)
+    readings = itertools.cycle([DATA, dict(DATA, production=1.8)])
+
+    def share_reading():
+        shared.write(
+            Frame(bytes(24), bytes(24), 0.5, next(readings), None), True, {}
+        )
+
+    def get_new_lights():
+        share_reading()
+        client.get('/lights')
+
+    results = {}
+    with patch('power.SHARED_PATH', path), patch.object(
+        configurator, 'LIGHTS', configurator.LightsState()
+    ):
+        client = configurator.app.test_client()
+        results['configurator /lights'] = get_timing(get_new_lights, frames)
+        etag = client.get('/lights').headers['ETag']
+        results['configurator /lights 304'] = get_timing(
+            lambda: client.get('/lights', headers={'If-None-Match': etag}),
+            frames
+        )
+    shared.close()
+    tmp_dir.cleanup()
+    return results
+
+
+def bench_strips(frames):
+    """Return results for drawing strips of various lengths."""
+    results = {}
+    with fix_display(True):
+        for n_pixels in STRIP_LENGTHS:
+            with patch('power.LED_COUNT', n_pixels):
+                lights = SolarLights(with_solaredge=False)
+            lights._data = DATA
+            frame = FrameBuffer(n_pixels)
+            sizes = get_segment_sizes(
+                [share for _, share in DAY_SEGMENTS], n_pixels
+            )
+            results[f"strip {n_pixels} per pixel"] = get_timing(
+                lambda: draw_strip_per_pixel(lights, frame, sizes), frames
+            )
+            results[f"strip {n_pixels} draw_frame"] = get_timing(
+                lights.draw_frame, frames
+            )
+            results[f"strip {n_pixels} update_output"] = get_timing(
+                lights.update_output, frames
+            )
+    return results
+
+
+BENCHMARKS = {
+    'frames': bench_frames,
+    'pixels': bench_pixels,
+    'schedule': bench_schedule,
+    'renderers': bench_renderers,
+    'configurator': bench_configurator,
+    'strips': bench_strips,
+}
+
+
+def run(frames, only=None):
+    """Run the benchmarks (or only some), printing and returning results."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, patch(
+        'power.ALMANAC_PATH', os.path.join(tmp_dir, 'almanac.json')
+    ):
+        for name, bench in BENCHMARKS.items():
+            if only and name not in only:
+                continue
+            for result_name, result in bench(frames).items():
+                print(f"{result_name}: " + ", ".join(
+                    f"{value} {unit}" for unit, value in result.items()
+                ))
+                results[result_name] = result
+    return results
+
+
+def save(path, frames, results):
+    """Save results as a JSON baseline."""
+    with open(path, 'w') as fp:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'frames': frames,
+            'results': results,
+        }, fp, indent=2, sort_keys=True)
+
+
+def load(path):
+    """Return the results saved in a JSON baseline."""
+    with open(path) as fp:
+        return json.load(fp)['results']
+
+
+def compare(baseline, results, threshold=THRESHOLD):
+    """Return (name, baseline us, us, change, regressed) for each result.
+
+    Only times are compared, for results in both; memory is for
+    information.
+    """
+    rows = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or not old['us']:
+            continue
+        change = result['us'] / old['us'] - 1
+        rows.append(
+            (name, old['us'], result['us'], change, change > threshold)
+        )
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument(
+        '--only', nargs='+', choices=list(BENCHMARKS),
+        help="Only run these benchmarks"
+    )
+    parser.add_argument('--save', help="Save the results as a JSON baseline")
+    parser.add_argument(
+        '--compare', help="Compare the results with a JSON baseline"
+    )
+    parser.add_argument(
+        '--results',
+        help="Compare these saved results rather than running the benchmarks"
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=THRESHOLD,
+        help="Fraction slower than the baseline that counts as a regression"
+    )
+    args = parser.parse_args()
+    if args.results and not args.compare:
+        parser.error("--results needs --compare.")
+
+    if args.results:
+        results = load(args.results)
+    else:
+        results = run(args.frames, args.only)
+    if args.save:
+        save(args.save, args.frames, results)
+    if args.compare:
+        rows = compare(load(args.compare), results, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        for name, old_us, us, change, regressed in rows:
+            print(
+                f"{name}: {old_us} -> {us} us ({change:+.0%})"
+                f"{' REGRESSION' if regressed else ''}"
+            )
+        regressions = [row for row in rows if row[-1]]
+        if regressions:
+            print(
+                f"{len(regressions)} regression(s) past "
+                f"{args.threshold:.0%}."
+            )
+            sys.exit(1)
@@ -0,0 +1,125 @@
+"""Circuit breakers so a dead data source is skipped rather than retried."""
+import logging
+import time
+
+LOG = logging.getLogger('solar-lights')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker:
+    """Track one source's health, opening after repeated failures.
+
+    An open breaker refuses calls until `reset_secs` have passed, then
+    lets one trial call through (half-open). Success closes it again;
+    failure re-opens it for twice as long, up to `max_reset_secs`.
+    """
+
+    def __init__(
+        self, name, failure_threshold=3, reset_secs=30,
+        max_reset_secs=30 * 60
+    ):
+        """Set up."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_secs = reset_secs
+        self.reset_secs = reset_secs
+        self.max_reset_secs = max_reset_secs
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_secs = 0.
+        self.last_error = None
+        self._state = CLOSED
+        self._opened_at = None
+
+    def get_state(self, now=None):
+        """Return the state, moving open to half-open once it's time."""
+        now = time.monotonic() if now is None else now
+        if self._state == OPEN and now - self._opened_at >= self.reset_secs:
+            self._state = HALF_OPEN
+        return self._state
+
+    def allow(self, now=None):
+        """Return True if a call should be tried."""
+        return self.get_state(now) != OPEN
+
+    def record_success(self, secs):
+        """Note a successful call."""
+        self.successes += 1
+        self.total_secs += secs
+        self.consecutive_failures = 0
+        if self._state != CLOSED:
+            LOG.info(f"Source {self.name} recovered.")
+        self._state = CLOSED
+        self.reset_secs = self.base_reset_secs
+
+    def record_failure(self, secs, error=None, now=None):
+        """Note a failed call, opening the breaker if need be."""
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        self.total_secs += secs
+        self.consecutive_failures += 1
+        self.last_error = str(error) if error else None
+        if self._state == HALF_OPEN:
+            self.reset_secs = min(self.reset_secs * 2, self.max_reset_secs)
+        elif self.consecutive_failures < self.failure_threshold:
+            return
+        if self._state != OPEN:
+            LOG.warning(
+                f"Source {self.name} failing ({error}), "
+                f"skipping it for {self.reset_secs}s."
+            )
+        self._state = OPEN
+        self._opened_at = now
+
+    def get_stats(self):
+        """Return counters for this breaker."""
+        calls = self.successes + self.failures
+        return {
+            'state': self.get_state(),
+            'successes': self.successes,
+            'failures': self.failures,
+            'mean_secs': round(self.total_secs / calls, 3) if calls else None,
+            'last_error': self.last_error,
+        }
+
+
+class SourceChain:
+    """Try data sources in order of preference, skipping broken ones.
+
+    Open breakers are passed over without a call, so the first healthy
+    fallback is effectively promoted until the preferred source passes
+    a half-open trial call again.
+    """
+
+    def __init__(self, sources, errors=(Exception,)):
+        """Set up from (name, method) pairs, most preferred first."""
+        self.sources = [
+            (CircuitBreaker(name), method) for name, method in sources
+        ]
+        self.errors = errors
+
+    def get(self):
+        """Return (name, result) from the first source that works."""
+        for breaker, method in self.sources:
+            if not breaker.allow():
+                continue
+            started = time.monotonic()
+            try:
+                result = method()
+            except self.errors as ex:
+                breaker.record_failure(time.monotonic() - started, ex)
+                continue
+            breaker.record_success(time.monotonic() - started)
+            return breaker.name, result
+        return None, None
+
+    def get_stats(self):
+        """Return counters for every source."""
+        return {
+            breaker.name: breaker.get_stats()
+            for breaker, _ in self.sources
+        }
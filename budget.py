@@ -0,0 +1,205 @@
+"""Keep count of SolarEdge API calls and pace them to the daily limit."""
+import logging
+import os
+import time
+
+LOG = logging.getLogger('solar-lights')
+
+DAY_SECS = 24 * 60 * 60
+
+
+def get_utc_day(epoch):
+    """Return the UTC day number for an epoch time."""
+    return int(epoch // DAY_SECS)
+
+
+class ApiLedger:
+    """Append-only, on-disk record of API calls for the current UTC day."""
+
+    def __init__(self, path='api_ledger.csv', now=None):
+        """Set up, reading back any calls already made today."""
+        self.path = path
+        self._day = get_utc_day(time.time() if now is None else now)
+        self._calls = []
+        self.load()
+
+    def load(self):
+        """Read today's calls from the ledger file."""
+        self._calls = []
+        try:
+            with open(self.path, 'r') as fp:
+                for line in fp:
+                    try:
+                        epoch = float(line.split(',')[0])
+                    except ValueError:
+                        continue
+                    if get_utc_day(epoch) == self._day:
+                        self._calls.append(epoch)
+        except FileNotFoundError:
+            pass
+
+    def _roll(self, now):
+        """Start a fresh ledger if the UTC day has changed."""
+        day = get_utc_day(now)
+        if day == self._day:
+            return
+        self._day = day
+        self._calls = []
+        with open(self.path, 'w'):
+            pass
+
+    def record(self, kind, now=None):
+        """Record a call having been made."""
+        now = time.time() if now is None else now
+        self._roll(now)
+        self._calls.append(now)
+        with open(self.path, 'a') as fp:
+            fp.write(f"{now:.0f},{kind}\n")
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def count(self, now=None):
+        """Return the number of calls made today."""
+        self._roll(time.time() if now is None else now)
+        return len(self._calls)
+
+    @property
+    def last_call(self):
+        """Return the epoch time of the last call today, if any."""
+        return self._calls[-1] if self._calls else None
+
+
+class TokenBucket:
+    """Tokens trickle in at `rate` per second, up to `capacity`."""
+
+    def __init__(self, capacity, rate, tokens=1., now=None):
+        """Set up."""
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = tokens
+        self._updated = time.time() if now is None else now
+
+    def refill(self, now):
+        """Add the tokens earned since the last refill."""
+        elapsed = max(now - self._updated, 0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_for(self, tokens=1.):
+        """Return seconds until there will be `tokens` tokens."""
+        missing = tokens - self.tokens
+        if missing <= 0:
+            return 0
+        if self.rate <= 0:
+            return float('inf')
+        return missing / self.rate
+
+
+class ApiScheduler:
+    """Spend what's left of today's API budget where it matters most.
+
+    Off-hours (e.g. night, when a call's weight is off_weight or less)
+    are polled every off_interval. The rest of the budget is spread over
+    what's left of the UTC day's other hours in proportion to their
+    weight, so spare calls go to daylight and sunrise/sunset ramps
+    rather than piling up before midnight. A weight above 1 asks for a
+    sooner update, below 1 a later one; the token bucket lets weighted
+    bursts borrow against quiet periods without outrunning the budget.
+    """
+
+    def __init__(
+        self, ledger, limit, reserve=2, burst=5., min_interval=30,
+        max_interval=2 * 60 * 60, off_weight=0.25, off_interval=30 * 60,
+        sample_secs=5 * 60
+    ):
+        """Set up."""
+        self.ledger = ledger
+        self.limit = limit
+        self.reserve = reserve
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.off_weight = off_weight
+        self.off_interval = off_interval
+        self.sample_secs = sample_secs
+        self.bucket = TokenBucket(burst, 0)
+        self._spent = None
+
+    def get_calls_left(self, now=None):
+        """Return calls left today, less the reserve."""
+        return self.limit - self.reserve - self.ledger.count(now)
+
+    def get_earliest(self, now=None):
+        """Return the soonest epoch time another call can be made."""
+        now = time.time() if now is None else now
+        last_call = self.ledger.last_call
+        if last_call is None:
+            return now
+        return max(now, last_call + self.min_interval)
+
+    def get_weighted_secs(self, start, end, get_weight):
+        """Return (weighted secs, secs, off-hours secs) from start to end.
+
+        Weights are sampled every sample_secs.
+        """
+        weighted = secs = off_secs = 0.
+        when = start
+        while when < end:
+            step = min(self.sample_secs, end - when)
+            weight = get_weight(when)
+            if weight <= self.off_weight:
+                off_secs += step
+            else:
+                weighted += weight * step
+                secs += step
+            when += step
+        return weighted, secs, off_secs
+
+    def next_interval(self, weight=1., now=None, get_weight=None):
+        """Return seconds to wait before the next call.
+
+        get_weight(epoch) is what a call will be worth later today; with
+        it, off-hours are polled at a fixed rate and the other hours share
+        the rest. Without it, calls are paced evenly to the end of the
+        UTC day.
+        """
+        now = time.time() if now is None else now
+        secs_left = DAY_SECS - now % DAY_SECS
+        calls_left = self.get_calls_left(now)
+        if calls_left <= 0:
+            LOG.warning("API budget spent for today, waiting for midnight UTC.")
+            return int(secs_left) + 1
+
+        earliest = self.get_earliest(now) - now
+        if get_weight is not None and weight <= self.off_weight:
+            return int(min(
+                max(self.off_interval, earliest, self.min_interval),
+                self.max_interval
+            ))
+
+        pace_secs = secs_left
+        rate_secs = secs_left
+        calls = calls_left
+        if get_weight is not None:
+            weighted, on_secs, off_secs = self.get_weighted_secs(
+                now, now + secs_left, get_weight
+            )
+            if weighted > 0:
+                calls = max(calls_left - off_secs / self.off_interval, 1)
+                pace_secs = weighted
+                rate_secs = on_secs
+
+        self.bucket.rate = calls / rate_secs
+        self.bucket.refill(now)
+        spent = self.ledger.count(now)
+        if self._spent is None:
+            self._spent = spent
+        self.bucket.tokens -= max(spent - self._spent, 0)
+        self._spent = spent
+
+        interval = max(
+            pace_secs / calls / max(weight, 0.01),
+            self.bucket.wait_for(),
+            earliest,
+            self.min_interval,
+        )
+        return int(min(interval, self.max_interval, secs_left + 1))
@@ -0,0 +1,61 @@
+"""Keep the last API responses on disk so a restart can render at once."""
+import json
+import logging
+import os
+import time
+
+LOG = logging.getLogger('solar-lights')
+
+
+class ResponseCache:
+    """A small JSON file of values, each with when it was saved and a TTL."""
+
+    def __init__(self, path='cache.json'):
+        """Set up."""
+        self.path = path
+        self._entries = None
+
+    @property
+    def entries(self):
+        """Return the cached entries, reading the file on first use."""
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as fp:
+                    self._entries = json.load(fp)
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key, max_age=None, now=None):
+        """Return (value, saved_at, expires_at) for key, or None.
+
+        Entries older than max_age are treated as missing; entries past
+        their expiry are still returned, it's up to the caller whether
+        stale is better than nothing.
+        """
+        now = time.time() if now is None else now
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if max_age is not None and now - entry['saved_at'] > max_age:
+            return None
+        return entry['value'], entry['saved_at'], entry['expires_at']
+
+    def put(self, key, value, ttl, now=None):
+        """Save value under key, valid for ttl seconds."""
+        now = time.time() if now is None else now
+        self.entries[key] = {
+            'value': value,
+            'saved_at': now,
+            'expires_at': now + ttl,
+        }
+        # Write then rename, so a power cut never leaves a torn file.
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as fp:
+                json.dump(self.entries, fp)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            LOG.exception("Failed to save response cache.")
@@ -0,0 +1,63 @@
+"""Where the lights get the time from: the real clock, or a virtual one.
+
+SolarLights asks its clock for the time instead of the time module, so a
+VirtualClock can take it through a day of schedules and animation in
+moments (see replay.py).
+"""
+import time
+from datetime import datetime
+
+
+class Clock:
+    """The real clock."""
+
+    def time(self):
+        """Return the epoch time now."""
+        return time.time()
+
+    def monotonic(self):
+        """Return seconds on a clock that never goes back."""
+        return time.monotonic()
+
+    def now(self):
+        """Return the local time now, as a naive datetime."""
+        return datetime.fromtimestamp(self.time())
+
+    def utcnow(self):
+        """Return the UTC time now, as a naive datetime."""
+        return datetime.utcfromtimestamp(self.time())
+
+    def wait(self, event, timeout):
+        """Wait up to timeout seconds for event; return True if it was set."""
+        return event.wait(timeout)
+
+
+class VirtualClock(Clock):
+    """A clock that only moves when it's set, or waited on."""
+
+    def __init__(self, start):
+        """Set up, starting at epoch time start."""
+        self.started = start
+        self._now = start
+
+    def time(self):
+        """Return the virtual epoch time."""
+        return self._now
+
+    def monotonic(self):
+        """Return virtual seconds since the clock started."""
+        return self._now - self.started
+
+    def set(self, when):
+        """Move on to epoch time when; the clock never goes back."""
+        self._now = max(self._now, when)
+
+    def advance(self, secs):
+        """Move on secs seconds."""
+        self.set(self._now + secs)
+
+    def wait(self, event, timeout):
+        """Move on past the timeout, unless event is already set."""
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
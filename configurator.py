@@ -1,37 +1,80 @@
+import hashlib
+import json
+import logging
 import os
+import runpy
+import threading
+import time
 from importlib import reload
+from urllib.parse import urlencode
 
-from flask import Flask, render_template, request, redirect, jsonify
+from flask import Flask, Response, render_template, request, redirect
 
 import config as power_config
-from power import SolarLights
+from power import SolarLights, Snapshot
+from settings import SettingsError, compile_settings, load_settings
+from shared import SharedSnapshotFile
+
+LOG = logging.getLogger('solar-lights')
 
 app = Flask(__name__)
 
+# Types of value config.py can hold, and be written back.
+CONFIG_TYPES = (str, int, float, bool, list, tuple, dict, type(None))
 
-def _rewrite_config_file():
-    """Update config.py."""
-    exceptions = ('SITE_ID',)
+
+def _get_form_values():
+    """Return config values from the form, as the types config.py uses."""
+    strings = ('API_KEY', 'SITE_ID')
+    values = {}
     temp_arrays = {}
 
-    with open('config.py', 'w') as fp:
-        for key, val in request.form.items():
-            if key not in exceptions and '-' not in key:
-                try:
-                    val = float(val)
-                    fp.write(f"{key} = {val}\n")
-                except ValueError:
-                    fp.write(f"{key} = '{val}'\n")
-            elif '-' in key:
-                prefix, suffix = key.split('-')
-                temp_arrays[prefix] = temp_arrays.get(prefix, {})
-                temp_arrays[prefix][suffix] = int(val)
-            else:
-                fp.write(f"{key} = '{val}'\n")
-
-        for key, vals in temp_arrays.items():
-            fp.write(f"{key} = [{vals['R']}, {vals['G']}, {vals['B']}]\n")
+    for key, val in request.form.items():
+        if '-' in key:
+            prefix, suffix = key.split('-')
+            temp_arrays[prefix] = temp_arrays.get(prefix, {})
+            temp_arrays[prefix][suffix] = val
+        elif key in strings:
+            values[key] = val
+        else:
+            try:
+                values[key] = float(val)
+            except ValueError:
+                values[key] = val
+
+    for key, vals in temp_arrays.items():
+        values[key] = [vals.get('R'), vals.get('G'), vals.get('B')]
+    return values
+
+
+def _get_config_values(path):
+    """Return the settings in a config file, as values that can be written."""
+    return {
+        key: val for key, val in runpy.run_path(path).items()
+        if not key.startswith('_') and isinstance(val, CONFIG_TYPES)
+    }
+
 
+def _rewrite_config_file():
+    """Update config.py, if valid; the running lights pick it up from there.
+
+    Settings the form doesn't have (e.g. LED_COUNT or DISPLAYS) are kept.
+    """
+    path = power_config.__file__
+    values = _get_config_values(path)
+    values.update(_get_form_values())
+    try:
+        settings = compile_settings(values)
+    except SettingsError as ex:
+        return redirect(f"/?{urlencode({'error': str(ex)})}", code=302)
+    values.update(settings.to_config())
+
+    with open(f'{path}.tmp', 'w') as fp:
+        for key, val in values.items():
+            fp.write(f"{key} = {val!r}\n")
+
+    # Swap the whole file in at once, so it's never read half written.
+    os.replace(f'{path}.tmp', path)
     return redirect("/?updated=1", code=302)
 
 
@@ -60,25 +103,149 @@ def reboot():
     return render_template('rebooting.jinja2')
 
 
+class LightsState:
+    """What the lights show, worked out once and shared by every client.
+
+    The reading and day summary come from what power.py shares (see
+    shared.py). It's only worked out again when they, the config or
+    daylight change, and browsers can wait on it for changes rather
+    than asking over and over.
+    """
+
+    POLL_SECS = 1
+
+    def __init__(self):
+        """Set up; the lights are made on first use."""
+        self.body = None
+        self.etag = None
+        self._lights = None
+        self._shared = None
+        self._key = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._poller = None
+
+    @property
+    def lights(self):
+        """Return the SolarLights that works out the pixels."""
+        if self._lights is None:
+            self._lights = SolarLights(
+                with_pygame=False, with_blinkt=False, with_solaredge=False,
+                settings=load_settings(power_config.__file__),
+            )
+            # Show every animation at full strength.
+            self._lights._pulse_max_renders = 1
+            self._lights._flash_max_renders = 1
+        return self._lights
+
+    @property
+    def shared(self):
+        """Return the snapshot power.py shares."""
+        if self._shared is None:
+            self._shared = SharedSnapshotFile(self.lights.get_shared_path())
+        return self._shared
+
+    def get_key(self):
+        """Return what the lights depend on, to spot changes cheaply."""
+        return (
+            self.shared.get_version(),
+            _get_mtime(power_config.__file__),
+            self.lights.is_daylight,
+        )
+
+    def update(self):
+        """Work the lights out again if anything behind them changed."""
+        with self._lock:
+            key = self.get_key()
+            if key == self._key:
+                return
+            lights = self.lights
+            if self._key is None or key[1] != self._key[1]:
+                lights.apply_settings(load_settings(power_config.__file__))
+            snapshot = self.shared.read()
+            data = summary = None
+            if snapshot is not None:
+                data, summary = snapshot.data, snapshot.summary
+            lights.publish(Snapshot(data, summary, None, None))
+            lights.apply_snapshot()
+            context = {
+                'pixels': lights.get_pixels(),
+                'help': lights.help,
+                'refresh': lights.get_refresh_interval(),
+                'data': data,
+                'summary': summary,
+            }
+            self._key = key
+            body = json.dumps(context)
+            if body == self.body:
+                return
+            self.body = body
+            self.etag = hashlib.sha1(body.encode()).hexdigest()
+        with self._changed:
+            self._changed.notify_all()
+
+    def start(self):
+        """Start keeping the lights up to date, for clients to wait on."""
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(
+                    target=self._poll, daemon=True
+                )
+                self._poller.start()
+
+    def wait(self, etag, timeout):
+        """Return (body, etag) once it's no longer etag, or on timeout."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.etag != etag, timeout)
+        return self.body, self.etag
+
+    def _poll(self):
+        """Keep the lights up to date."""
+        while True:
+            try:
+                self.update()
+            except Exception:
+                LOG.exception("Failed to update the lights.")
+            time.sleep(self.POLL_SECS)
+
+
+def _get_mtime(path):
+    """Return a file's mtime, or None if it's missing."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+LIGHTS = LightsState()
+
+
 @app.route('/lights', methods=['GET'])
 def get_lights():
     """Get current display and explanation."""
-    sol = SolarLights(
-        with_pygame=False, with_blinkt=False,
-        with_csv=True, with_solaredge=False
+    LIGHTS.update()
+    response = app.response_class(LIGHTS.body, mimetype='application/json')
+    response.set_etag(LIGHTS.etag)
+    return response.make_conditional(request)
+
+
+@app.route('/lights/stream', methods=['GET'])
+def stream_lights():
+    """Send the current display, and again whenever it changes."""
+    LIGHTS.start()
+
+    def events():
+        etag = None
+        while True:
+            body, new_etag = LIGHTS.wait(etag, timeout=15)
+            if new_etag == etag:
+                # Keep the connection open through any proxies.
+                yield ': keep-alive\n\n'
+                continue
+            etag = new_etag
+            yield f'data: {body}\n\n'
+
+    return Response(
+        events(), mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
     )
-    sol._pulse_max_renders = 1
-    sol._flash_max_renders = 1
-    sol._render_count = 1
-    sol.set_next_update()
-    sol.update_data()
-    pixels = sol.get_pixels()
-    help = sol.help
-    refresh = sol.get_refresh_interval()
-    context = {
-        'pixels': pixels,
-        'help': help,
-        'refresh': refresh,
-        'data': sol._data,
-    }
-    return jsonify(context)
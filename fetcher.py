@@ -0,0 +1,44 @@
+"""Fetch data in the background so the render loop never waits on it."""
+import logging
+import threading
+
+LOG = logging.getLogger('solar-lights')
+
+
+class DataFetcher(threading.Thread):
+    """Keep controllers' data snapshots up to date from a worker thread.
+
+    One thread serves any number of controllers (e.g. one per site),
+    each fetching on its own schedule.
+    """
+
+    MAX_WAIT_SECS = 60
+
+    def __init__(self, *controllers):
+        """Set up."""
+        super().__init__(name='solar-lights-fetcher', daemon=True)
+        self._controllers = controllers
+        self._stopped = threading.Event()
+
+    def run(self):
+        """Fetch whenever an update is due, until stopped."""
+        for controller in self._controllers:
+            controller.set_next_update()
+        while not self._stopped.is_set():
+            for controller in self._controllers:
+                try:
+                    controller.update_data()
+                    controller.set_next_update()
+                except Exception:
+                    LOG.exception("Background data fetch failed.")
+            wait = min(
+                controller.get_seconds_until_update()
+                for controller in self._controllers
+            )
+            self._stopped.wait(min(max(wait, 1), self.MAX_WAIT_SECS))
+
+    def stop(self, timeout=None):
+        """Ask the worker to finish and wait for it."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
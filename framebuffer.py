@@ -0,0 +1,164 @@
+"""A fixed-size RGB frame, drawn into in place each frame."""
+
+
+class FrameBuffer:
+    """RGB bytes for a strip of pixels, plus a write cursor.
+
+    Drawing goes left to right from the cursor; anything drawn past the
+    end of the strip is dropped. Nothing is allocated per frame.
+    """
+
+    __slots__ = ('size', 'data', 'cursor', '_blank')
+
+    def __init__(self, size):
+        """Set up a dark frame of `size` pixels."""
+        self.size = size
+        self.data = bytearray(size * 3)
+        self.cursor = 0
+        self._blank = bytes(size * 3)
+
+    def __len__(self):
+        """Return the number of pixels."""
+        return self.size
+
+    def clear(self):
+        """Make every pixel dark and go back to the start."""
+        self.data[:] = self._blank
+        self.cursor = 0
+
+    def set(self, ix, red, green, blue):
+        """Set pixel ix, clamping each value to 0-255."""
+        if 0 <= ix < self.size:
+            offset = ix * 3
+            data = self.data
+            data[offset] = min(max(int(red), 0), 255)
+            data[offset + 1] = min(max(int(green), 0), 255)
+            data[offset + 2] = min(max(int(blue), 0), 255)
+
+    def get(self, ix):
+        """Return pixel ix as an (r, g, b) tuple."""
+        offset = ix * 3
+        data = self.data
+        return data[offset], data[offset + 1], data[offset + 2]
+
+    def put(self, red, green, blue):
+        """Draw one pixel at the cursor."""
+        self.set(self.cursor, red, green, blue)
+        self.cursor += 1
+
+    def skip(self, n_pixels):
+        """Leave n_pixels as they are (dark, after a clear)."""
+        self.cursor += n_pixels
+
+    def blend(self, c1, c2, pct):
+        """Draw one pixel blended from c1 to c2 by pct."""
+        self.put(
+            round((1 - pct) * c1[0] + pct * c2[0]),
+            round((1 - pct) * c1[1] + pct * c2[1]),
+            round((1 - pct) * c1[2] + pct * c2[2]),
+        )
+
+    def spread(self, n_pixels, colour, pct, reverse=False):
+        """Spread colour over n_pixels, lighting pct of them in all.
+
+        Fully lit pixels come first, then one partly lit one, then dark
+        ones; reverse fills from the other end.
+        """
+        n_pixels = int(n_pixels)
+        start = self.cursor
+        pix_pct = max(0.001, 1. / float(n_pixels))
+        for step in range(n_pixels):
+            ix = start + (n_pixels - 1 - step if reverse else step)
+            if pct >= pix_pct:
+                self.set(ix, colour[0], colour[1], colour[2])
+                pct -= pix_pct
+            elif pct > 0:
+                part = pct / pix_pct
+                self.set(
+                    ix,
+                    float(colour[0]) * part,
+                    float(colour[1]) * part,
+                    float(colour[2]) * part,
+                )
+                pct = 0
+            else:
+                self.set(ix, 0, 0, 0)
+        self.cursor = start + n_pixels
+
+    def fade_from(self, old, pct):
+        """Blend from old frame bytes to this frame by pct."""
+        data = self.data
+        for ix in range(len(data)):
+            data[ix] = round(old[ix] + (data[ix] - old[ix]) * pct)
+
+    def to_lists(self):
+        """Return the frame as a list of [r, g, b] lists."""
+        return [list(self.get(ix)) for ix in range(self.size)]
+
+
+def get_data_key(data, resolution):
+    """Return data's items, with numbers rounded to steps of resolution."""
+    if data is None:
+        return None
+    return tuple(sorted(
+        (
+            name,
+            round(value / resolution)
+            if isinstance(value, (int, float)) else value
+        )
+        for name, value in data.items()
+    ))
+
+
+class FrameTable:
+    """A cycle of finished frames for some data, drawn on first use.
+
+    Frames are kept as bytes, ready to copy into a FrameBuffer. The
+    table is for one (data, summary, daylight) at a time; anything else
+    starts it afresh. With a resolution, data whose numbers round to the
+    same steps counts as the same, so an estimate that creeps along
+    doesn't throw away frames that would look no different.
+    """
+
+    __slots__ = ('frames', 'data', 'summary', 'daylight', 'resolution', 'key')
+
+    def __init__(self, steps, resolution=None):
+        """Set up an empty table of `steps` frames."""
+        self.frames = [None] * steps
+        self.data = None
+        self.summary = None
+        self.daylight = None
+        self.resolution = resolution
+        self.key = None
+
+    def __len__(self):
+        """Return the number of steps in the cycle."""
+        return len(self.frames)
+
+    def is_for(self, data, summary, daylight):
+        """Return True if the table was drawn from these inputs.
+
+        Data that only matches at the table's resolution is taken on as
+        the table's, so it isn't rounded again next time.
+        """
+        if self.summary is not summary or self.daylight != daylight:
+            return False
+        if self.data is data:
+            return True
+        if (
+            self.resolution is None or
+            get_data_key(data, self.resolution) != self.key
+        ):
+            return False
+        self.data = data
+        return True
+
+    def reset(self, data, summary, daylight):
+        """Forget all frames, ready for new inputs."""
+        for step in range(len(self.frames)):
+            self.frames[step] = None
+        self.data = data
+        self.summary = summary
+        self.daylight = daylight
+        if self.resolution is not None:
+            self.key = get_data_key(data, self.resolution)
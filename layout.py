@@ -0,0 +1,116 @@
+"""Lay the display out over a long LED strip, whole segments at a time.
+
+The Blinkt's 3/1/1/3 (day) and 7/1 (night) pixels become proportional
+segments of the strip. Each segment is worked out in one go with NumPy,
+so drawing costs about the same for 60 pixels as for 1000.
+"""
+
+# (segment, share of the strip) for each display.
+DAY_SEGMENTS = (
+    ('production', 3), ('indicator', 1), ('tilt', 1), ('consumption', 3)
+)
+NIGHT_SEGMENTS = (('summary', 7), ('consumption', 1))
+
+
+def get_segment_sizes(shares, n_pixels):
+    """Split n_pixels in proportion to shares, each getting at least one.
+
+    Uses largest remainders, so the sizes always add up to n_pixels.
+    """
+    total = float(sum(shares))
+    exact = [share * n_pixels / total for share in shares]
+    sizes = [max(int(size), 1) for size in exact]
+    by_remainder = sorted(
+        range(len(shares)), key=lambda ix: exact[ix] - int(exact[ix]),
+        reverse=True
+    )
+    for ix in by_remainder[:max(n_pixels - sum(sizes), 0)]:
+        sizes[ix] += 1
+    return sizes
+
+
+def get_segments(segments, n_pixels):
+    """Return {name: slice} laying segments out along n_pixels."""
+    sizes = get_segment_sizes([share for _, share in segments], n_pixels)
+    result = {}
+    start = 0
+    for (name, _), size in zip(segments, sizes):
+        result[name] = slice(start, start + size)
+        start += size
+    return result
+
+
+class StripLayout:
+    """Draw segments into a FrameBuffer through a NumPy view of it."""
+
+    def __init__(self, frame):
+        """Set up for a FrameBuffer; NumPy is only needed from here."""
+        import numpy
+
+        self.np = numpy
+        self.frame = frame
+        n_pixels = len(frame)
+        self.layouts = {
+            True: get_segments(DAY_SEGMENTS, n_pixels),
+            False: get_segments(NIGHT_SEGMENTS, n_pixels),
+        }
+        self.segments = self.layouts[True]
+        self.pixels = numpy.zeros((n_pixels, 3))
+        self.view = numpy.frombuffer(frame.data, dtype=numpy.uint8).reshape(
+            n_pixels, 3
+        )
+        self._index = numpy.arange(n_pixels, dtype=float)
+        self._levels = numpy.zeros(n_pixels)
+
+    def get_sizes(self, daylight):
+        """Return the number of pixels in each segment, in order."""
+        return [
+            segment.stop - segment.start
+            for segment in self.layouts[daylight].values()
+        ]
+
+    def start(self, daylight):
+        """Start a frame of the day or night display."""
+        self.segments = self.layouts[daylight]
+        self.pixels.fill(0)
+
+    def get_levels(self, segment, pct):
+        """Return how lit each pixel is for pct of the segment lit."""
+        n_pixels = segment.stop - segment.start
+        levels = self._levels[:n_pixels]
+        self.np.subtract(pct * n_pixels, self._index[:n_pixels], out=levels)
+        self.np.clip(levels, 0, 1, out=levels)
+        return levels
+
+    def fill(self, name, colour, pct, reverse=False):
+        """Light pct of a segment like a bar, from the far end if reverse."""
+        segment = self.segments[name]
+        levels = self.get_levels(segment, pct)
+        if reverse:
+            levels = levels[::-1]
+        self.np.multiply(
+            levels[:, None], colour, out=self.pixels[segment]
+        )
+
+    def solid(self, name, colour, pct=1.):
+        """Light a whole segment in colour, scaled by pct."""
+        self.pixels[self.segments[name]] = [value * pct for value in colour]
+
+    def blend(self, name, c1, c2, pct):
+        """Light a whole segment in a blend from c1 to c2 by pct."""
+        self.pixels[self.segments[name]] = [
+            (1 - pct) * c1[ix] + pct * c2[ix] for ix in range(3)
+        ]
+
+    def split(self, name, c1, c2, pct):
+        """Show c1 for pct of a segment and c2 for the rest."""
+        segment = self.segments[name]
+        levels = self.get_levels(segment, pct)
+        pixels = self.pixels[segment]
+        pixels[:] = c2
+        pixels += levels[:, None] * [c1[ix] - c2[ix] for ix in range(3)]
+
+    def write(self):
+        """Copy the drawn pixels into the frame buffer."""
+        self.np.clip(self.pixels, 0, 255, out=self.pixels)
+        self.np.copyto(self.view, self.pixels, casting='unsafe')
@@ -0,0 +1,272 @@
+"""Read live power from a SolarEdge inverter over Modbus TCP (SunSpec).
+
+Only what we need is implemented: function 3 (read holding registers)
+against the inverter model (101-103) and the first meter model (201-204).
+Register addresses follow SolarEdge's SunSpec technical note.
+"""
+import argparse
+import logging
+import math
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+LOG = logging.getLogger('solar-lights')
+
+READ_HOLDING_REGISTERS = 3
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+NOT_IMPLEMENTED_INT16 = -0x8000
+
+# (first register, count) for one batched read of each SunSpec block.
+INVERTER_BLOCK = (40069, 52)
+METER_BLOCK = (40188, 23)
+
+# Offsets into the blocks above.
+INVERTER_AC_POWER = 14
+INVERTER_AC_POWER_SF = 15
+METER_AC_POWER = 18
+METER_AC_POWER_SF = 22
+
+INVERTER_MODELS = (101, 102, 103)
+METER_MODELS = (201, 202, 203, 204)
+
+
+class ModbusError(Exception):
+    """Raised when the device can't give us an answer."""
+
+
+def to_int16(value):
+    """Return a register as a signed value."""
+    return value - 0x10000 if value & 0x8000 else value
+
+
+def to_uint16(value):
+    """Return a signed value as a register."""
+    return value & 0xFFFF
+
+
+def scale(value, scale_factor):
+    """Return a signed register value with its SunSpec scale factor applied."""
+    value = to_int16(value)
+    if value == NOT_IMPLEMENTED_INT16:
+        return None
+    return value * 10 ** to_int16(scale_factor)
+
+
+class ModbusTcpClient:
+    """A Modbus TCP connection that's kept open between reads."""
+
+    def __init__(self, host, port=1502, unit=1, timeout=2.):
+        """Set up."""
+        self.host = host
+        self.port = port
+        self.unit = unit
+        self.timeout = timeout
+        self._socket = None
+        self._transaction = 0
+
+    def connect(self):
+        """Open the connection if it isn't already."""
+        if self._socket is None:
+            self._socket = socket.create_connection(
+                (self.host, self.port), timeout=self.timeout
+            )
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self._socket
+
+    def close(self):
+        """Close the connection."""
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _recv_exactly(self, size):
+        """Read exactly size bytes."""
+        chunks = []
+        while size:
+            chunk = self._socket.recv(size)
+            if not chunk:
+                raise ConnectionError("Modbus connection closed.")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def _read(self, address, count):
+        """Send one read request and return its registers."""
+        self._transaction = (self._transaction + 1) % 0x10000
+        sock = self.connect()
+        sock.sendall(struct.pack(
+            '>HHHBBHH', self._transaction, 0, 6, self.unit,
+            READ_HOLDING_REGISTERS, address, count
+        ))
+        transaction, _, length, _ = struct.unpack(
+            '>HHHB', self._recv_exactly(7)
+        )
+        pdu = self._recv_exactly(length - 1)
+        if transaction != self._transaction:
+            raise ModbusError("Modbus response out of sequence.")
+        if pdu[0] & 0x80:
+            raise ModbusError(f"Modbus exception code {pdu[1]}.")
+        if pdu[1] != count * 2:
+            raise ModbusError("Modbus response was the wrong length.")
+        return struct.unpack(f'>{count}H', pdu[2:])
+
+    def read_holding_registers(self, address, count):
+        """Return count registers from address, reconnecting once if needed."""
+        for attempt in range(2):
+            try:
+                return self._read(address, count)
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+            except ModbusError:
+                # We can't trust what's left in the stream, start afresh.
+                self.close()
+                raise
+
+
+class SolarEdgeModbus:
+    """Decode power values from the inverter and meter SunSpec blocks."""
+
+    def __init__(self, client):
+        """Set up."""
+        self.client = client
+
+    def read_block(self, block, models):
+        """Return the registers of one block, checking its model ID."""
+        registers = self.client.read_holding_registers(*block)
+        if registers[0] not in models:
+            raise ModbusError(f"Unexpected SunSpec model {registers[0]}.")
+        return registers
+
+    def read_power(self):
+        """Return production, consumption and grid power in kW.
+
+        The meter reads positive when exporting, so consumption is what's
+        produced less what goes out to the grid.
+        """
+        inverter = self.read_block(INVERTER_BLOCK, INVERTER_MODELS)
+        meter = self.read_block(METER_BLOCK, METER_MODELS)
+        production = scale(
+            inverter[INVERTER_AC_POWER], inverter[INVERTER_AC_POWER_SF]
+        )
+        grid = scale(meter[METER_AC_POWER], meter[METER_AC_POWER_SF])
+        if production is None or grid is None:
+            raise ModbusError("Power registers not implemented.")
+        production = max(production, 0) / 1000.
+        grid = grid / 1000.
+        return {
+            'production': production,
+            'consumption': max(production - grid, 0),
+            'grid': abs(grid),
+        }
+
+
+class ModbusSimulator(socketserver.ThreadingTCPServer):
+    """A tiny SolarEdge lookalike to test against without an inverter."""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        """Set up, with the SunSpec blocks zeroed."""
+        super().__init__(address, ModbusSimulatorHandler)
+        self.registers = {}
+        self.connections = 0
+        self.requests = 0
+        for first, count in (INVERTER_BLOCK, METER_BLOCK):
+            for address in range(first, first + count):
+                self.registers[address] = 0
+        self.registers[INVERTER_BLOCK[0]] = 103
+        self.registers[INVERTER_BLOCK[0] + 1] = 50
+        self.registers[METER_BLOCK[0]] = 203
+        self.registers[METER_BLOCK[0] + 1] = 105
+
+    def set_power(self, production_w, meter_w, scale_factor=-1):
+        """Set inverter AC power and meter power (positive is export)."""
+        factor = 10 ** -scale_factor
+        inverter, meter = INVERTER_BLOCK[0], METER_BLOCK[0]
+        self.registers[inverter + INVERTER_AC_POWER] = to_uint16(
+            round(production_w * factor)
+        )
+        self.registers[inverter + INVERTER_AC_POWER_SF] = to_uint16(
+            scale_factor
+        )
+        self.registers[meter + METER_AC_POWER] = to_uint16(
+            round(meter_w * factor)
+        )
+        self.registers[meter + METER_AC_POWER_SF] = to_uint16(scale_factor)
+
+    def read(self, address, count):
+        """Return registers, or None if any aren't mapped."""
+        try:
+            return [self.registers[ix] for ix in range(address, address + count)]
+        except KeyError:
+            return None
+
+
+class ModbusSimulatorHandler(socketserver.BaseRequestHandler):
+    """Answer read-holding-register requests until the client goes."""
+
+    def handle(self):
+        """Serve one connection."""
+        self.server.connections += 1
+        while True:
+            header = self.request.recv(7)
+            if len(header) < 7:
+                return
+            transaction, protocol, length, unit = struct.unpack(
+                '>HHHB', header
+            )
+            pdu = self.request.recv(length - 1)
+            self.server.requests += 1
+            function = pdu[0]
+            registers = None
+            if function == READ_HOLDING_REGISTERS:
+                address, count = struct.unpack('>HH', pdu[1:5])
+                registers = self.server.read(address, count)
+                error = ILLEGAL_DATA_ADDRESS
+            else:
+                error = ILLEGAL_FUNCTION
+
+            if registers is None:
+                reply = struct.pack('>BB', function | 0x80, error)
+            else:
+                reply = struct.pack(
+                    f'>BB{len(registers)}H', function, len(registers) * 2,
+                    *registers
+                )
+            self.request.sendall(
+                struct.pack(
+                    '>HHHB', transaction, protocol, len(reply) + 1, unit
+                ) + reply
+            )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Run a simulated SolarEdge inverter for testing."
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1502)
+    args = parser.parse_args()
+
+    simulator = ModbusSimulator((args.host, args.port))
+    threading.Thread(target=simulator.serve_forever, daemon=True).start()
+    LOG.info(f"Simulating an inverter on {args.host}:{args.port}...")
+    try:
+        while True:
+            production = max(0, 2500 * math.sin(time.time() / 600))
+            consumption = random.randint(100, 3000)
+            simulator.set_power(production, production - consumption)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.shutdown()
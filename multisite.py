@@ -0,0 +1,154 @@
+"""Run several displays, for one or more sites, in one process.
+
+Each display is listed in config.py's DISPLAYS as SolarLights arguments,
+e.g.
+
+    DISPLAYS = [
+        {'name': 'kitchen', 'site_id': '12345', 'api_key': 'ABC'},
+        {
+            'name': 'hall', 'site_id': '12345', 'api_key': 'ABC',
+            'with_blinkt': False, 'led_count': 60, 'renderers': ['ws281x'],
+        },
+        {
+            'name': 'barn', 'site_id': '67890', 'api_key': 'ABC',
+            'with_blinkt': False,
+        },
+    ]
+
+One thread fetches for every site, each on its own API budget, and one
+loop renders every display. Displays of the same site share its fetches.
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+import config
+from fetcher import DataFetcher
+from power import API_QUERY_LIMIT, SolarLights
+from settings import ConfigWatcher
+
+LOG = logging.getLogger('solar-lights')
+
+
+class MultiSiteController:
+    """Drive several SolarLights from one fetcher thread and one loop."""
+
+    def __init__(self, displays):
+        """Set up; the first display of each site fetches for the rest."""
+        self.displays = displays
+        self._wake = threading.Event()
+        self._running = True
+        self._fetcher = None
+        self._watcher = None
+
+        sites = {}
+        for display in displays:
+            display._wake = self._wake
+            primary = sites.setdefault(display.site_id, display)
+            if primary is not display:
+                primary.followers.append(display)
+                display.nowcast = primary.nowcast
+        self.primaries = list(sites.values())
+
+        # SolarEdge limits each API key per day as well as each site, so
+        # sites sharing a key split its budget.
+        keys = Counter(primary.api_key for primary in self.primaries)
+        for primary in self.primaries:
+            primary.api_limit = API_QUERY_LIMIT // keys[primary.api_key]
+
+        almanac = displays[0].almanac
+        for display in displays:
+            display._almanac = almanac
+
+    @classmethod
+    def from_config(cls, displays, **defaults):
+        """Return a controller for display settings, plus defaults."""
+        return cls([
+            SolarLights(**dict(defaults, **display)) for display in displays
+        ])
+
+    def set_settings(self, settings):
+        """Hand new settings to every display."""
+        for display in self.displays:
+            display.set_settings(settings)
+
+    def reload_settings(self):
+        """Read config.py again soon; safe from a signal handler."""
+        if self._watcher is not None:
+            self._watcher.trigger()
+
+    def run(self):
+        """Fetch and render until one of the displays stops."""
+        for display in self.displays:
+            display.start(fetch=False, watch=False)
+        self._fetcher = DataFetcher(*self.primaries)
+        self._fetcher.start()
+        self._watcher = ConfigWatcher(config.__file__, self.set_settings)
+        self._watcher.start()
+        while self._running:
+            next_time = min(display.step() for display in self.displays)
+            if not all(display._running for display in self.displays):
+                self._running = False
+                break
+            self._wake.wait(max(next_time - time.time(), 0))
+            self._wake.clear()
+        return self._running
+
+    def cleanup(self):
+        """Stop fetching and clean up every display."""
+        self._running = False
+        self._wake.set()
+        if self._fetcher is not None:
+            self._fetcher.stop(timeout=1)
+        if self._watcher is not None:
+            self._watcher.stop(timeout=1)
+        for display in self.displays:
+            display.cleanup()
+
+    def get_stats(self):
+        """Return each display's stats, by name."""
+        return {
+            display.name or display.site_id: display.stats
+            for display in self.displays
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-w', '--wait', action="store", type=int,
+        help="Wait n seconds before starting ("
+        "helps with clock/connection issues)"
+    )
+    args = parser.parse_args()
+    if args.wait:
+        LOG.info(f'Waiting {args.wait} seconds before starting...')
+        time.sleep(int(args.wait))
+
+    controller = MultiSiteController.from_config(
+        config.DISPLAYS,
+        with_cache=True,
+        with_history=True,
+        with_nowcast=True,
+    )
+
+    def signal_term_handler(signal, frame):
+        """Handle exit gracefully..."""
+        LOG.info(f"Got signal {signal}, aborting...")
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, signal_term_handler)
+    signal.signal(
+        signal.SIGHUP, lambda signum, frame: controller.reload_settings()
+    )
+
+    try:
+        controller.run()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        controller.cleanup()
+        LOG.info("..cleanup on abort done.")
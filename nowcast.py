@@ -0,0 +1,108 @@
+"""Estimate production and consumption between (sparse) real readings."""
+import math
+from collections import namedtuple
+
+# What we knew at the last real reading; replaced whole, never mutated.
+NowcastState = namedtuple(
+    'NowcastState',
+    ['when', 'production', 'consumption', 'trend', 'clear_sky']
+)
+
+
+def get_clear_sky(elevation):
+    """Return relative clear-sky irradiance for a solar elevation (degrees).
+
+    Haurwitz's model, scaled so the sun straight overhead is about 1.
+    """
+    sin_elevation = math.sin(math.radians(elevation))
+    if sin_elevation <= 0.01:
+        return 0.
+    return 1.06 * sin_elevation * math.exp(-0.059 / sin_elevation)
+
+
+class Nowcaster:
+    """Predict the present from the last reading and the sun's position.
+
+    Production assumes the sky stays as clear as it was at the last
+    reading ("smart persistence"): it follows the clear-sky curve for
+    the sun's elevation. Consumption follows a smoothed trend that fades
+    out over `horizon_secs`. Each real reading is scored against what
+    would have been predicted for it, alongside plain persistence.
+    """
+
+    def __init__(
+        self, get_elevation, max_production=None, horizon_secs=15 * 60,
+        trend_smoothing=0.3, error_smoothing=0.1
+    ):
+        """Set up; get_elevation(epoch) gives solar elevation in degrees."""
+        self.get_elevation = get_elevation
+        self.max_production = max_production
+        self.horizon_secs = horizon_secs
+        self.trend_smoothing = trend_smoothing
+        self.error_smoothing = error_smoothing
+        self.stats = {
+            'readings': 0,
+            'production_error': None,
+            'consumption_error': None,
+            'persistence_production_error': None,
+            'persistence_consumption_error': None,
+        }
+        self._state = None
+
+    def _smooth_error(self, key, error):
+        """Update an exponentially weighted mean absolute error."""
+        error = abs(error)
+        previous = self.stats[key]
+        if previous is not None:
+            error = previous + self.error_smoothing * (error - previous)
+        self.stats[key] = round(error, 4)
+
+    def observe(self, when, production, consumption):
+        """Take in a real reading, scoring the previous prediction."""
+        state = self._state
+        trend = 0.
+        if state is not None and when > state.when:
+            predicted_production, predicted_consumption = self.predict(when)
+            self._smooth_error(
+                'production_error', predicted_production - production
+            )
+            self._smooth_error(
+                'consumption_error', predicted_consumption - consumption
+            )
+            self._smooth_error(
+                'persistence_production_error', state.production - production
+            )
+            self._smooth_error(
+                'persistence_consumption_error',
+                state.consumption - consumption
+            )
+            slope = (consumption - state.consumption) / (when - state.when)
+            trend = state.trend + self.trend_smoothing * (slope - state.trend)
+        self.stats['readings'] += 1
+        self._state = NowcastState(
+            when, production, consumption, trend,
+            get_clear_sky(self.get_elevation(when)),
+        )
+
+    def predict(self, when):
+        """Return estimated (production, consumption) at epoch time when."""
+        state = self._state
+        if state is None:
+            return None, None
+        secs = min(max(when - state.when, 0), self.horizon_secs)
+
+        production = state.production
+        clear_sky = get_clear_sky(self.get_elevation(when))
+        if state.clear_sky > 0.05:
+            production *= clear_sky / state.clear_sky
+        elif clear_sky == 0:
+            production = 0.
+        if self.max_production is not None:
+            production = min(production, self.max_production)
+
+        # The trend's effect levels off rather than running away.
+        tau = self.horizon_secs / 3.
+        consumption = state.consumption + (
+            state.trend * tau * (1 - math.exp(-secs / tau))
+        )
+        return max(production, 0.), max(consumption, 0.)
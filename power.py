@@ -1,25 +1,36 @@
 import argparse
 import logging
+import os
 import time
 import random
 import signal
 import sys
-from datetime import datetime, timedelta
-from functools import partial
-
-import requests
-from astral import LocationInfo
-from astral.sun import sun
-
-from config import (
-    API_KEY, SITE_ID,
-    IMPORT_COLOUR, EXPORT_COLOUR, NEUTRAL_COLOUR, PRODUCTION_COLOUR,
-    CONSUMPTION_COLOUR,
-    REFRESH_RATE_SECS,
-    CAPACITY, MAX_IDEAL_POWER, MAX_IDEAL_CONSUMPTION,
-    DIM_DOWN_TIME_NIGHT, BRIGHTEN_UP_TIME_MORNING,
-    OFF_TIMES, OFF_TIME_NIGHT, ON_TIME_MORNING
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import config
+from config import API_KEY, SITE_ID, REFRESH_RATE_SECS
+from almanac import Almanac, get_key
+from animation import Animator
+from breaker import SourceChain
+from budget import ApiLedger, ApiScheduler
+from cache import ResponseCache
+from clock import Clock
+from energy import EnergyIntegrator
+from fetcher import DataFetcher
+from framebuffer import FrameBuffer, FrameTable
+from modbus import ModbusError, ModbusTcpClient, SolarEdgeModbus
+from layout import StripLayout
+from nowcast import Nowcaster
+from renderers import (
+    Frame, Output, RenderMethodFailed, get_renderer_class
 )
+from settings import ConfigWatcher, from_module
+from shared import SharedSnapshotFile, get_default_path
+from solaredge import SolarEdgeError, get_client
+from store import ReadingStore
+from timeline import Timeline, get_day_secs, get_next_daily
 
 LOG = logging.getLogger('solar-lights')
 logging.basicConfig(
@@ -28,18 +39,56 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-SOLAREDGE_SITE_API = f"https://monitoringapi.solaredge.com/site/{SITE_ID}/"
 API_QUERY_LIMIT = 300
+# name, region, timezone, latitude, longitude
+LOCATION = ("St. Helier", "Jersey", "Europe/London", 49.1811528, -2.1226525)
+# Updates within this long of sunrise/sunset are worth spending more calls on.
+RAMP_SECS = 60 * 60
+# Optional settings; older config files won't have them.
+HTTP_CONNECT_TIMEOUT_SECS = getattr(config, 'HTTP_CONNECT_TIMEOUT_SECS', 3.05)
+HTTP_READ_TIMEOUT_SECS = getattr(config, 'HTTP_READ_TIMEOUT_SECS', 10)
+HTTP_RETRIES = int(getattr(config, 'HTTP_RETRIES', 2))
+API_LEDGER_PATH = getattr(config, 'API_LEDGER_PATH', 'api_ledger.csv')
+MODBUS_HOST = getattr(config, 'MODBUS_HOST', None)
+MODBUS_PORT = int(getattr(config, 'MODBUS_PORT', 1502))
+MODBUS_UNIT = int(getattr(config, 'MODBUS_UNIT', 1))
+MODBUS_POLL_SECS = getattr(config, 'MODBUS_POLL_SECS', 1)
+# Work out the day summary locally if readings cover this much of the day.
+SUMMARY_MIN_COVERAGE = getattr(config, 'SUMMARY_MIN_COVERAGE', 0.9)
+# Check the local day summary against the API once a night.
+SUMMARY_RECONCILE = bool(getattr(config, 'SUMMARY_RECONCILE', False))
+# How often the render loop moves the estimate on between real readings.
+NOWCAST_STEP_SECS = getattr(config, 'NOWCAST_STEP_SECS', 10)
+# Readings this close (in kW) draw the same frames, so they're reused.
+FRAME_RESOLUTION_KW = getattr(config, 'FRAME_RESOLUTION_KW', 0.01)
+# REFRESH_RATE_SECS is the length of each pulse/flash step; frames are drawn
+# at ANIMATION_FPS regardless, dropping any that can't be drawn in time.
+# Unset, it's one frame per step, following REFRESH_RATE_SECS on reload.
+ANIMATION_FPS = getattr(config, 'ANIMATION_FPS', None)
+CROSSFADE_SECS = getattr(config, 'CROSSFADE_SECS', 2)
+# More than the Blinkt's 8 pixels are laid out in proportional segments.
+LED_COUNT = int(getattr(config, 'LED_COUNT', 8))
+# Extra (plugin) renderers by name, and frame rate limits per renderer.
+PLUGIN_RENDERERS = getattr(config, 'RENDERERS', [])
+RENDERER_FPS = getattr(config, 'RENDERER_FPS', {})
+ALMANAC_PATH = getattr(config, 'ALMANAC_PATH', 'almanac.json')
+HISTORY_PATH = getattr(config, 'HISTORY_PATH', 'history.db')
+CACHE_PATH = getattr(config, 'CACHE_PATH', 'cache.json')
+# Older cached data than this isn't worth showing after a restart.
+CACHE_MAX_AGE_SECS = getattr(config, 'CACHE_MAX_AGE_SECS', 3 * 60 * 60)
+# Memory-mapped file the lights are shared through (see shared.py).
+SHARED_PATH = getattr(config, 'SHARED_PATH', None)
+
+# What the render loop reads; replaced whole by the fetcher, never mutated.
+Snapshot = namedtuple(
+    'Snapshot', ['data', 'summary', 'fetched_at', 'latency']
+)
 
 
 class DataMethodNotAvailable(Exception):
     """Raised when data access failed."""
 
 
-class RenderMethodFailed(Exception):
-    """Raised when render fails for some reason."""
-
-
 class SolarLights:
     """Manage the lights output depending on production/consumption."""
 
@@ -48,128 +97,310 @@ class SolarLights:
 
     def __init__(
         self, with_blinkt=True, with_pygame=False,
-        with_csv=False, with_modbus=False, with_solaredge=True, with_mock=False
+        with_csv=False, with_modbus=False, with_solaredge=True, with_mock=False,
+        with_cache=False, with_history=False, with_nowcast=False,
+        site_id=SITE_ID, api_key=API_KEY, name=None, led_count=LED_COUNT,
+        renderers=None, api_limit=API_QUERY_LIMIT, settings=None, clock=None
     ):
-        """Set up."""
+        """Set up; site_id etc. default to config.py's."""
+        # Colours, times etc.; replaced whole when config.py changes.
+        self.settings = settings or from_module(config)
+        self._new_settings = None
+        self._watcher = None
+        # Where the time comes from; a VirtualClock for replays.
+        self.clock = clock or Clock()
+        self.site_id = site_id
+        self.api_key = api_key
+        self.name = name
+        self.api_limit = api_limit
+        self.renderer_names = (
+            PLUGIN_RENDERERS if renderers is None else renderers
+        )
+        self.followers = []
+        self.html_path = 'lights.html'
+        if name is not None:
+            self.html_path = f'lights-{name}.html'
         self._data = None
         self._summary = None
-        self._pixels = {}
+        self._snapshot = Snapshot(None, None, None, None)
+        self._fetcher = None
+        self._wake = threading.Event()
+        self.frame = FrameBuffer(led_count)
+        self.output = FrameBuffer(led_count)
+        self._layout = None
+        self._brightness = None
+        self._scale_tables = {}
+        self._last_frame = None
+        self._outputs = None
+        self.shared = None
         self._city = None
         self._sun_params = None
+        self._sun_params_day = None
+        self.almanac_path = ALMANAC_PATH
+        self._almanac = None
         self._next_update = None
+        self._timeline = None
+        self._daily_times = None
+        self._scheduler = None
+        self._refresh_secs = 60
+        self._data_source = None
+        self._sources = None
+        self._modbus = None
+        self._production_change = 0
         self._with_blink = with_blinkt
         self._with_pygame = with_pygame
         self._render_count = 0
+        self._step = 0
         self._flash_max_renders = 15
         self._pulse_max_renders = 127
         self._running = True
+        self._frame_table = FrameTable(
+            self._pulse_max_renders, FRAME_RESOLUTION_KW
+        )
+        self._fade_from = None
+        self.animator = Animator(
+            self._pulse_max_renders, self.settings.REFRESH_RATE_SECS,
+            self.get_animation_fps(),
+            fade_secs=CROSSFADE_SECS, clock=self.clock.monotonic,
+        )
         self.with_csv = with_csv
         self.with_modbus = with_modbus
         self.with_solaredge = with_solaredge
         self.with_mock = with_mock
+        self.cache = None
+        if with_cache:
+            self.cache = ResponseCache(self.get_site_path(CACHE_PATH))
+        self.history = None
+        if with_history:
+            self.history = ReadingStore(self.get_site_path(HISTORY_PATH))
+        self.energy = EnergyIntegrator()
+        self.nowcast = None
+        if with_nowcast:
+            self.nowcast = Nowcaster(
+                self.get_sun_elevation, max_production=self.settings.CAPACITY
+            )
+        self._nowcast_key = None
+        self._nowcast_data = None
+        self._reconciled_day = None
 
-        self._pygame_display = None
         self.help = []
+        self.stats = {
+            'fetches': 0,
+            'fetch_failures': 0,
+            'fetch_latency_secs': None,
+            'http': None,
+            'api_calls_today': None,
+            'sources': None,
+            'summary_drift_wh': None,
+            'nowcast': None,
+            'wakeups': 0,
+            'animation': self.animator.stats,
+            'renderers': {},
+        }
 
     @property
     def pixels(self):
         """Return pixel array."""
-        return [
-            self._pixels[ix]
-            if ix in self._pixels
-            else self.DARK_PIXEL
-            for ix in range(8)
-        ]
+        return self.frame.to_lists()
 
     def set_pixels(self, pixels, first_index, clear=False):
-        """Add pixels to the pixel array starting at first_index."""
+        """Copy pixels into the frame starting at first_index."""
         if clear:
-            self._pixels = {}
+            self.frame.clear()
+        for ix, pixel in enumerate(pixels, first_index):
+            self.frame.set(ix, *pixel)
 
-        pixels.reverse()
-        if len(pixels) + len(self._pixels) <= self.PIXELS_AVAILABLE:
-            for ix in range(first_index, len(pixels)):
-                self._pixels[ix] = pixels.pop()
+    @property
+    def layout(self):
+        """Return the StripLayout for a strip, or None for a Blinkt."""
+        if self._layout is None and len(self.frame) != self.PIXELS_AVAILABLE:
+            self._layout = StripLayout(self.frame)
+        return self._layout
+
+    def draw_frame(self):
+        """Draw the current data into the frame buffer, in place."""
+        frame = self.frame
+        frame.clear()
+        if not self._data:
+            return
+        if self.layout is not None:
+            self.draw_strip(self.layout, self.is_daylight)
+        elif self.is_daylight:
+            self.draw_production_percent(frame, multi=3)
+            self.draw_indicator(frame)
+            self.draw_tilt(frame)
+            self.draw_consumption_percent(frame, multi=3)
+        else:
+            self.draw_day_summary(frame, multi=7)
+            self.draw_consumption_percent(frame)
 
-    def get_pixels(self):
-        """Return a load of pixels to render. Side-effect, sets help array."""
-        pixels = []
-        methods = []
-        self.help = []
-        if self.is_daylight:
-            methods = [
-                partial(self.get_production_percent_pixels, multi=3),
-                self.get_indicator_pixels,
-                self.get_tilt_pixels,
-                partial(self.get_consumption_percent_pixels, multi=3),
-            ]
+    def update_frame(self):
+        """Put the current step of the animation in the frame buffer.
+
+        Each step is drawn the first time it's needed for the current
+        data, then copied from the table on later cycles. When the data
+        changes, the lights crossfade from what was last shown.
+        """
+        table = self._frame_table
+        daylight = self.is_daylight
+        if not table.is_for(self._data, self._summary, daylight):
+            if table.data is not None:
+                self._fade_from = bytes(self.frame.data)
+                self.animator.start_fade()
+            table.reset(self._data, self._summary, daylight)
+        step = self._step % len(table)
+        frame = table.frames[step]
+        if frame is None:
+            self.draw_frame()
+            table.frames[step] = bytes(self.frame.data)
         else:
-            methods = [
-                partial(self.get_day_summary_pixels, multi=7),
-                self.get_consumption_percent_pixels,
+            self.frame.data[:] = frame
+        if self._fade_from is not None:
+            fade = self.animator.get_fade()
+            if fade is None:
+                self._fade_from = None
+            else:
+                self.frame.fade_from(self._fade_from, fade)
+
+    def get_help(self):
+        """Return (name, description, pixels) for each part of the display."""
+        production = (
+            'Production',
+            'Production - if fully lit, represents at least '
+            f'{self.settings.CAPACITY} kWp',
+            3
+        )
+        indicator = (
+            'Indicator',
+            'Direction indicator - either import, export or balanced '
+            'self-consumption',
+            1
+        )
+        tilt = (
+            'Tilt',
+            '(Flashing) This shows the "tilt" away from balanced '
+            'self-consumption, if the direction '
+            'indicator shows import or export and this light is closer in '
+            'colour to the direction indicator light than the self-consumption '
+            'colour, then you are mostly importing or exporting, if it is '
+            'closer to the self-consumption colour then you\'re mostly '
+            'self-consuming!',
+            1
+        )
+        summary = (
+            'Day summary',
+            f'Day summary - shows a percentage split between export and self-'
+            'consumption',
+            7
+        )
+
+        def consumption(multi):
+            return (
+                'Consumption',
+                'Energy use - if fully lit, represents at least '
+                f'{self.settings.MAX_IDEAL_POWER} kW usage (consumption)',
+                multi
+            )
+
+        daylight = self.is_daylight
+        if daylight:
+            entries = [production, indicator, tilt, consumption(3)]
+        else:
+            entries = [summary, consumption(1)]
+        if self.layout is not None:
+            entries = [
+                (name, description, size) for (name, description, _), size
+                in zip(entries, self.layout.get_sizes(daylight))
             ]
-        for method in methods:
-            pixels.extend(method())
-        return pixels
+        return entries
+
+    def get_pixels(self):
+        """Return a load of pixels to render. Side-effect, sets help array."""
+        self.help = self.get_help()
+        self.draw_frame()
+        return self.pixels
 
     @property
     def city(self):
         """Return the PV place."""
         if self._city is None:
-            self._city = LocationInfo(
-                "St. Helier", "Jersey", "Europe/London", 49.1811528, -2.1226525
-            )
+            from astral import LocationInfo
+            self._city = LocationInfo(*LOCATION)
         return self._city
 
+    @property
+    def almanac(self):
+        """Return the sun times table, loading or building it if need be."""
+        now = self.clock.time()
+        if self._almanac is None or not self._almanac.covers(now):
+            key = get_key(*LOCATION[3:], LOCATION[2])
+            almanac = Almanac.load(self.almanac_path)
+            if almanac is None or almanac.key != key or not almanac.covers(
+                now, days=30
+            ):
+                LOG.info("Working out sunrise/sunset times...")
+                almanac = Almanac.build(
+                    self.city, self.clock.now().date() - timedelta(days=1)
+                )
+                almanac.save(self.almanac_path)
+            self._almanac = almanac
+        return self._almanac
+
     @property
     def sun_params(self):
-        """Return sun params for this place."""
-        get_new_params = (
-            self._sun_params is None or
-            self._sun_params['sunset'].day < datetime.now().day
-        )
-        if get_new_params:
-            self._sun_params = sun(self.city.observer, datetime.now())
+        """Return today's sunrise, noon and sunset for this place."""
+        sunrise, noon, sunset = self.almanac.get_sun(self.clock.time())
+        if self._sun_params_day != sunrise:
+            self._sun_params = {
+                kind: datetime.fromtimestamp(epoch, self.city.tzinfo)
+                for kind, epoch in (
+                    ('sunrise', sunrise), ('noon', noon), ('sunset', sunset)
+                )
+            }
+            self._sun_params_day = sunrise
         return self._sun_params
 
+    def get_sun_elevation(self, epoch):
+        """Return the sun's elevation (degrees) here at an epoch time."""
+        from astral.sun import elevation
+        return elevation(
+            self.city.observer, datetime.fromtimestamp(epoch, timezone.utc)
+        )
+
     def get_daylight_seconds(self):
         """Return number of seconds of daylight."""
-        return (
-            self.sun_params['sunset'] - self.sun_params['sunrise']
-        ).total_seconds()
+        return self.almanac.get_daylight_seconds(self.clock.time())
 
     def get_on_seconds(self):
         """Return number of seconds we are actually displaying for."""
-        off_parts = [int(part) for part in OFF_TIME_NIGHT.split(':')]
-        on_parts = [int(part) for part in ON_TIME_MORNING.split(':')]
-
-        return (
-            ((off_parts[0] - on_parts[0]) % 24 * 60 * 60) +  # hours
-            ((off_parts[1] - on_parts[1]) % 60 * 60) +  # mins
-            ((off_parts[2] - on_parts[2]) % 60)  # secs
-        )
+        return self.settings.on_seconds
 
     @property
     def should_off(self):
         """Return trun within, if we have an off period set."""
-        now_time = datetime.now().time().strftime("%H:%M:%S")
-        off_down_night = OFF_TIMES and OFF_TIME_NIGHT <= now_time
-        off_down_morn = OFF_TIMES and now_time <= ON_TIME_MORNING
+        return self.is_off_at(self.clock.time())
+
+    def is_off_at(self, when):
+        """Return True if the lights are set to be off at epoch time when."""
+        now_secs = get_day_secs(when)
+        settings = self.settings
+        off_down_night = settings.OFF_TIMES and settings.off_secs <= now_secs
+        off_down_morn = settings.OFF_TIMES and now_secs < settings.on_secs
         return off_down_night or off_down_morn
 
     @property
     def should_dim(self):
         """Return if it is in the dim-down time range."""
-        now_time = datetime.now().time().strftime("%H:%M:%S")
-        dim_down_night = DIM_DOWN_TIME_NIGHT <= now_time
-        dim_down_morn = now_time <= BRIGHTEN_UP_TIME_MORNING
+        now_secs = get_day_secs(self.clock.time())
+        settings = self.settings
+        dim_down_night = settings.dim_secs <= now_secs
+        dim_down_morn = now_secs < settings.brighten_secs
         return dim_down_night or dim_down_morn
 
     @property
     def is_daylight(self):
         """Return true if it is daylight."""
-        now = self.city.tzinfo.localize(datetime.now())
-        return self.sun_params['sunset'] > now > self.sun_params['sunrise']
+        return self.almanac.is_daylight(self.clock.time())
 
     def update_power_with_status(self, power_dict):
         """Add status to the power_dict."""
@@ -180,45 +411,73 @@ class SolarLights:
             direction = 'import'
         power_dict['direction'] = direction
 
+    @property
+    def modbus(self):
+        """Return the inverter's Modbus TCP reader."""
+        if self._modbus is None:
+            self._modbus = SolarEdgeModbus(
+                ModbusTcpClient(MODBUS_HOST, MODBUS_PORT, MODBUS_UNIT)
+            )
+        return self._modbus
+
     def get_modbus_power_with_status(self):
-        """Get data from inverter...?."""
-        raise DataMethodNotAvailable("How can we modbus?")
+        """Get live power values straight from the inverter over the LAN."""
+        if not MODBUS_HOST:
+            raise DataMethodNotAvailable("No MODBUS_HOST configured.")
+        try:
+            power = self.modbus.read_power()
+        except (ModbusError, OSError) as ex:
+            raise DataMethodNotAvailable(f"Modbus read failed: {ex}")
+
+        result = {
+            'production': power['production'],
+            'consumption': power['consumption'],
+            'import': None,
+            'export': None,
+        }
+        self.update_power_with_status(result)
+
+        result['grid'] = power['grid']
+        result[result['direction']] = power['grid']
+        return result
+
+    @property
+    def client(self):
+        """Return the shared SolarEdge API client."""
+        return get_client(
+            connect_timeout=HTTP_CONNECT_TIMEOUT_SECS,
+            read_timeout=HTTP_READ_TIMEOUT_SECS,
+            retries=HTTP_RETRIES,
+        )
 
     def get_solaredge_day_summary(self):
         """Get the summary of the day (up to now) from SolarEdge API."""
+        now = self.clock.now()
         try:
-            url = f"{SOLAREDGE_SITE_API}energyDetails.json"
-            params = {
-                'api_key': API_KEY,
-                'startTime': datetime.now().strftime('%Y-%m-%d 00:00:00'),
-                'endTime': (
-                    datetime.now() + timedelta(hours=1)
-                ).strftime('%Y-%m-%d %H:00:00'),
-                'timeUnit': 'HOUR',
+            data = self.client.get_energy_details(
+                self.site_id, self.api_key, ledger=self.scheduler.ledger,
+                start=now.replace(hour=0, minute=0, second=0, microsecond=0),
+                end=(now + timedelta(hours=1)).replace(
+                    minute=0, second=0, microsecond=0
+                ),
+            )
+            meters = {
+                meter['type']: meter['values']
+                for meter in data['energyDetails']['meters']
             }
-            response = requests.get(url, params=params)
-            result = {}
-            if response.status_code == 200:
-                data = response.json()
-                meters = {
-                    meter['type']: meter['values']
-                    for meter in data['energyDetails']['meters']
-                }
-                for meter, values in meters.items():
-                    result[meter] = sum([
-                        hour.get('value', 0)
-                        for hour in values
-                    ])
-                return result
-            else:
-                raise DataMethodNotAvailable(
-                    f"SolarEdge API returned {response.status_code} status."
-                )
-        except requests.exceptions.ConnectionError:
-            raise DataMethodNotAvailable("SolarEdge API not reachable.")
+        except SolarEdgeError as ex:
+            raise DataMethodNotAvailable(str(ex))
         except KeyError:
             raise DataMethodNotAvailable("Unexpected response data.")
 
+        result = {}
+        for meter, values in meters.items():
+            result[meter] = sum([
+                hour.get('value', 0)
+                for hour in values
+            ])
+        return result
+
     def get_solaredge_power_with_status(self):
         """Get live power values from SolarEdge API.
 
@@ -243,40 +502,35 @@ class SolarLights:
         }
         """
         try:
-            url = f"{SOLAREDGE_SITE_API}currentPowerFlow.json?api_key={API_KEY}"
-            response = requests.get(url)
-            result = {
-                'production': None,
-                'consumption': None,
-                'import': None,
-                'export': None,
-            }
-            if response.status_code == 200:
-                packet = response.json()['siteCurrentPowerFlow']
-                production = packet['PV']['currentPower']
-                consumption = packet['LOAD']['currentPower']
-                grid = packet['GRID']['currentPower']
-
-                result['production'] = production
-                result['consumption'] = consumption
+            packet = self.client.get_current_power_flow(
+                self.site_id, self.api_key, ledger=self.scheduler.ledger
+            )
+            packet = packet['siteCurrentPowerFlow']
+            production = packet['PV']['currentPower']
+            consumption = packet['LOAD']['currentPower']
+            grid = packet['GRID']['currentPower']
+        except SolarEdgeError as ex:
+            raise DataMethodNotAvailable(str(ex))
+        except KeyError:
+            raise DataMethodNotAvailable("Unexpected response data.")
 
-                self.update_power_with_status(result)
+        result = {
+            'production': production,
+            'consumption': consumption,
+            'import': None,
+            'export': None,
+        }
+        self.update_power_with_status(result)
 
-                result['grid'] = grid
-                result[result['direction']] = grid
+        result['grid'] = grid
+        result[result['direction']] = grid
 
-                return result
-            else:
-                raise DataMethodNotAvailable(
-                    f"SolarEdge API returned {response.status_code} status."
-                )
-        except requests.exceptions.ConnectionError:
-            raise DataMethodNotAvailable("SolarEdge API not reachable.")
+        return result
 
     def get_static_power_from_csv(self):
         """Get power from CSV file."""
         try:
-            with open('data.csv', 'r') as fp:
+            with open(self.get_site_path('data.csv'), 'r') as fp:
                 lines = fp.readlines()
                 keys = lines[0].strip().split(',')
                 vals = [float(val.strip()) for val in lines[1].split(',')]
@@ -287,7 +541,8 @@ class SolarLights:
 
     def get_mock_power_with_status(self, prod=None, cons=None):
         """Just make something up."""
-        prod = prod or random.randint(0, int(10 * CAPACITY)) / 10.
+        capacity = self.settings.CAPACITY
+        prod = prod or random.randint(0, int(10 * capacity)) / 10.
         cons = cons or (random.randint(0, 10 * 5) / 10.) + 0.1
         result = {
             'production': prod,
@@ -303,25 +558,32 @@ class SolarLights:
         result[result['direction']] = grid
         return result
 
+    @property
+    def sources(self):
+        """Return the chain of enabled data sources, in preference order."""
+        if self._sources is None:
+            sources = []
+            if self.with_modbus:
+                sources.append(('modbus', self.get_modbus_power_with_status))
+            if self.with_solaredge:
+                sources.append(
+                    ('solaredge', self.get_solaredge_power_with_status)
+                )
+            if self.with_csv:
+                sources.append(('csv', self.get_static_power_from_csv))
+            if self.with_mock:
+                sources.append(('mock', self.get_mock_power_with_status))
+            self._sources = SourceChain(
+                sources, errors=(DataMethodNotAvailable,)
+            )
+        return self._sources
+
     def get_live_power_with_status(self):
         """Get power/status dict."""
-        result = None
-        methods = []
-        if self.with_modbus:
-            methods.append(self.get_modbus_power_with_status)
-        if self.with_solaredge:
-            methods.append(self.get_solaredge_power_with_status)
-        if self.with_csv:
-            methods.append(self.get_static_power_from_csv)
-        if self.with_mock:
-            methods.append(self.get_mock_power_with_status)
-        methods.reverse()
-        while result is None and len(methods):
-            method = methods.pop()
-            try:
-                result = method()
-            except DataMethodNotAvailable:
-                continue
+        source, result = self.sources.get()
+        if result is not None:
+            self._data_source = source
+        self.stats['sources'] = self.sources.get_stats()
         LOG.debug("Data updated!")
         return result
 
@@ -330,9 +592,9 @@ class SolarLights:
         light_secs = self.get_daylight_seconds()
         on_time_secs = self.get_on_seconds()
         dark_secs = on_time_secs - light_secs
-        day_portion = int(API_QUERY_LIMIT * 0.95)
+        day_portion = int(self.api_limit * 0.95)
         # Night portion is -2: one for Summary request, and one for safety...
-        night_portion = API_QUERY_LIMIT - day_portion - 2
+        night_portion = self.api_limit - day_portion - 2
         refresh_day = int(light_secs / day_portion)
         refresh_night = int(dark_secs / night_portion)
 
@@ -342,325 +604,713 @@ class SolarLights:
             refresh = refresh_night
         return refresh
 
+    @property
+    def scheduler(self):
+        """Return the scheduler that paces API calls to the daily budget."""
+        if self._scheduler is None:
+            self._scheduler = ApiScheduler(
+                ApiLedger(
+                    self.get_site_path(API_LEDGER_PATH), now=self.clock.time()
+                ),
+                self.api_limit
+            )
+        return self._scheduler
+
+    def get_update_weight(self, when=None):
+        """Return how much a fresh reading is worth (1 is average).
+
+        That's now, or at a later epoch time when, for budgeting.
+        """
+        now = self.clock.time() if when is None else when
+        if self.settings.OFF_TIMES and self.is_off_at(now):
+            return 0.1
+        if not self.almanac.is_daylight(now):
+            return 0.25
+        sunrise, _, sunset = self.almanac.get_sun(now)
+        to_edge = min(abs(now - sunrise), abs(sunset - now))
+        if to_edge < RAMP_SECS:
+            return 2.
+        if when is not None:
+            # There's no telling how fast production will change then.
+            return 1.
+        # Flat plateaus get fewer calls, fast-changing production more.
+        return 0.75 + min(
+            1.25, 10 * self._production_change / self.settings.CAPACITY
+        )
+
     def set_next_update(self):
         """Figure out when we can next update, set it."""
-        if self._next_update and self._next_update > datetime.utcnow():
+        if self._next_update and self._next_update > self.clock.utcnow():
             return
 
         if self._next_update is None:
-            self._next_update = datetime.utcnow().replace(microsecond=0)
+            self._next_update = self.clock.utcnow().replace(microsecond=0)
+            if self.with_solaredge:
+                # Don't let a crash/restart loop burn through the budget.
+                self._next_update = datetime.utcfromtimestamp(
+                    self.scheduler.get_earliest(self.clock.time())
+                ).replace(microsecond=0)
             return
 
-        refresh = self.get_refresh_interval()
+        if self._data_source == 'modbus':
+            # Local readings aren't rationed, just poll.
+            self._next_update = self.clock.utcnow() + timedelta(
+                seconds=MODBUS_POLL_SECS
+            )
+            self._refresh_secs = MODBUS_POLL_SECS
+            return
+
+        if self.with_solaredge:
+            now = self.clock.time()
+            refresh = self.scheduler.next_interval(
+                self.get_update_weight(), now=now,
+                get_weight=self.get_update_weight
+            )
+            self.stats['api_calls_today'] = self.scheduler.ledger.count(now)
+        else:
+            refresh = self.get_refresh_interval()
 
         self._next_update = (
-            datetime.utcnow() + timedelta(seconds=refresh)
+            self.clock.utcnow() + timedelta(seconds=refresh)
         ).replace(microsecond=0)
+        self._refresh_secs = refresh
         LOG.info(f'Refresh in {refresh} seconds at {self._next_update}...')
 
+    def warm_start(self):
+        """Publish the cached responses, if any, and defer fetching them."""
+        if self.cache is None:
+            return
+        now = self.clock.time()
+        cached_data = self.cache.get(
+            'power', max_age=CACHE_MAX_AGE_SECS, now=now
+        )
+        cached_summary = self.cache.get('summary', now=now)
+        data = summary = fetched_at = None
+        if cached_data is not None:
+            data, saved_at, expires_at = cached_data
+            fetched_at = datetime.utcfromtimestamp(saved_at)
+            if expires_at > now:
+                self._next_update = datetime.utcfromtimestamp(
+                    expires_at
+                ).replace(microsecond=0)
+            LOG.info(f"Warm start from data cached at {fetched_at}.")
+        if cached_summary is not None and cached_summary[2] > now:
+            summary = cached_summary[0]
+        self.publish(Snapshot(data, summary, fetched_at, None))
+
+    def save_to_cache(self, data, previous):
+        """Remember a fresh API reading for the next start."""
+        if self.cache is None:
+            return
+        api_data = self._data_source == 'solaredge'
+        if api_data and data is not previous.data:
+            self.cache.put(
+                'power', data, self._refresh_secs, now=self.clock.time()
+            )
+
+    def save_summary_to_cache(self, summary):
+        """Remember an API day summary, good until local midnight."""
+        if self.cache is None:
+            return
+        now = self.clock.now()
+        midnight = datetime.combine(
+            now.date() + timedelta(days=1), datetime.min.time()
+        )
+        self.cache.put(
+            'summary', summary, (midnight - now).total_seconds(),
+            now=self.clock.time()
+        )
+
+    def seed_energy(self):
+        """Catch the energy totals up with today's stored readings."""
+        if self.history is None:
+            return
+        midnight = datetime.combine(
+            self.clock.now().date(), datetime.min.time()
+        )
+        self.energy.replay(
+            self.history.get_range(midnight.timestamp(), self.clock.time())
+        )
+
+    def get_local_day_summary(self):
+        """Return the locally integrated day summary, if it's trustworthy."""
+        coverage = self.energy.get_coverage(self.clock.time())
+        summary = self.energy.get_summary()
+        # No production yet means it's a new day; keep last night's.
+        if coverage < SUMMARY_MIN_COVERAGE or not summary['Production']:
+            return None
+        if SUMMARY_RECONCILE and self._reconciled_day != self.energy.day:
+            self._reconciled_day = self.energy.day
+            self.reconcile_day_summary(summary)
+        return summary
+
+    def reconcile_day_summary(self, summary):
+        """Log how far the local day summary is from the API's."""
+        try:
+            api_summary = self.get_solaredge_day_summary()
+        except DataMethodNotAvailable as ex:
+            LOG.warning(f"Couldn't reconcile day summary: {ex}")
+            return
+        drift = {
+            meter: round(summary[meter] - api_summary[meter])
+            for meter in summary
+            if meter in api_summary
+        }
+        self.stats['summary_drift_wh'] = drift
+        LOG.info(f"Local day summary drift from API (Wh): {drift}")
+
+    def get_seconds_until_update(self):
+        """Return how long until the next update is due."""
+        if self._next_update is None:
+            return 0
+        return (self._next_update - self.clock.utcnow()).total_seconds()
+
     def update_data(self):
-        """If the time is right, update the data."""
+        """If the time is right, update the data and publish a snapshot."""
         if self._next_update is None:
             return
 
-        if self._next_update <= datetime.utcnow():
+        if self._next_update <= self.clock.utcnow():
             LOG.debug("Updating data...")
-            self._data = self.get_live_power_with_status()
-            LOG.debug(f"Data: {self._data}")
-            with open('data.csv', 'w') as fp:
-                fp.write('prod,cons\n')
-                fp.write(
-                    f'{self._data["production"]},{self._data["consumption"]}\n'
-                )
+            started = self.clock.monotonic()
+            previous = self._snapshot
+            data = self.get_live_power_with_status()
+            self.stats['fetches'] += 1
+            if data is None:
+                self.stats['fetch_failures'] += 1
+                LOG.warning("No data source available, keeping last data.")
+                data = previous.data
+            else:
+                LOG.debug(f"Data: {data}")
+                if previous.data is not None:
+                    self._production_change = abs(
+                        data['production'] - previous.data['production']
+                    )
+                now = self.clock.time()
+                self.energy.add(now, data['production'], data['consumption'])
+                if self.nowcast is not None:
+                    self.nowcast.observe(
+                        now, data['production'], data['consumption']
+                    )
+                    self.stats['nowcast'] = self.nowcast.stats
+                if self.history is not None:
+                    self.history.append(data, when=now)
+
+            summary = previous.summary
+            local_summary = None
+            if not self.is_daylight:
+                local_summary = self.get_local_day_summary()
 
             if self.is_daylight:
-                self._summary = None
-            elif self._summary is None:
+                summary = None
+            elif local_summary is not None:
+                summary = local_summary
+            elif summary is None:
                 LOG.info("Getting summary data...")
                 # Only do this once so API request limit not reached...
-                self._summary = self.get_solaredge_day_summary()
-                LOG.info(f"Data: {self._summary}")
-
-    def render_with_html(self):
-        """Use HTML to render the lights."""
-        pixel_markup = ""
-        prop = int(100. / len(self.pixels)) - 2
-        for ix in range(len(self.pixels)):
-            pixel_markup += (
-                '<div style="background-color: rgb(' +
-                ', '.join([str(col) for col in self.pixels[ix]]) +
-                '); display: inline-block; ' +
-                f'width: {prop}%; height: {prop}%; ' +
-                'border: solid #333 1px;"></div>'
+                try:
+                    summary = self.get_solaredge_day_summary()
+                    LOG.info(f"Data: {summary}")
+                    self.save_summary_to_cache(summary)
+                except DataMethodNotAvailable as ex:
+                    LOG.warning(f"No summary yet: {ex}")
+
+            self.save_to_cache(data, previous)
+            latency = self.clock.monotonic() - started
+            self.stats['fetch_latency_secs'] = round(latency, 3)
+            if self.with_solaredge:
+                self.stats['http'] = self.client.stats
+            self.publish(Snapshot(data, summary, self.clock.utcnow(), latency))
+
+    def publish(self, snapshot):
+        """Hand a snapshot to the render loop, and any displays following."""
+        for lights in [self] + self.followers:
+            lights._snapshot = snapshot
+            lights._wake.set()
+
+    def apply_snapshot(self):
+        """Take the latest published snapshot as the data to render."""
+        snapshot = self._snapshot
+        self._data = snapshot.data
+        self._summary = snapshot.summary
+        if self.nowcast is not None and snapshot.data is not None:
+            self._data = self.get_nowcast_data(snapshot)
+
+    def get_nowcast_data(self, snapshot):
+        """Return the snapshot's data moved on to an estimate for now.
+
+        The estimate only steps every NOWCAST_STEP_SECS, and the same
+        dict is handed back while it doesn't change, so the frames drawn
+        from it can be reused.
+        """
+        step = int(self.clock.time() // NOWCAST_STEP_SECS)
+        key = (step, id(snapshot))
+        if key != self._nowcast_key:
+            production, consumption = self.nowcast.predict(
+                step * NOWCAST_STEP_SECS
             )
-
-        with open('lights.html', 'w') as fp:
-            fp.write("""
-            <html><head></head>
-            <body style="background-color: black; color: white;">
-            <script>
-            window.setTimeout(function(){window.location=location.href}, """ +
-            str(REFRESH_RATE_SECS * 15000) + """);
-            </script>
-            """ + pixel_markup +
-            f"<p>Date: {datetime.utcnow().isoformat()}</p>" +
-            f"<p>Data: {self._data}</p>" +
-            f"<p>Summary: {self._summary}</p>" +
-            f"<p>Pixels: {self.pixels}</p>"
-            "</body></html>")
-
-    def render_with_blinkt(self):
-        """Use the blink API to render the lights."""
-        if not self._with_blink:
-            return
-
-        try:
-            from blinkt import clear, set_pixel, show, set_brightness
-            clear()
-            set_brightness(0.5 if self.is_daylight else 0.05)
-
-            dim = 0.01 if self.should_dim else 1
-            off = 0 if self.should_off else 1
-            for ix in range(len(self.pixels)):
-                set_pixel(
-                    ix,
-                    *[int(val * dim * off) for val in self.pixels[ix]]
-                )
-            show()
-        except ImportError:
-            raise RenderMethodFailed("No blinkt!")
-
-    def render_with_pygame(self):
-        """Use pygame to simulate hardware."""
-        if not self._with_pygame:
-            return
-
-        try:
-            import pygame
-            if self._pygame_display is None:
-                pygame.init()
-                self._pygame_display = pygame.display.set_mode(
-                    (500, 400), 0, 32
-                )
-            for ix, pixel in enumerate(self.pixels):
-                pygame.draw.rect(
-                    self._pygame_display,
-                    pixel,
-                    (ix * 50, 0, 50, 50)
-                )
-            pygame.display.update()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    self.cleanup()
-        except Exception as ex:
-            raise RenderMethodFailed(f"Pygame render failed... {ex}")
+            data = snapshot.data
+            if production is not None:
+                data = dict(data)
+                data['production'] = round(production, 3)
+                data['consumption'] = round(consumption, 3)
+                self.update_power_with_status(data)
+                data['grid'] = abs(production - consumption)
+                data['import'] = data['export'] = None
+                data[data['direction']] = data['grid']
+            if data == self._nowcast_data:
+                data = self._nowcast_data
+            self._nowcast_key = key
+            self._nowcast_data = data
+        return self._nowcast_data
 
     @property
     def flash_percent(self):
         """Return percent of flash depending on render count."""
         max_ = float(self._pulse_max_renders)
-        return (self._render_count % max_ + 1) / max_
+        return (self._step % max_ + 1) / max_
 
     @property
     def pulse_percent(self):
         """Return percent of pulse depending on render count."""
         max_ = float(self._pulse_max_renders)
-        return (self._render_count % max_ + 1) / max_
+        return (self._step % max_ + 1) / max_
+
+    def update_output(self):
+        """Work out the frame as it'll be shown: dimmed, or off."""
+        scale = (0.01 if self.should_dim else 1) * (
+            0 if self.should_off else 1
+        )
+        table = self._scale_tables.get(scale)
+        if table is None:
+            table = bytes(int(value * scale) for value in range(256))
+            self._scale_tables[scale] = table
+        self.output.data[:] = self.frame.data.translate(table)
+        self._brightness = 0.5 if self.is_daylight else 0.05
+
+    @property
+    def outputs(self):
+        """Return an Output per renderer, started on first use."""
+        if self._outputs is None:
+            names = ['html']
+            if self._with_blink:
+                names.append('blinkt')
+            if self._with_pygame:
+                names.append('pygame')
+            names.extend(self.renderer_names)
+            self._outputs = []
+            for name in names:
+                try:
+                    renderer = get_renderer_class(name)(self)
+                except Exception:
+                    LOG.exception(f"Failed to load renderer {name}.")
+                    continue
+                output = Output(renderer, fps=RENDERER_FPS.get(name))
+                output.start()
+                self._outputs.append(output)
+                self.stats['renderers'][name] = output.stats
+        return self._outputs
 
     def render(self):
-        """Render somehow (HTML, Blinkt, etc.)."""
-        for method in [
-            self.render_with_html,
-            self.render_with_blinkt,
-            self.render_with_pygame,
-        ]:
-            try:
-                method()
-            except RenderMethodFailed:
-                LOG.error(f"Method {method.__name__} failed.")
+        """Render somehow (HTML, Blinkt, etc.), if the lights changed.
+
+        The same Frame is handed over until the output, or the data
+        behind it, changes, so the renderers can tell it's one they've
+        already shown. New data still gets out while the lights are off.
+        """
+        self.update_output()
+        frame = self._last_frame
+        if (
+            frame is None or
+            frame.brightness != self._brightness or
+            frame.output != self.output.data or
+            frame.data is not self._data or
+            frame.summary is not self._summary
+        ):
+            frame = Frame(
+                bytes(self.frame.data), bytes(self.output.data),
+                self._brightness, self._data, self._summary
+            )
+            self._last_frame = frame
+            if self.shared is not None:
+                self.shared.write(
+                    frame, self.is_daylight, self.get_shared_stats()
+                )
+        for output in self.outputs:
+            output.submit(frame)
+            output.poll()
         self._render_count += 1
         LOG.debug("Rendered!")
 
-    def get_indicator_pixels(self):
-        """Return pixel colour for "trinary" directional indicator."""
-        self.help.append((
-            'Indicator',
-            'Direction indicator - either import, export or balanced '
-            'self-consumption',
-            1
-        ))
-        pct = self.flash_percent if self.is_daylight else 1
-        return [
-            [
-                int(val * pct) for val in {
-                    'import': IMPORT_COLOUR,
-                    'export': EXPORT_COLOUR,
-                    'neutral': NEUTRAL_COLOUR,
-                }[self._data['direction']]
-            ]
-        ]
-
-    def get_tilt_pixels(self):
-        """Return pixel colour for the "tilt" toward export/import/balance."""
-        self.help.append((
-            'Tilt',
-            '(Flashing) This shows the "tilt" away from balanced '
-            'self-consumption, if the direction '
-            'indicator shows import or export and this light is closer in '
-            'colour to the direction indicator light than the self-consumption '
-            'colour, then you are mostly importing or exporting, if it is '
-            'closer to the self-consumption colour then you\'re mostly '
-            'self-consuming!',
-            1
-        ))
+    def get_shared_stats(self):
+        """Return the timing stats to share along with each frame."""
+        snapshot = self._snapshot
+        stats = dict(
+            self.animator.stats, fetch_latency_secs=snapshot.latency
+        )
+        if snapshot.fetched_at is not None:
+            stats['fetched_at'] = snapshot.fetched_at.replace(
+                tzinfo=timezone.utc
+            ).timestamp()
+        return stats
+
+    def get_direction_colour(self):
+        """Return the colour for importing, exporting or neither."""
+        direction = self._data['direction']
+        if direction == 'import':
+            return self.settings.IMPORT_COLOUR
+        if direction == 'export':
+            return self.settings.EXPORT_COLOUR
+        return self.settings.NEUTRAL_COLOUR
+
+    def get_tilt(self):
+        """Return (colour, pct) of the "tilt" away from self-consumption."""
         grid = self._data['grid']
         cons = self._data['consumption']
         prod = self._data['production']
 
-        all_imp = IMPORT_COLOUR
-        all_exp = EXPORT_COLOUR
-        all_cons = NEUTRAL_COLOUR
-
-        c1 = all_cons
-
-        pct = grid / cons
-        c2 = all_imp
         if prod > cons:
-            pct = grid / prod
-            c2 = all_exp
-
-        pixel = self.blend_pixel(c1, c2, pct)
-        return [pixel]
-
-    def blend_pixel(self, c1, c2, pct):
-        """Simple blend from c1 to c2 by pct."""
-        colour = [
-            round((1 - pct) * c1[0] + pct * c2[0]),
-            round((1 - pct) * c1[1] + pct * c2[1]),
-            round((1 - pct) * c1[2] + pct * c2[2])
-        ]
-        return colour
-
-    def spread_pixels(self, n_pixels: int, full_pixel: list, pct: float):
-        """Spread the full_pixel over n_pixels."""
-        result = []
-        pix_pct = max([0.001, 1. / float(n_pixels)])
-
-        for _ in range(int(n_pixels)):
-            if pct >= pix_pct:
-                result.append(full_pixel)
-                pct -= pix_pct
-            elif pct > 0 and pct < pix_pct:
-                result.append([
-                    int(float(full_pixel[ix]) * (pct / pix_pct))
-                    for ix in range(3)
-                ])
-                pct -= pct
+            return self.settings.EXPORT_COLOUR, grid / prod
+        return self.settings.IMPORT_COLOUR, grid / cons
+
+    def get_production_level(self):
+        """Return production relative to capacity, pulsing."""
+        pct = self._data['production'] / self.settings.CAPACITY
+        return pct * self.pulse_percent
+
+    def get_consumption_level(self):
+        """Return consumption relative to the ideal max, pulsing."""
+        max_power = self.settings.MAX_IDEAL_POWER
+        pct = min(self._data['consumption'] / max_power, 1.)
+        return pct * self.pulse_percent
+
+    def get_self_consumption(self):
+        """Return the day's self-consumed share of production, or None."""
+        total_prod = self._summary['FeedIn'] + self._summary['SelfConsumption']
+        try:
+            return self._summary['SelfConsumption'] / total_prod
+        except ZeroDivisionError:
+            return None
+
+    def get_day_consumption_level(self):
+        """Return the day's consumption relative to the ideal, pulsing."""
+        day_cons = self._summary['Consumption']
+        return min(
+            day_cons / 1000. / float(self.settings.MAX_IDEAL_CONSUMPTION), 1.
+        ) * self.pulse_percent
+
+    def draw_strip(self, layout, daylight):
+        """Draw the display over a long strip, a segment at a time."""
+        settings = self.settings
+        layout.start(daylight)
+        if daylight:
+            layout.fill(
+                'production', settings.PRODUCTION_COLOUR,
+                self.get_production_level()
+            )
+            layout.solid(
+                'indicator', self.get_direction_colour(), self.flash_percent
+            )
+            colour, pct = self.get_tilt()
+            layout.blend('tilt', settings.NEUTRAL_COLOUR, colour, pct)
+        elif self._summary is not None:
+            pct_self = self.get_self_consumption()
+            if pct_self is None:
+                layout.fill(
+                    'summary', settings.IMPORT_COLOUR,
+                    self.get_day_consumption_level()
+                )
             else:
-                result.append([0, 0, 0])
-        return result
-
-    def get_production_percent_pixels(self, multi: float=0) -> list:
-        """Return colour for how 'well' the system is doing relative to capacity."""
-        self.help.append((
-            'Production',
-            f'Production - if fully lit, represents at least {CAPACITY} kWp',
-            multi or 1
-        ))
-        prod = self._data['production']
-        pct = prod / CAPACITY
-        result = []
+                layout.split(
+                    'summary', settings.NEUTRAL_COLOUR, settings.EXPORT_COLOUR,
+                    pct_self
+                )
+        layout.fill(
+            'consumption', settings.CONSUMPTION_COLOUR,
+            self.get_consumption_level(), reverse=True
+        )
+        layout.write()
 
-        pct = pct * self.pulse_percent
+    def draw_indicator(self, frame):
+        """Draw the "trinary" directional indicator."""
+        pct = self.flash_percent if self.is_daylight else 1
+        colour = self.get_direction_colour()
+        frame.put(colour[0] * pct, colour[1] * pct, colour[2] * pct)
+
+    def draw_tilt(self, frame):
+        """Draw the "tilt" toward export/import/balance."""
+        colour, pct = self.get_tilt()
+        frame.blend(self.settings.NEUTRAL_COLOUR, colour, pct)
+
+    def draw_production_percent(self, frame, multi=0):
+        """Draw how 'well' the system is doing relative to capacity."""
+        pct = self.get_production_level()
+        colour = self.settings.PRODUCTION_COLOUR
         if multi:
-            result = self.spread_pixels(multi, PRODUCTION_COLOUR, pct)
+            frame.spread(multi, colour, pct)
         else:
-            result.append([val * pct for val in PRODUCTION_COLOUR])
-        return result
+            frame.put(colour[0] * pct, colour[1] * pct, colour[2] * pct)
 
-    def get_consumption_percent_pixels(self, multi: float=0) -> list:
-        """Return colour for how 'bad' consumption is relative to... avg?..."""
-        self.help.append((
-            'Consumption',
-            f'Energy use - if fully lit, represents at least {MAX_IDEAL_POWER}'
-            ' kW usage (consumption)',
-            multi or 1
-        ))
-        cons = self._data['consumption']
-        pct = min([cons / MAX_IDEAL_POWER, 1.])
-        result = []
-        pct = pct * self.pulse_percent
+    def draw_consumption_percent(self, frame, multi=0):
+        """Draw how 'bad' consumption is relative to... avg?..."""
+        pct = self.get_consumption_level()
+        colour = self.settings.CONSUMPTION_COLOUR
         if multi:
-            result = self.spread_pixels(multi, CONSUMPTION_COLOUR, pct)
+            frame.spread(multi, colour, pct, reverse=True)
         else:
-            result.append([round(col * pct) for col in CONSUMPTION_COLOUR])
-        return reversed(result)
+            frame.put(
+                round(colour[0] * pct),
+                round(colour[1] * pct),
+                round(colour[2] * pct),
+            )
 
-    def get_day_summary_pixels(self, multi=3):
+    def draw_day_summary(self, frame, multi=3):
         """Summarise the day - more export or more self consumption?."""
-        self.help.append((
-            'Day summary',
-            f'Day summary - shows a percentage split between export and self-'
-            'consumption',
-            multi or 1
-        ))
         if self._summary is None:
-            return [self.DARK_PIXEL] * multi
+            frame.skip(multi)
+            return
 
-        total_prod = self._summary['FeedIn'] + self._summary['SelfConsumption']
-        try:
-            pct_self = self._summary['SelfConsumption'] / total_prod
-            pct_export = self._summary['FeedIn'] / total_prod
-        except ZeroDivisionError:
+        settings = self.settings
+        pct_self = self.get_self_consumption()
+        if pct_self is None:
             # No production at all... return red?
-            day_cons = self._summary['Consumption']
-            day_goodness = min([
-                day_cons / 1000. / float(MAX_IDEAL_CONSUMPTION),
-                1.
-            ]) * self.pulse_percent
-            return self.spread_pixels(multi, IMPORT_COLOUR, day_goodness)
-
-        result = []
+            frame.spread(
+                multi, settings.IMPORT_COLOUR, self.get_day_consumption_level()
+            )
+            return
+
+        neutral = settings.NEUTRAL_COLOUR
+        export = settings.EXPORT_COLOUR
         pct_per_pix = 1.0 / float(multi)
         calcd = 0
         while (calcd + pct_per_pix) <= pct_self:
-            result.append(NEUTRAL_COLOUR)
+            frame.put(neutral[0], neutral[1], neutral[2])
             calcd += pct_per_pix
 
-        result.append(
-            self.blend_pixel(EXPORT_COLOUR, NEUTRAL_COLOUR, pct_self)
-        )
+        frame.blend(export, neutral, pct_self)
         calcd += pct_per_pix
 
         while (calcd + pct_per_pix) <= 1:
-            result.append(EXPORT_COLOUR)
+            frame.put(export[0], export[1], export[2])
             calcd += pct_per_pix
 
-        return result
+    def get_indicator_pixels(self):
+        """Return pixel colour for "trinary" directional indicator."""
+        return self._get_drawn(self.draw_indicator)
+
+    def get_tilt_pixels(self):
+        """Return pixel colour for the "tilt" toward export/import/balance."""
+        return self._get_drawn(self.draw_tilt)
+
+    def blend_pixel(self, c1, c2, pct):
+        """Simple blend from c1 to c2 by pct."""
+        frame = FrameBuffer(1)
+        frame.blend(c1, c2, pct)
+        return list(frame.get(0))
+
+    def spread_pixels(self, n_pixels: int, full_pixel: list, pct: float):
+        """Spread the full_pixel over n_pixels."""
+        frame = FrameBuffer(int(n_pixels))
+        frame.spread(n_pixels, full_pixel, pct)
+        return frame.to_lists()
+
+    def get_production_percent_pixels(self, multi: float=0) -> list:
+        """Return colour for how 'well' the system is doing relative to capacity."""
+        return self._get_drawn(self.draw_production_percent, multi)
+
+    def get_consumption_percent_pixels(self, multi: float=0) -> list:
+        """Return colour for how 'bad' consumption is relative to... avg?..."""
+        return self._get_drawn(self.draw_consumption_percent, multi)
+
+    def get_day_summary_pixels(self, multi=3):
+        """Summarise the day - more export or more self consumption?."""
+        return self._get_drawn(self.draw_day_summary, multi)
+
+    def _get_drawn(self, draw, multi=0):
+        """Return what a draw method draws, as a list of [r, g, b]."""
+        frame = FrameBuffer(multi or 1)
+        if multi:
+            draw(frame, multi)
+        else:
+            draw(frame)
+        return frame.to_lists()
+
+    @property
+    def is_animating(self):
+        """Return True if the lights change from frame to frame."""
+        return self._data is not None and not (
+            self.settings.OFF_TIMES and self.should_off
+        )
+
+    def get_daily_times(self):
+        """Return seconds since midnight of each daily display change."""
+        settings = self.settings
+        times = {
+            'dim': settings.dim_secs,
+            'brighten': settings.brighten_secs,
+            'midnight': 0,
+        }
+        if settings.OFF_TIMES:
+            times['off'] = settings.off_secs
+            times['on'] = settings.on_secs
+        return times
+
+    def add_sun_events(self, timeline, now):
+        """Add today's sunrise/sunset, if they're still to come."""
+        sunrise, _, sunset = self.almanac.get_sun(now)
+        for kind, when in (('sunrise', sunrise), ('sunset', sunset)):
+            if when > now:
+                timeline.add(when, kind)
+
+    def build_timeline(self, now):
+        """Return a timeline of everything that changes the display."""
+        timeline = Timeline()
+        for kind, secs in self.get_daily_times().items():
+            timeline.add(get_next_daily(now, secs), kind)
+        self.add_sun_events(timeline, now)
+        timeline.add(now, 'frame')
+        return timeline
+
+    def set_settings(self, settings):
+        """Hand new settings to the render loop; safe from any thread."""
+        self._new_settings = settings
+        self._wake.set()
+
+    def apply_settings(self, settings):
+        """Start using new settings, crossfading to the redrawn lights."""
+        self.settings = settings
+        self.animator.set_timing(
+            settings.REFRESH_RATE_SECS, self.get_animation_fps()
+        )
+        if self.nowcast is not None:
+            self.nowcast.max_production = settings.CAPACITY
+        self._frame_table.reset(None, None, None)
+        self._fade_from = bytes(self.frame.data)
+        self.animator.start_fade()
+        if self._timeline is not None:
+            self._timeline = self.build_timeline(self.clock.time())
+            self._daily_times = self.get_daily_times()
+
+    def get_animation_fps(self):
+        """Return frames per second to draw the animation at."""
+        return ANIMATION_FPS or 1. / self.settings.REFRESH_RATE_SECS
+
+    def reload_settings(self):
+        """Read config.py again soon; safe from a signal handler."""
+        if self._watcher is not None:
+            self._watcher.trigger()
+
+    def start(self, fetch=True, watch=True, share=True):
+        """Get ready to run: warm start, and start fetching in the background.
+
+        fetch=False leaves fetching, and watch=False watching config.py
+        for changes, to someone else (see multisite.py). share=False keeps
+        the lights to this process (see replay.py).
+        """
+        self.warm_start()
+        self.seed_energy()
+        if fetch:
+            self._fetcher = DataFetcher(self)
+            self._fetcher.start()
+        if watch:
+            self._watcher = ConfigWatcher(config.__file__, self.set_settings)
+            self._watcher.start()
+        if share:
+            self.shared = SharedSnapshotFile(
+                self.get_shared_path(), len(self.frame)
+            )
+        self._timeline = self.build_timeline(self.clock.time())
+        self._daily_times = self.get_daily_times()
+
+    def show_first_frame(self):
+        """Start, and show a frame, as --startup-profile measures.
+
+        No fetcher, watcher or shared file: a profile run mustn't spend
+        API calls or take over from lights that are already running.
+        """
+        self.start(fetch=False, watch=False, share=False)
+        self.step()
+
+    def step(self):
+        """Handle due events and show a frame; return when to step next."""
+        settings = self._new_settings
+        if settings is not None and settings is not self.settings:
+            self.apply_settings(settings)
+        timeline = self._timeline
+        now = self.clock.time()
+        for kind in timeline.pop_due(now):
+            if kind == 'midnight':
+                self.add_sun_events(timeline, now)
+            if kind in self._daily_times:
+                timeline.add(
+                    get_next_daily(now, self._daily_times[kind]), kind
+                )
+            if kind == 'frame':
+                self.animator.record_frame()
+
+        self.apply_snapshot()
+        self._step = self.animator.get_step()
+        self.update_frame()
+        self.render()
+        self.stats['wakeups'] += 1
+
+        if self.is_animating and not timeline.has('frame'):
+            timeline.add(
+                self.clock.time() + self.animator.get_delay(), 'frame'
+            )
+        return timeline.get_next_time()
 
     def run(self):
-        """Start the process."""
-        self.set_next_update()
+        """Start the process.
+
+        Rather than waking every frame, sleep until the next event: a
+        daily dim/off/sun change, new data from the fetcher, or the next
+        frame, which is only scheduled while animating. The animation
+        step comes from the clock, so a slow pass drops frames rather
+        than slowing the animation.
+        """
+        self.start()
         while self._running:
-            self.update_data()
-            self.set_next_update()
-            pixels = self.get_pixels()
-            self.set_pixels(pixels, 0, clear=True)
-            self.render()
-            time.sleep(REFRESH_RATE_SECS)
+            next_time = self.step()
+            self.clock.wait(self._wake, max(next_time - self.clock.time(), 0))
+            self._wake.clear()
         return self._running
 
+    def get_site_path(self, path):
+        """Return path, or a per-site variant for sites other than config's."""
+        if self.site_id == SITE_ID:
+            return path
+        root, ext = os.path.splitext(path)
+        return f'{root}-{self.site_id}{ext}'
+
+    def get_shared_path(self):
+        """Return where to share the lights; per display, if named."""
+        path = SHARED_PATH or get_default_path()
+        if self.name is None:
+            return self.get_site_path(path)
+        root, ext = os.path.splitext(path)
+        return f'{root}-{self.name}{ext}'
+
     def cleanup(self):
         """Clear any states..."""
         self._running = False
-        if self._with_blink:
-            try:
-                from blinkt import clear, show
-                clear()
-                show()
-            except:
-                LOG.exception("Failed to cleanup Blinkt.")
+        self._wake.set()
+        if self._fetcher is not None:
+            self._fetcher.stop(timeout=1)
+        if self._watcher is not None:
+            self._watcher.stop(timeout=1)
+            self._watcher = None
+        if self._modbus is not None:
+            self._modbus.client.close()
+        if self.history is not None:
+            self.history.close()
+        if self._outputs is not None:
+            for output in self._outputs:
+                output.close()
+            self._outputs = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
 
 
 if __name__ == '__main__':
@@ -675,26 +1325,52 @@ if __name__ == '__main__':
         default=False,
         help="Don't do a render with Blinkt"
     )
+    parser.add_argument(
+        "-m", "--with-modbus", action="store_true",
+        default=False,
+        help="Read from the inverter over Modbus TCP first (needs MODBUS_HOST)"
+    )
     parser.add_argument(
         '-w', '--wait', action="store", type=int,
         help="Wait n seconds before starting ("
         "helps with clock/connection issues)"
     )
+    parser.add_argument(
+        "--startup-profile", action="store_true",
+        default=False,
+        help="Log startup time and memory up to the first frame, then exit"
+    )
     args = parser.parse_args()
+    if args.startup_profile:
+        from startup import log_report
+        log_report(LOG, 'imported')
     if args.wait:
         LOG.info(f'Waiting {args.wait} seconds before starting...')
         time.sleep(int(args.wait))
 
     controller = SolarLights(
         with_blinkt=not args.no_blinkt,
-        with_pygame=args.with_pygame
+        with_pygame=args.with_pygame,
+        with_modbus=args.with_modbus,
+        with_cache=True,
+        with_history=True,
+        with_nowcast=True,
     )
+    if args.startup_profile:
+        controller.show_first_frame()
+        log_report(LOG, 'first frame')
+        controller.cleanup()
+        sys.exit(0)
 
     def signal_term_handler(signal, frame):
         """Handle exit gracefully..."""
         LOG.info(f"Got signal {signal}, aborting...")
         sys.exit(0)
     signal.signal(signal.SIGTERM, signal_term_handler)
+    # `kill -HUP` re-reads config.py at once, rather than within a second.
+    signal.signal(
+        signal.SIGHUP, lambda signum, frame: controller.reload_settings()
+    )
 
     interrupted = False
     while not interrupted:
@@ -0,0 +1,376 @@
+"""Outputs for the lights: HTML, Blinkt, pygame and any plugins.
+
+Plugins register a Renderer subclass under the `solar_lights.renderers`
+entry point group, e.g. in their setup.cfg:
+
+    [options.entry_points]
+    solar_lights.renderers =
+        mqtt = solar_lights_mqtt:MqttRenderer
+
+and are turned on by listing their name in RENDERERS in config.py.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import config
+
+LOG = logging.getLogger('solar-lights')
+
+ENTRY_POINT_GROUP = 'solar_lights.renderers'
+
+# What a renderer is given to show. pixels are the RGB bytes as drawn,
+# output the same dimmed (or turned off) as the LEDs should show them.
+Frame = namedtuple(
+    'Frame', ['pixels', 'output', 'brightness', 'data', 'summary']
+)
+
+
+class RenderMethodFailed(Exception):
+    """Raised when render fails for some reason."""
+
+
+class Renderer:
+    """An output for the lights.
+
+    setup() is called once, before the first frame, and show() for each
+    frame that differs from the last; either can raise RenderMethodFailed
+    to have the renderer backed off and retried later. Renderers run on
+    their own thread unless `threaded` is False, in which case they run
+    in the render loop and poll() is called every frame. `fps` limits
+    how often frames are shown, or None for every frame.
+    """
+
+    name = None
+    fps = None
+    threaded = True
+
+    def __init__(self, lights):
+        """Set up for a SolarLights."""
+        self.lights = lights
+
+    def setup(self):
+        """Get ready to show frames."""
+
+    def show(self, frame):
+        """Show a frame."""
+        raise NotImplementedError
+
+    def poll(self):
+        """Do any per-frame housekeeping (render loop renderers only)."""
+
+    def close(self):
+        """Tidy up."""
+
+
+class HtmlRenderer(Renderer):
+    """Write the lights, and what's behind them, to an HTML page."""
+
+    name = 'html'
+    fps = 1
+
+    def show(self, frame):
+        """Write the page."""
+        pixels = frame.pixels
+        n_pixels = len(pixels) // 3
+        refresh_secs = self.lights.settings.REFRESH_RATE_SECS
+        pixel_markup = ""
+        prop = max(int(100. / n_pixels) - 2, 0.25)
+        for ix in range(n_pixels):
+            red, green, blue = pixels[ix * 3:ix * 3 + 3]
+            pixel_markup += (
+                f'<div style="background-color: rgb({red}, {green}, {blue}); '
+                'display: inline-block; ' +
+                f'width: {prop}%; height: {prop}%; ' +
+                'border: solid #333 1px;"></div>'
+            )
+        pixel_lists = [
+            list(pixels[ix * 3:ix * 3 + 3]) for ix in range(n_pixels)
+        ]
+
+        with open(self.lights.html_path, 'w') as fp:
+            fp.write("""
+            <html><head></head>
+            <body style="background-color: black; color: white;">
+            <script>
+            window.setTimeout(function(){window.location=location.href}, """ +
+            str(refresh_secs * 15000) + """);
+            </script>
+            """ + pixel_markup +
+            f"<p>Date: {datetime.utcnow().isoformat()}</p>" +
+            f"<p>Data: {frame.data}</p>" +
+            f"<p>Summary: {frame.summary}</p>" +
+            f"<p>Stats: {self.lights.stats}</p>" +
+            f"<p>Pixels: {pixel_lists}</p>"
+            "</body></html>")
+
+
+class BlinktRenderer(Renderer):
+    """Show the lights on a Pimoroni Blinkt."""
+
+    name = 'blinkt'
+
+    def setup(self):
+        """Import the Blinkt library."""
+        try:
+            import blinkt
+        except ImportError:
+            raise RenderMethodFailed("No blinkt!")
+        self.blinkt = blinkt
+
+    def show(self, frame):
+        """Send the dimmed frame to the LEDs."""
+        blinkt = self.blinkt
+        blinkt.clear()
+        blinkt.set_brightness(frame.brightness)
+        output = frame.output
+        n_pixels = min(len(output) // 3, self.blinkt.NUM_PIXELS)
+        for ix in range(n_pixels):
+            offset = ix * 3
+            blinkt.set_pixel(
+                ix, output[offset], output[offset + 1], output[offset + 2]
+            )
+        blinkt.show()
+
+    def close(self):
+        """Turn the LEDs off."""
+        try:
+            self.blinkt.clear()
+            self.blinkt.show()
+        except Exception:
+            LOG.exception("Failed to cleanup Blinkt.")
+
+
+class PygameRenderer(Renderer):
+    """Simulate the hardware in a pygame window."""
+
+    name = 'pygame'
+    threaded = False
+
+    def setup(self):
+        """Open the window."""
+        try:
+            import pygame
+            pygame.init()
+            self.display = pygame.display.set_mode((500, 400), 0, 32)
+        except Exception as ex:
+            raise RenderMethodFailed(f"Pygame setup failed... {ex}")
+        self.pygame = pygame
+
+    def show(self, frame):
+        """Draw the frame."""
+        try:
+            pixels = frame.pixels
+            n_pixels = len(pixels) // 3
+            width = max(min(50, 500 // n_pixels), 1)
+            for ix in range(n_pixels):
+                self.pygame.draw.rect(
+                    self.display,
+                    tuple(pixels[ix * 3:ix * 3 + 3]),
+                    (ix * width, 0, width, 50)
+                )
+            self.pygame.display.update()
+        except Exception as ex:
+            raise RenderMethodFailed(f"Pygame render failed... {ex}")
+
+    def poll(self):
+        """Handle window events, even when nothing is redrawn."""
+        for event in self.pygame.event.get():
+            if event.type == self.pygame.QUIT:
+                self.pygame.quit()
+                self.lights.cleanup()
+
+
+class Ws281xRenderer(Renderer):
+    """Show the lights on a WS281x (NeoPixel) strip, via rpi_ws281x."""
+
+    name = 'ws281x'
+
+    def setup(self):
+        """Start driving the strip."""
+        try:
+            from rpi_ws281x import PixelStrip
+        except ImportError:
+            raise RenderMethodFailed("No rpi_ws281x!")
+        self.strip = PixelStrip(
+            len(self.lights.output), getattr(config, 'WS281X_PIN', 18)
+        )
+        try:
+            self.strip.begin()
+        except RuntimeError as ex:
+            raise RenderMethodFailed(f"WS281x setup failed... {ex}")
+
+    def show(self, frame):
+        """Send the dimmed frame to the strip."""
+        strip = self.strip
+        strip.setBrightness(int(frame.brightness * 255))
+        output = frame.output
+        for ix in range(min(len(output) // 3, strip.numPixels())):
+            offset = ix * 3
+            strip.setPixelColorRGB(
+                ix, output[offset], output[offset + 1], output[offset + 2]
+            )
+        strip.show()
+
+    def close(self):
+        """Turn the strip off."""
+        try:
+            for ix in range(self.strip.numPixels()):
+                self.strip.setPixelColorRGB(ix, 0, 0, 0)
+            self.strip.show()
+        except Exception:
+            LOG.exception("Failed to cleanup WS281x strip.")
+
+
+RENDERERS = {
+    renderer.name: renderer
+    for renderer in (
+        HtmlRenderer, BlinktRenderer, PygameRenderer, Ws281xRenderer
+    )
+}
+
+
+def get_renderer_class(name):
+    """Return the built in or plugin Renderer class called name."""
+    if name in RENDERERS:
+        return RENDERERS[name]
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        group = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        # Python 3.8 and 3.9 return a dict of groups.
+        group = eps.get(ENTRY_POINT_GROUP, [])
+    for entry_point in group:
+        if entry_point.name == name:
+            return entry_point.load()
+    raise KeyError(f"No renderer called {name}.")
+
+
+class Output:
+    """Feed frames to one renderer at its own rate, backing off failures.
+
+    Only the latest frame matters: one that arrives before the previous
+    was shown replaces it (and counts as dropped). A frame that's the
+    same as the last one submitted counts as skipped.
+    """
+
+    def __init__(
+        self, renderer, fps=None, backoff_secs=1, max_backoff_secs=300,
+        clock=time.monotonic
+    ):
+        """Set up; fps overrides the renderer's own."""
+        self.renderer = renderer
+        fps = fps if fps is not None else renderer.fps
+        self.frame_secs = 1. / fps if fps else 0
+        self.backoff_secs = backoff_secs
+        self.max_backoff_secs = max_backoff_secs
+        self.clock = clock
+        self.stats = {
+            'pushed': 0,
+            'skipped': 0,
+            'dropped': 0,
+            'failures': 0,
+            'backoff_secs': 0,
+        }
+        self._latest = None
+        self._pending = None
+        self._ready = False
+        self._failures = 0
+        self._next_push = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = None
+
+    @property
+    def name(self):
+        """Return the renderer's name."""
+        return self.renderer.name
+
+    def start(self):
+        """Start the renderer's thread, if it has one."""
+        if self.renderer.threaded and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name=f'render-{self.name}', daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, frame):
+        """Hand over the latest frame."""
+        if frame is self._latest:
+            self.stats['skipped'] += 1
+            return
+        self._latest = frame
+        with self._lock:
+            if self._pending is not None:
+                self.stats['dropped'] += 1
+            self._pending = frame
+        self._wake.set()
+
+    def get_wait(self, now=None):
+        """Return seconds until a waiting frame can be shown, or None."""
+        if self._pending is None:
+            return None
+        now = self.clock() if now is None else now
+        return max(self._next_push - now, 0)
+
+    def update(self, now=None):
+        """Show the waiting frame, if there is one and it's time."""
+        now = self.clock() if now is None else now
+        frame = self._pending
+        if frame is None or now < self._next_push:
+            return
+        try:
+            if not self._ready:
+                self.renderer.setup()
+                self._ready = True
+            self.renderer.show(frame)
+        except Exception as ex:
+            self._failures += 1
+            backoff = min(
+                self.backoff_secs * 2 ** (self._failures - 1),
+                self.max_backoff_secs
+            )
+            self._next_push = now + backoff
+            self.stats['failures'] += 1
+            self.stats['backoff_secs'] = backoff
+            if self._failures == 1:
+                LOG.error(f"Renderer {self.name} failed ({ex}), backing off.")
+            return
+        if self._failures:
+            LOG.info(f"Renderer {self.name} recovered.")
+            self._failures = 0
+            self.stats['backoff_secs'] = 0
+        with self._lock:
+            if self._pending is frame:
+                self._pending = None
+        self._next_push = now + self.frame_secs
+        self.stats['pushed'] += 1
+
+    def poll(self):
+        """Run a render loop renderer; called every frame."""
+        if self._thread is None:
+            self.update()
+            if self._ready:
+                self.renderer.poll()
+
+    def _run(self):
+        """Show frames as they come, on the renderer's thread."""
+        while self._running:
+            self._wake.clear()
+            self.update()
+            self._wake.wait(self.get_wait())
+
+    def close(self, timeout=1):
+        """Stop the thread and tidy up the renderer."""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._ready:
+            self._ready = False
+            self.renderer.close()
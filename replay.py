@@ -0,0 +1,341 @@
+"""Replay recorded readings through the lights on a virtual clock.
+
+Readings from a CSV file (time, production and consumption in kW, time
+as epoch seconds or a local ISO time) or from the history database stand
+in for the SolarEdge API, and a VirtualClock jumps from one event to the
+next. The real scheduling, fetching, drawing and rendering code runs
+throughout, so a week goes by in seconds.
+
+    python replay.py readings.csv --frames frames.csv --calls calls.csv
+    python replay.py --history history.db --start 2026-10-01 --days 7
+
+Prints the API calls made per UTC day (the budget's day), how many
+frames were shown, and what each stage of the pipeline cost per call.
+"""
+import argparse
+import bisect
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from budget import ApiLedger, ApiScheduler
+from clock import VirtualClock
+from energy import EnergyIntegrator
+from power import API_QUERY_LIMIT, SolarLights
+from renderers import Output, Renderer
+from solaredge import SolarEdgeError
+from store import ReadingStore
+
+LOG = logging.getLogger('solar-lights')
+
+# Frames per virtual second. The animation step follows the clock, so
+# drawing fewer frames than the lights would only samples it.
+REPLAY_FPS = 0.1
+# Stage name, and the SolarLights method that does it.
+STAGES = (
+    ('fetch', 'update_data'),
+    ('schedule', 'set_next_update'),
+    ('draw', 'update_frame'),
+    ('render', 'render'),
+)
+
+
+def get_epoch(value):
+    """Return the epoch time for epoch seconds or a local ISO time."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def read_csv(path):
+    """Return (ts, production, consumption) rows from a CSV file, in order."""
+    with open(path, newline='') as fp:
+        return sorted(
+            (
+                get_epoch(row['time']), float(row['production']),
+                float(row['consumption'])
+            )
+            for row in csv.DictReader(fp)
+        )
+
+
+def read_history(path, start, end):
+    """Return (ts, production, consumption) rows from a history database."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    store = ReadingStore(path)
+    try:
+        return [row[:3] for row in store.get_range(start, end)]
+    finally:
+        store.close()
+
+
+class ReplayClient:
+    """Answer SolarEdge API calls from recorded readings.
+
+    Each call is recorded in the ledger as the real client would, at the
+    virtual time, and kept as (epoch time, kind) in calls.
+    """
+
+    def __init__(self, readings, clock):
+        """Set up with (ts, production, consumption) rows, in order."""
+        self.readings = readings
+        self.clock = clock
+        self.calls = []
+        self.stats = {'requests': 0}
+        self._times = [row[0] for row in readings]
+
+    def record(self, kind, ledger):
+        """Note an API call."""
+        now = self.clock.time()
+        self.calls.append((now, kind))
+        self.stats['requests'] += 1
+        if ledger is not None:
+            ledger.record(kind, now=now)
+
+    def get_current_power_flow(self, site_id, api_key, ledger=None):
+        """Return a currentPowerFlow packet for the latest reading."""
+        self.record('currentPowerFlow', ledger)
+        ix = bisect.bisect_right(self._times, self.clock.time()) - 1
+        if ix < 0:
+            raise SolarEdgeError("No reading yet.")
+        _, production, consumption = self.readings[ix]
+        return {'siteCurrentPowerFlow': {
+            'PV': {'currentPower': production},
+            'LOAD': {'currentPower': consumption},
+            'GRID': {'currentPower': abs(production - consumption)},
+        }}
+
+    def get_energy_details(
+        self, site_id, api_key, start, end, unit='HOUR', ledger=None
+    ):
+        """Return energyDetails integrated from the readings so far."""
+        self.record('energyDetails', ledger)
+        end = min(end.timestamp(), self.clock.time())
+        integrator = EnergyIntegrator()
+        integrator.replay(self.readings[
+            bisect.bisect_left(self._times, start.timestamp()):
+            bisect.bisect_right(self._times, end)
+        ])
+        return {'energyDetails': {'meters': [
+            {'type': meter, 'values': [{'value': value}]}
+            for meter, value in integrator.get_summary().items()
+        ]}}
+
+
+class ReplayLights(SolarLights):
+    """SolarLights that call a ReplayClient instead of the API."""
+
+    def __init__(self, replay_client, **kwargs):
+        """Set up; kwargs are as for SolarLights."""
+        super().__init__(**kwargs)
+        self.replay_client = replay_client
+
+    @property
+    def client(self):
+        """Return the stand-in API client."""
+        return self.replay_client
+
+
+class FrameRecorder(Renderer):
+    """Keep each frame shown, with the (virtual) time it was shown."""
+
+    name = 'replay'
+    threaded = False
+
+    def __init__(self, lights):
+        """Set up for a SolarLights."""
+        super().__init__(lights)
+        self.frames = []
+
+    def show(self, frame):
+        """Keep the frame."""
+        self.frames.append((self.lights.clock.time(), frame))
+
+
+class Replay:
+    """Run the lights over recorded readings, as fast as they'll go."""
+
+    def __init__(
+        self, readings, start=None, end=None, fps=REPLAY_FPS,
+        api_limit=API_QUERY_LIMIT, with_nowcast=True
+    ):
+        """Set up; start and end default to the first and last reading."""
+        self.readings = readings
+        self.start = readings[0][0] if start is None else start
+        self.end = readings[-1][0] if end is None else end
+        self.clock = VirtualClock(self.start)
+        self.client = ReplayClient(readings, self.clock)
+        self.wall_secs = None
+        self.timings = {}
+        self._tmp_dir = tempfile.TemporaryDirectory()
+
+        lights = ReplayLights(
+            self.client, with_blinkt=False, with_nowcast=with_nowcast,
+            renderers=[], api_limit=api_limit, clock=self.clock,
+        )
+        lights.animator.frame_secs = 1. / fps
+        # A crossfade is over long before the next replayed frame.
+        lights.animator.fade_secs = 0
+        # Sun times for the replayed days, without touching the real table.
+        lights.almanac_path = os.path.join(self._tmp_dir.name, 'almanac.json')
+        # A ledger of its own, so the real one's calls aren't counted.
+        lights._scheduler = ApiScheduler(
+            ApiLedger(
+                os.path.join(self._tmp_dir.name, 'api_ledger.csv'),
+                now=self.start
+            ),
+            api_limit
+        )
+        self.recorder = FrameRecorder(lights)
+        lights._outputs = [Output(self.recorder, clock=self.clock.monotonic)]
+        for stage, name in STAGES:
+            setattr(lights, name, self.get_timed(stage, getattr(lights, name)))
+        self.lights = lights
+
+    def get_timed(self, stage, method):
+        """Return method, adding the time it takes to the stage's timings."""
+        timings = self.timings.setdefault(stage, [0, 0.])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[0] += 1
+                timings[1] += time.perf_counter() - started
+
+        return timed
+
+    def run(self):
+        """Replay from start to end, and return the report.
+
+        Does what the fetcher and render loop threads would, in turn:
+        fetch when an update is due, and step the lights after a fetch
+        or when the next display event is due.
+        """
+        lights, clock = self.lights, self.clock
+        started = time.perf_counter()
+        lights.start(fetch=False, watch=False, share=False)
+        lights.set_next_update()
+        next_step = clock.time()
+        try:
+            while True:
+                next_fetch = clock.time() + lights.get_seconds_until_update()
+                when = min(next_step, next_fetch)
+                if when > self.end:
+                    break
+                clock.set(when)
+                if lights.get_seconds_until_update() <= 0:
+                    lights.update_data()
+                    lights.set_next_update()
+                next_step = lights.step()
+        finally:
+            lights.cleanup()
+            self._tmp_dir.cleanup()
+        self.wall_secs = time.perf_counter() - started
+        return self.get_report()
+
+    def get_report(self):
+        """Return what the replay did, and how long each stage took."""
+        calls = {}
+        for when, _ in self.client.calls:
+            day = datetime.utcfromtimestamp(when).date().isoformat()
+            calls[day] = calls.get(day, 0) + 1
+        replayed_secs = self.clock.time() - self.start
+        return {
+            'replayed_secs': round(replayed_secs),
+            'wall_secs': round(self.wall_secs, 3),
+            'speedup': round(replayed_secs / max(self.wall_secs, 1e-9)),
+            'readings': len(self.readings),
+            'frames': len(self.recorder.frames),
+            'api_calls': calls,
+            'stages': {
+                stage: {
+                    'calls': count,
+                    'mean_us': round(secs / count * 1e6, 1) if count else None,
+                    'total_secs': round(secs, 3),
+                }
+                for stage, (count, secs) in self.timings.items()
+            },
+        }
+
+    def write_frames(self, path):
+        """Write the frames shown to a CSV file, pixels as hex."""
+        with open(path, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['time', 'brightness', 'pixels', 'output'])
+            for when, frame in self.recorder.frames:
+                writer.writerow([
+                    datetime.fromtimestamp(when).isoformat(timespec='seconds'),
+                    frame.brightness, frame.pixels.hex(), frame.output.hex(),
+                ])
+
+    def write_calls(self, path):
+        """Write the API calls made to a CSV file."""
+        with open(path, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['time', 'kind'])
+            for when, kind in self.client.calls:
+                writer.writerow([
+                    datetime.fromtimestamp(when).isoformat(timespec='seconds'),
+                    kind,
+                ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'csv', nargs='?',
+        help="CSV of time, production and consumption (kW) readings"
+    )
+    parser.add_argument(
+        '--history', help="Replay readings from this history database"
+    )
+    parser.add_argument(
+        '--start', help="Local date or time to replay the history from"
+    )
+    parser.add_argument(
+        '--days', type=float, default=1, help="Days of history to replay"
+    )
+    parser.add_argument(
+        '--fps', type=float, default=REPLAY_FPS,
+        help="Frames to draw per replayed second"
+    )
+    parser.add_argument(
+        '--no-nowcast', action='store_true', default=False,
+        help="Show the readings as they are, without estimating between"
+    )
+    parser.add_argument('--frames', help="Write the frames shown to a CSV")
+    parser.add_argument('--calls', help="Write the API calls made to a CSV")
+    args = parser.parse_args()
+
+    start = end = None
+    if args.history:
+        if not args.start:
+            parser.error("--history needs --start.")
+        start = get_epoch(args.start)
+        end = start + args.days * 24 * 60 * 60
+        readings = read_history(args.history, start, end)
+    elif args.csv:
+        readings = read_csv(args.csv)
+    else:
+        parser.error("Give a CSV file of readings, or --history.")
+    if not readings:
+        parser.error("No readings to replay.")
+
+    # Every refresh is logged, which would swamp the report.
+    LOG.setLevel(logging.WARNING)
+    replay = Replay(
+        readings, start, end, fps=args.fps, with_nowcast=not args.no_nowcast
+    )
+    print(json.dumps(replay.run(), indent=2))
+    if args.frames:
+        replay.write_frames(args.frames)
+    if args.calls:
+        replay.write_calls(args.calls)
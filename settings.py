@@ -0,0 +1,212 @@
+"""The settings the lights pick up from config.py while running.
+
+Colours, times and capacity are compiled into one immutable Settings,
+checked, and swapped in whole, so the render loop never sees half an
+update. A ConfigWatcher reloads them when config.py changes (or when
+asked, e.g. on SIGHUP). The API key, site and optional settings are
+still only read at startup.
+"""
+import logging
+import os
+import runpy
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from timeline import parse_time
+
+LOG = logging.getLogger('solar-lights')
+
+COLOURS = (
+    'IMPORT_COLOUR', 'EXPORT_COLOUR', 'NEUTRAL_COLOUR', 'PRODUCTION_COLOUR',
+    'CONSUMPTION_COLOUR',
+)
+AMOUNTS = (
+    'REFRESH_RATE_SECS', 'CAPACITY', 'MAX_IDEAL_POWER',
+    'MAX_IDEAL_CONSUMPTION',
+)
+TIMES = (
+    'DIM_DOWN_TIME_NIGHT', 'BRIGHTEN_UP_TIME_MORNING', 'OFF_TIME_NIGHT',
+    'ON_TIME_MORNING',
+)
+CONFIG_NAMES = COLOURS + AMOUNTS + TIMES + ('OFF_TIMES',)
+
+
+class SettingsError(ValueError):
+    """Raised when config.py's settings can't be used."""
+
+
+def get_colour(name, value):
+    """Return an (r, g, b) tuple, checking each is 0-255."""
+    try:
+        colour = tuple(int(part) for part in value)
+    except (TypeError, ValueError):
+        raise SettingsError(f"{name} should be [r, g, b], not {value!r}.")
+    if len(colour) != 3 or not all(0 <= part <= 255 for part in colour):
+        raise SettingsError(f"{name} should be three 0-255 values.")
+    return colour
+
+
+def get_amount(name, value):
+    """Return a positive number."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise SettingsError(f"{name} should be a number, not {value!r}.")
+    if amount <= 0:
+        raise SettingsError(f"{name} should be more than 0.")
+    return amount
+
+
+def get_time(name, value):
+    """Return an "HH:MM:SS" time, zero padded."""
+    try:
+        return datetime.strptime(value, '%H:%M:%S').strftime('%H:%M:%S')
+    except (TypeError, ValueError):
+        raise SettingsError(f"{name} should be HH:MM:SS, not {value!r}.")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """The display's settings, checked and parsed once.
+
+    Fields are named as in config.py, and are checked and tidied (e.g.
+    colours become tuples) on creation, raising SettingsError if they
+    can't be used. Times are also kept as seconds since midnight, ready
+    to compare with the clock.
+    """
+
+    IMPORT_COLOUR: tuple
+    EXPORT_COLOUR: tuple
+    NEUTRAL_COLOUR: tuple
+    PRODUCTION_COLOUR: tuple
+    CONSUMPTION_COLOUR: tuple
+    REFRESH_RATE_SECS: float
+    CAPACITY: float
+    MAX_IDEAL_POWER: float
+    MAX_IDEAL_CONSUMPTION: float
+    DIM_DOWN_TIME_NIGHT: str
+    BRIGHTEN_UP_TIME_MORNING: str
+    OFF_TIME_NIGHT: str
+    ON_TIME_MORNING: str
+    OFF_TIMES: bool
+    dim_secs: int = field(init=False, repr=False)
+    brighten_secs: int = field(init=False, repr=False)
+    off_secs: int = field(init=False, repr=False)
+    on_secs: int = field(init=False, repr=False)
+    # How long the lights are on each day, from the on to the off time.
+    on_seconds: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        """Check and tidy the values, and work out the derived ones."""
+        def set_value(name, value):
+            object.__setattr__(self, name, value)
+
+        for name in COLOURS:
+            set_value(name, get_colour(name, getattr(self, name)))
+        for name in AMOUNTS:
+            set_value(name, get_amount(name, getattr(self, name)))
+        for name in TIMES:
+            set_value(name, get_time(name, getattr(self, name)))
+        set_value('OFF_TIMES', bool(self.OFF_TIMES))
+
+        set_value('dim_secs', parse_time(self.DIM_DOWN_TIME_NIGHT))
+        set_value('brighten_secs', parse_time(self.BRIGHTEN_UP_TIME_MORNING))
+        set_value('off_secs', parse_time(self.OFF_TIME_NIGHT))
+        set_value('on_secs', parse_time(self.ON_TIME_MORNING))
+        set_value(
+            'on_seconds', (self.off_secs - self.on_secs) % (24 * 60 * 60)
+        )
+
+    def to_config(self):
+        """Return {name: value} as they should be written to config.py."""
+        values = {name: getattr(self, name) for name in CONFIG_NAMES}
+        for name in COLOURS:
+            values[name] = list(values[name])
+        return values
+
+
+def compile_settings(values):
+    """Return Settings from a dict of config values, or raise SettingsError."""
+    missing = [name for name in CONFIG_NAMES if name not in values]
+    if missing:
+        raise SettingsError(f"Missing {', '.join(missing)}.")
+    return Settings(**{name: values[name] for name in CONFIG_NAMES})
+
+
+def from_module(module):
+    """Return Settings from an imported config module."""
+    return compile_settings(vars(module))
+
+
+def load_settings(path):
+    """Return Settings read afresh from a config file."""
+    try:
+        values = runpy.run_path(path)
+    except Exception as ex:
+        raise SettingsError(f"Couldn't read {path}: {ex}")
+    return compile_settings(values)
+
+
+class ConfigWatcher(threading.Thread):
+    """Reload settings when the config file changes, or when triggered.
+
+    Changes are spotted by polling the file's mtime, which is cheap
+    enough to do every half second. New settings are only passed on if
+    they're valid; otherwise the old ones are kept, and the error logged.
+    """
+
+    def __init__(self, path, on_change, poll_secs=0.5):
+        """Set up; on_change is called with each new Settings."""
+        super().__init__(name='solar-lights-config', daemon=True)
+        self.path = path
+        self.on_change = on_change
+        self.poll_secs = poll_secs
+        self._mtime = self.get_mtime()
+        self._triggered = threading.Event()
+        self._stopped = False
+
+    def get_mtime(self):
+        """Return the config file's mtime, or None if it's missing."""
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def check(self, force=False):
+        """Reload if the file has changed (or force); return True if done."""
+        mtime = self.get_mtime()
+        if mtime is None or (mtime == self._mtime and not force):
+            return False
+        self._mtime = mtime
+        try:
+            settings = load_settings(self.path)
+        except SettingsError as ex:
+            LOG.error(f"Config not reloaded, keeping current settings: {ex}")
+            return False
+        LOG.info("Config reloaded.")
+        self.on_change(settings)
+        return True
+
+    def trigger(self):
+        """Reload now; safe to call from a signal handler."""
+        self._triggered.set()
+
+    def run(self):
+        """Check for changes until stopped."""
+        while not self._stopped:
+            force = self._triggered.wait(self.poll_secs)
+            self._triggered.clear()
+            if self._stopped:
+                break
+            try:
+                self.check(force)
+            except Exception:
+                LOG.exception("Config reload failed.")
+
+    def stop(self, timeout=None):
+        """Ask the watcher to finish and wait for it."""
+        self._stopped = True
+        self._triggered.set()
+        if self.is_alive():
+            self.join(timeout)
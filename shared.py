@@ -0,0 +1,239 @@
+"""Share the lights' latest snapshot with other processes, in memory.
+
+power.py writes the current reading, day summary, frame (as drawn, and
+as shown: dimmed or off) and timing stats into a small memory-mapped
+file (in /dev/shm where there is one), and readers such as the
+configurator map the same file. Nothing is parsed and nothing touches
+the disk.
+
+The layout is fixed: a header of (seq, version), a struct of values, the
+frame's RGB bytes and then the output's. Writes are guarded by a seqlock:
+the writer makes seq odd while writing and even again when done, and
+readers retry if seq was odd or changed while they read. version only
+moves on when the reading or summary changes, so readers can tell new
+data from new frames.
+
+    python shared.py  # show what the lights are sharing
+"""
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+
+from energy import METERS
+
+HEADER = struct.Struct('<QQ')
+# written_at, production, consumption, grid, direction, daylight,
+# summary meters, fetched_at, fetch latency, fps, jitter_ms, frames,
+# dropped, brightness, pixels.
+VALUES = struct.Struct('<ddddBB' + 'd' * len(METERS) + 'ddddQQdH')
+VALUES_OFFSET = HEADER.size
+FRAME_OFFSET = VALUES_OFFSET + VALUES.size
+DIRECTIONS = (None, 'neutral', 'import', 'export')
+READ_TRIES = 100
+
+SharedSnapshot = namedtuple('SharedSnapshot', [
+    'version', 'written_at', 'data', 'summary', 'daylight', 'brightness',
+    'frame', 'output', 'stats',
+])
+
+
+def get_default_path():
+    """Return where to share the snapshot: in memory, if we can."""
+    root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(root, 'solar-lights.snapshot')
+
+
+def _get_number(value):
+    """Return value for a double field, NaN standing in for None."""
+    return math.nan if value is None else value
+
+
+def _get_value(value):
+    """Return a double field's value, or None for NaN."""
+    return None if math.isnan(value) else value
+
+
+class SharedSnapshotFile:
+    """A memory-mapped snapshot, to write (one process) or read (any)."""
+
+    def __init__(self, path=None, n_pixels=None):
+        """Set up; n_pixels is for the writer, which creates the file."""
+        self.path = path or get_default_path()
+        self.n_pixels = n_pixels
+        self._map = None
+        self._seq = 0
+        self._version = 0
+        self._shared = (None, None)
+
+    def open(self):
+        """Map the file, creating or growing it for a writer.
+
+        Returns False if a reader finds no file yet. The file is never
+        shrunk, so a reader's mapping always stays valid.
+        """
+        if self._map is not None:
+            return True
+        writer = bool(self.n_pixels)
+        try:
+            fd = os.open(
+                self.path, os.O_RDWR | os.O_CREAT if writer else os.O_RDONLY,
+                0o644
+            )
+        except FileNotFoundError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if writer and size < FRAME_OFFSET + 6 * self.n_pixels:
+                size = FRAME_OFFSET + 6 * self.n_pixels
+                os.ftruncate(fd, size)
+            if size < FRAME_OFFSET:
+                return False
+            self._map = mmap.mmap(
+                fd, 0, access=mmap.ACCESS_WRITE if writer else mmap.ACCESS_READ
+            )
+        finally:
+            os.close(fd)
+        if writer:
+            # Carry on from the last writer, so readers see a change.
+            seq, self._version = HEADER.unpack_from(self._map)
+            self._seq = seq + 2 - seq % 2
+        return True
+
+    def write(self, frame, daylight, stats):
+        """Share a renderers.Frame, with the animation stats.
+
+        The frame's output must be the same size as its pixels.
+        """
+        self.open()
+        data, summary = frame.data, frame.summary
+        if data is not self._shared[0] or summary is not self._shared[1]:
+            self._version += 1
+            self._shared = (data, summary)
+        data = data or {}
+        summary = summary or {}
+        values = (
+            time.time(),
+            _get_number(data.get('production')),
+            _get_number(data.get('consumption')),
+            _get_number(data.get('grid')),
+            DIRECTIONS.index(data.get('direction')),
+            daylight,
+        ) + tuple(
+            _get_number(summary.get(meter)) for meter in METERS
+        ) + (
+            _get_number(stats.get('fetched_at')),
+            _get_number(stats.get('fetch_latency_secs')),
+            _get_number(stats.get('fps')),
+            _get_number(stats.get('jitter_ms')),
+            stats.get('frames', 0),
+            stats.get('dropped', 0),
+            frame.brightness or 0,
+            len(frame.pixels) // 3,
+        )
+        shared = self._map
+        HEADER.pack_into(shared, 0, self._seq + 1, self._version)
+        VALUES.pack_into(shared, VALUES_OFFSET, *values)
+        size = len(frame.pixels)
+        shared[FRAME_OFFSET:FRAME_OFFSET + size] = frame.pixels
+        shared[FRAME_OFFSET + size:FRAME_OFFSET + 2 * size] = frame.output
+        self._seq += 2
+        HEADER.pack_into(shared, 0, self._seq, self._version)
+
+    def get_version(self):
+        """Return the shared data's version, or None if there's none yet."""
+        header = self._read(lambda shared: None)
+        return None if header is None else header[1]
+
+    def read(self):
+        """Return the SharedSnapshot, or None if there's none yet."""
+        result = self._read(self._read_values)
+        if result is not None and result[2] is None:
+            # The writer has grown the file since we mapped it.
+            self.close()
+            result = self._read(self._read_values)
+        if result is None or result[2] is None:
+            return None
+        _, version, (values, frame, output) = result
+        written_at, production, consumption, grid, direction, daylight = (
+            values[:6]
+        )
+        n_meters = len(METERS)
+        meters = values[6:6 + n_meters]
+        fetched_at, latency, fps, jitter_ms, frames, dropped, brightness = (
+            values[6 + n_meters:-1]
+        )
+
+        data = None
+        if DIRECTIONS[direction] is not None:
+            data = {
+                'production': _get_value(production),
+                'consumption': _get_value(consumption),
+                'grid': _get_value(grid),
+                'direction': DIRECTIONS[direction],
+                'import': None,
+                'export': None,
+            }
+            data[data['direction']] = data['grid']
+        summary = None
+        if not all(math.isnan(value) for value in meters):
+            summary = {
+                meter: _get_value(value)
+                for meter, value in zip(METERS, meters)
+            }
+        return SharedSnapshot(
+            version, written_at, data, summary, bool(daylight), brightness,
+            frame, output, {
+                'fetched_at': _get_value(fetched_at),
+                'fetch_latency_secs': _get_value(latency),
+                'fps': _get_value(fps),
+                'jitter_ms': _get_value(jitter_ms),
+                'frames': frames,
+                'dropped': dropped,
+            }
+        )
+
+    def _read_values(self, shared):
+        """Return (values, frame bytes, output bytes) as they are now."""
+        values = VALUES.unpack_from(shared, VALUES_OFFSET)
+        size = 3 * values[-1]
+        if FRAME_OFFSET + 2 * size > len(shared):
+            return None
+        return (
+            values, shared[FRAME_OFFSET:FRAME_OFFSET + size],
+            shared[FRAME_OFFSET + size:FRAME_OFFSET + 2 * size]
+        )
+
+    def _read(self, read):
+        """Return (seq, version, read(map)) read consistently, or None."""
+        if not self.open():
+            return None
+        shared = self._map
+        for _ in range(READ_TRIES):
+            seq, version = HEADER.unpack_from(shared)
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            result = read(shared)
+            if HEADER.unpack_from(shared)[0] == seq:
+                return seq, version, result
+        return None
+
+    def close(self):
+        """Unmap the file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+if __name__ == '__main__':
+    snapshot = SharedSnapshotFile().read()
+    if snapshot is None:
+        print("Nothing shared yet; is power.py running?")
+    else:
+        for field, value in snapshot._asdict().items():
+            print(f"{field}: {value}")
@@ -0,0 +1,177 @@
+"""Pooled, keep-alive HTTP client for the SolarEdge monitoring API."""
+import logging
+import random
+import time
+from collections import deque, namedtuple
+
+LOG = logging.getLogger('solar-lights')
+
+SOLAREDGE_API = "https://monitoringapi.solaredge.com/"
+
+RequestStat = namedtuple(
+    'RequestStat',
+    ['path', 'status', 'secs', 'bytes', 'new_connection', 'attempt']
+)
+
+_shared_client = None
+
+
+class SolarEdgeError(Exception):
+    """Raised when the API didn't give us a usable answer."""
+
+
+class SolarEdgeClient:
+    """Talk to SolarEdge over a reused connection, with retries."""
+
+    # Not 429: retrying when over the rate limit only spends more calls.
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(
+        self, base_url=SOLAREDGE_API, connect_timeout=3.05, read_timeout=10,
+        retries=2, backoff_secs=2., pool_size=2
+    ):
+        """Set up; requests is only imported once there's a client."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.requests = requests
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_secs = backoff_secs
+        self.history = deque(maxlen=50)
+        self.stats = {
+            'requests': 0,
+            'failures': 0,
+            'new_connections': 0,
+            'bytes': 0,
+            'secs': 0.,
+        }
+        self._adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0
+        )
+        self._session = requests.Session()
+        self._session.mount(base_url, self._adapter)
+        self._session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+
+    def _count_connections(self):
+        """Return how many connections the pool has ever opened."""
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def get_backoff(self, attempt):
+        """Return seconds to wait before a retry (full jitter)."""
+        return random.uniform(0, self.backoff_secs * 2 ** (attempt - 1))
+
+    def _get(self, path, params, attempt, ledger):
+        """Make one request, recording how it went."""
+        kind = path.split('?')[0].rsplit('/', 1)[-1]
+        connections = self._count_connections()
+        started = time.monotonic()
+        try:
+            response = self._session.get(
+                self.base_url + path, params=params, timeout=self.timeout
+            )
+            content = response.content
+        except self.requests.exceptions.ReadTimeout:
+            # The request got to the API, so it counts toward the limit.
+            if ledger is not None:
+                ledger.record(kind)
+            raise
+        finally:
+            secs = time.monotonic() - started
+            self.stats['requests'] += 1
+            self.stats['secs'] += secs
+
+        if ledger is not None:
+            ledger.record(kind)
+        # Bytes off the wire (i.e. still gzipped), if urllib3 knows them.
+        size = response.raw.tell() or len(content)
+        new_connection = self._count_connections() > connections
+        stat = RequestStat(
+            path, response.status_code, round(secs, 3), size,
+            new_connection, attempt
+        )
+        self.history.append(stat)
+        self.stats['bytes'] += size
+        self.stats['new_connections'] += int(new_connection)
+        LOG.debug(
+            f"GET {path} -> {response.status_code} in {secs:.3f}s, "
+            f"{size} bytes, "
+            f"{'new' if new_connection else 'reused'} connection"
+        )
+        return response
+
+    def get_json(self, path, params=None, ledger=None):
+        """Return the decoded JSON for a GET of path.
+
+        Every request that reaches the API is recorded in the ledger, if
+        given, retries included, since they all count toward the limit.
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.get_backoff(attempt))
+            try:
+                response = self._get(path, params, attempt, ledger)
+            except (
+                self.requests.exceptions.ConnectionError,
+                self.requests.exceptions.Timeout
+            ) as ex:
+                error = SolarEdgeError(f"SolarEdge API not reachable ({ex}).")
+                continue
+            if response.status_code in self.RETRY_STATUSES:
+                error = SolarEdgeError(
+                    f"SolarEdge API returned {response.status_code} status."
+                )
+                continue
+            if response.status_code != 200:
+                self.stats['failures'] += 1
+                raise SolarEdgeError(
+                    f"SolarEdge API returned {response.status_code} status."
+                )
+            try:
+                return response.json()
+            except ValueError:
+                self.stats['failures'] += 1
+                raise SolarEdgeError("Unexpected response data.")
+        self.stats['failures'] += 1
+        raise error
+
+    def get_current_power_flow(self, site_id, api_key, ledger=None):
+        """Return the currentPowerFlow packet for a site."""
+        return self.get_json(
+            f"site/{site_id}/currentPowerFlow.json", {'api_key': api_key},
+            ledger=ledger
+        )
+
+    def get_energy_details(
+        self, site_id, api_key, start, end, unit='HOUR', ledger=None
+    ):
+        """Return energyDetails for a site between two datetimes."""
+        return self.get_json(
+            f"site/{site_id}/energyDetails.json",
+            {
+                'api_key': api_key,
+                'startTime': start.strftime('%Y-%m-%d %H:%M:%S'),
+                'endTime': end.strftime('%Y-%m-%d %H:%M:%S'),
+                'timeUnit': unit,
+            },
+            ledger=ledger
+        )
+
+    def close(self):
+        """Drop pooled connections."""
+        self._session.close()
+
+
+def get_client(**kwargs):
+    """Return the process-wide client, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = SolarEdgeClient(**kwargs)
+    return _shared_client
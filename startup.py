@@ -0,0 +1,63 @@
+"""What starting up has cost: time since the process started, and memory.
+
+    python power.py --startup-profile
+
+reports it once imported and again once the first frame is shown. Times
+and current memory come from /proc, so are only known on Linux.
+"""
+import os
+import resource
+import sys
+import time
+
+# Modules that are slow to import or big in memory; each should only be
+# loaded when the source or renderer that needs it is turned on.
+HEAVY_MODULES = (
+    'requests', 'astral', 'numpy', 'pygame', 'blinkt', 'rpi_ws281x', 'flask',
+)
+
+
+def get_process_secs():
+    """Return seconds since this process started, or None if unknown."""
+    try:
+        with open('/proc/self/stat') as fp:
+            # Fields after the command name; starttime is the 22nd field.
+            start_ticks = int(fp.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as fp:
+            uptime = float(fp.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 3)
+
+
+def get_rss_kb():
+    """Return resident memory now, in KB, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as fp:
+            pages = int(fp.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def get_report():
+    """Return what this process has cost so far."""
+    return {
+        'process_secs': get_process_secs(),
+        'cpu_secs': round(time.process_time(), 3),
+        'rss_kb': get_rss_kb(),
+        # KB on Linux.
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'modules': len(sys.modules),
+        'heavy_modules': [
+            name for name in HEAVY_MODULES if name in sys.modules
+        ],
+    }
+
+
+def log_report(log, stage):
+    """Log the report for a stage of starting up."""
+    report = ', '.join(
+        f"{name} {value}" for name, value in get_report().items()
+    )
+    log.info(f"Startup profile, {stage}: {report}")
@@ -0,0 +1,189 @@
+"""Keep a history of readings, with rollups, in a small SQLite database."""
+import logging
+import sqlite3
+import threading
+import time
+
+LOG = logging.getLogger('solar-lights')
+
+DAY_SECS = 24 * 60 * 60
+
+# (table, bucket seconds, seconds of history to keep or None for ever).
+# Buckets are aligned to UTC.
+RESOLUTIONS = {
+    'raw': ('readings', None, 14 * DAY_SECS),
+    '15m': ('readings_15m', 15 * 60, 400 * DAY_SECS),
+    'day': ('readings_day', DAY_SECS, None),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    ts INTEGER PRIMARY KEY,
+    production REAL,
+    consumption REAL,
+    grid REAL
+);
+CREATE TABLE IF NOT EXISTS readings_15m (
+    ts INTEGER PRIMARY KEY,
+    samples INTEGER,
+    production REAL,
+    consumption REAL,
+    grid REAL,
+    production_max REAL,
+    consumption_max REAL
+);
+CREATE TABLE IF NOT EXISTS readings_day (
+    ts INTEGER PRIMARY KEY,
+    samples INTEGER,
+    production REAL,
+    consumption REAL,
+    grid REAL,
+    production_max REAL,
+    consumption_max REAL
+);
+"""
+
+# Rollups hold sums so batches can be added in; queries divide them out.
+UPSERT_ROLLUP = """
+INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(ts) DO UPDATE SET
+    samples = samples + excluded.samples,
+    production = production + excluded.production,
+    consumption = consumption + excluded.consumption,
+    grid = grid + excluded.grid,
+    production_max = max(production_max, excluded.production_max),
+    consumption_max = max(consumption_max, excluded.consumption_max)
+"""
+
+SELECT_RAW = """
+SELECT * FROM readings WHERE ts >= ? AND ts < ? ORDER BY ts
+"""
+
+SELECT_ROLLUP = """
+SELECT ts, production / samples, consumption / samples, grid / samples,
+    production_max, consumption_max, samples
+FROM {table} WHERE ts >= ? AND ts < ? ORDER BY ts
+"""
+
+
+def get_signed_grid(reading):
+    """Return grid power as positive for export, negative for import."""
+    grid = reading.get('grid') or 0
+    return -grid if reading.get('direction') == 'import' else grid
+
+
+class ReadingStore:
+    """Append-only readings, written in batches to spare the SD card.
+
+    Readings are held in memory and written in one transaction every
+    `flush_every` readings or `flush_secs` seconds. With WAL and
+    synchronous=NORMAL, SQLite only syncs to disk at checkpoints.
+    """
+
+    def __init__(self, path='history.db', flush_every=30, flush_secs=300):
+        """Set up."""
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_secs = flush_secs
+        self._pending = []
+        self._last_flush = time.time()
+        self._last_prune = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def db(self):
+        """Return the database connection, opening it on first use."""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def append(self, reading, when=None):
+        """Add a power/status reading taken at epoch time `when`."""
+        when = time.time() if when is None else when
+        self._pending.append((
+            int(when), reading['production'], reading['consumption'],
+            get_signed_grid(reading),
+        ))
+        due = when - self._last_flush >= self.flush_secs
+        if due or len(self._pending) >= self.flush_every:
+            self.flush(now=when)
+
+    def get_rollups(self, rows, bucket_secs):
+        """Return rollup rows summing up raw rows per bucket."""
+        buckets = {}
+        for ts, production, consumption, grid in rows:
+            bucket = ts - ts % bucket_secs
+            rollup = buckets.setdefault(
+                bucket, [bucket, 0, 0., 0., 0., production, consumption]
+            )
+            rollup[1] += 1
+            rollup[2] += production
+            rollup[3] += consumption
+            rollup[4] += grid
+            rollup[5] = max(rollup[5], production)
+            rollup[6] = max(rollup[6], consumption)
+        return list(buckets.values())
+
+    def flush(self, now=None):
+        """Write pending readings and their rollups in one transaction."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = now
+            if not rows:
+                return
+            try:
+                with self.db:
+                    self.db.executemany(
+                        'INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)',
+                        rows
+                    )
+                    for table, bucket_secs, _ in RESOLUTIONS.values():
+                        if bucket_secs:
+                            self.db.executemany(
+                                UPSERT_ROLLUP.format(table=table),
+                                self.get_rollups(rows, bucket_secs)
+                            )
+                    if now - self._last_prune > 60 * 60:
+                        self.prune(now)
+            except sqlite3.Error:
+                LOG.exception("Failed to save reading history.")
+
+    def prune(self, now):
+        """Drop rows older than each table's retention."""
+        for table, _, keep_secs in RESOLUTIONS.values():
+            if keep_secs:
+                self.db.execute(
+                    f'DELETE FROM {table} WHERE ts < ?', (now - keep_secs,)
+                )
+        self._last_prune = now
+
+    def get_range(self, start, end, resolution='raw'):
+        """Return rows from start (inclusive) to end (exclusive).
+
+        Raw rows are (ts, production, consumption, grid), rollups add
+        production_max, consumption_max and the number of samples, with
+        the power values averaged.
+        """
+        table, bucket_secs, _ = RESOLUTIONS[resolution]
+        with self._lock:
+            query = SELECT_RAW
+            if bucket_secs:
+                query = SELECT_ROLLUP.format(table=table)
+            rows = self.db.execute(query, (start, end)).fetchall()
+            if not bucket_secs:
+                rows.extend(
+                    row for row in self._pending if start <= row[0] < end
+                )
+        return rows
+
+    def close(self):
+        """Write anything pending and close the database."""
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
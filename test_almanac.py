@@ -0,0 +1,56 @@
+import os
+import tempfile
+from datetime import date, datetime
+from unittest import TestCase
+
+from astral import LocationInfo
+from astral.sun import sun
+
+from almanac import Almanac
+
+CITY = LocationInfo(
+    "St. Helier", "Jersey", "Europe/London", 49.1811528, -2.1226525
+)
+
+
+class TestAlmanac(TestCase):
+    """Test the precomputed sun times."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.almanac = Almanac.build(CITY, date(2021, 10, 30), days=5)
+
+    def test_matches_astral(self):
+        """Should agree with astral across a month end and DST change."""
+        for day in (date(2021, 10, 31), date(2021, 11, 1)):
+            params = sun(CITY.observer, date=day, tzinfo=CITY.tzinfo)
+            noon = params['noon'].timestamp()
+            self.assertEqual(
+                self.almanac.get_sun(noon),
+                tuple(
+                    int(params[kind].timestamp())
+                    for kind in ('sunrise', 'noon', 'sunset')
+                )
+            )
+
+    def test_is_daylight(self):
+        """Should tell day from night."""
+        midday = CITY.tzinfo.localize(datetime(2021, 11, 1, 12)).timestamp()
+        night = CITY.tzinfo.localize(datetime(2021, 11, 1, 23)).timestamp()
+        self.assertTrue(self.almanac.is_daylight(midday))
+        self.assertFalse(self.almanac.is_daylight(night))
+        self.assertGreater(
+            self.almanac.get_next('sunrise', night), night + 6 * 60 * 60
+        )
+        with self.assertRaises(IndexError):
+            self.almanac.is_daylight(0)
+
+    def test_save_and_load(self):
+        """Should round-trip through a file."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'almanac.json')
+            self.almanac.save(path)
+            loaded = Almanac.load(path)
+            self.assertEqual(os.listdir(tmp_dir), ['almanac.json'])
+        self.assertEqual(loaded.key, self.almanac.key)
+        self.assertEqual(loaded.sunset, self.almanac.sunset)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from animation import Animator
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self):
+        return self.now
+
+
+class TestAnimator(TestCase):
+    """Test clock-driven animation timing."""
+
+    def test_step_follows_clock(self):
+        """Should move on by elapsed time, not by frames drawn."""
+        clock = FakeClock()
+        animator = Animator(10, 0.5, fps=20, clock=clock)
+        self.assertEqual(animator.get_step(), 0)
+        clock.now += 1.2
+        self.assertEqual(animator.get_step(), 2)
+        clock.now += 4
+        self.assertEqual(animator.get_step(), 0)
+
+    def test_late_frames_dropped(self):
+        """Should count frames missed by a slow pass as dropped."""
+        clock = FakeClock()
+        animator = Animator(10, 0.5, fps=10, clock=clock)
+        self.assertAlmostEqual(animator.get_delay(), 0.1)
+        clock.now += 0.35
+        animator.record_frame()
+        self.assertEqual(animator.stats['dropped'], 2)
+        self.assertAlmostEqual(animator.stats['max_jitter_ms'], 250)
+        self.assertAlmostEqual(animator.get_delay(), 0.05)
+
+    def test_delay_never_zero(self):
+        """Should not hand back a frame due now, with rounding errors."""
+        clock = FakeClock()
+        animator = Animator(10, 0.5, fps=10, clock=clock)
+        clock.now = animator.started + 0.3 - 1e-12
+        self.assertAlmostEqual(animator.get_delay(), 0.1)
+
+    def test_set_timing(self):
+        """Should carry on from the same place at a new speed."""
+        clock = FakeClock()
+        animator = Animator(10, 0.5, fps=2, clock=clock)
+        clock.now += 13.25
+        self.assertEqual(animator.get_step(), 6)
+        animator.set_timing(0.1, fps=10)
+        self.assertEqual(animator.frame_secs, 0.1)
+        self.assertEqual(animator.get_step(), 6)
+        clock.now += 0.06
+        self.assertEqual(animator.get_step(), 7)
+        self.assertAlmostEqual(animator.get_delay(), 0.09)
+
+    def test_fade(self):
+        """Should report crossfade progress until it's done."""
+        clock = FakeClock()
+        animator = Animator(10, 0.5, fps=10, fade_secs=2, clock=clock)
+        self.assertIsNone(animator.get_fade())
+        animator.start_fade()
+        clock.now += 0.5
+        self.assertAlmostEqual(animator.get_fade(), 0.25)
+        clock.now += 2
+        self.assertIsNone(animator.get_fade())
+
+    def test_no_fade(self):
+        """Should not crossfade if fade_secs is 0."""
+        animator = Animator(10, 0.5, fps=10, fade_secs=0, clock=FakeClock())
+        animator.start_fade()
+        self.assertIsNone(animator.get_fade())
@@ -0,0 +1,35 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import bench
+from renderers import RENDERERS
+
+
+class TestBench(TestCase):
+    """Test the benchmark suite."""
+
+    def test_compare(self):
+        """Should flag results slower than the baseline by the threshold."""
+        baseline = {'a': {'us': 10.}, 'b': {'us': 10.}, 'gone': {'us': 1.}}
+        results = {'a': {'us': 13.}, 'b': {'us': 11.}, 'new': {'us': 1.}}
+        rows = bench.compare(baseline, results, threshold=0.2)
+        self.assertEqual(
+            [(name, regressed) for name, *_, regressed in rows],
+            [('a', True), ('b', False)]
+        )
+        self.assertAlmostEqual(rows[0][3], 0.3)
+
+    def test_save_load(self):
+        """Should read back saved results."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'baseline.json')
+            bench.save(path, 10, {'a': {'us': 1.5}})
+            self.assertEqual(bench.load(path), {'a': {'us': 1.5}})
+
+    def test_renderers(self):
+        """Should time every built in renderer against the stand-ins."""
+        results = bench.bench_renderers(frames=1)
+        self.assertEqual(
+            set(results), {f"render {name}" for name in RENDERERS}
+        )
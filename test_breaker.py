@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, SourceChain
+
+
+class Unavailable(Exception):
+    """Stand-in for DataMethodNotAvailable."""
+
+
+class TestBreaker(TestCase):
+    """Test circuit breakers on the data source chain."""
+
+    def setUp(self):
+        self.calls = []
+        self.primary_ok = False
+
+    def primary(self):
+        self.calls.append('primary')
+        if not self.primary_ok:
+            raise Unavailable("down")
+        return 'primary data'
+
+    def fallback(self):
+        self.calls.append('fallback')
+        return 'fallback data'
+
+    def test_skips_failing_source(self):
+        """Should stop calling a source once its breaker opens."""
+        chain = SourceChain(
+            [('primary', self.primary), ('fallback', self.fallback)],
+            errors=(Unavailable,)
+        )
+        for _ in range(5):
+            self.assertEqual(chain.get(), ('fallback', 'fallback data'))
+        self.assertEqual(self.calls.count('primary'), 3)
+        stats = chain.get_stats()
+        self.assertEqual(stats['primary']['state'], OPEN)
+        self.assertEqual(stats['fallback']['successes'], 5)
+
+    def test_half_open_recovers(self):
+        """Should let a trial call through after the reset time."""
+        breaker = CircuitBreaker('primary', failure_threshold=1, reset_secs=10)
+        breaker.record_failure(0.1, now=100)
+        self.assertFalse(breaker.allow(now=105))
+        self.assertEqual(breaker.get_state(now=111), HALF_OPEN)
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.get_state(now=112), CLOSED)
+
+    def test_half_open_failure_backs_off(self):
+        """Should wait longer each time a trial call fails."""
+        breaker = CircuitBreaker('primary', failure_threshold=1, reset_secs=10)
+        breaker.record_failure(0.1, now=100)
+        breaker.get_state(now=111)
+        breaker.record_failure(0.1, now=111)
+        self.assertFalse(breaker.allow(now=125))
+        self.assertTrue(breaker.allow(now=132))
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from budget import DAY_SECS, ApiLedger, ApiScheduler
+
+NOON = 19000 * DAY_SECS + DAY_SECS / 2
+
+
+class TestBudget(TestCase):
+    """Test the API call ledger and scheduler."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'ledger.csv')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_ledger_survives_restart(self):
+        """Should count today's calls written by an earlier process."""
+        with open(self.path, 'w') as fp:
+            fp.write(f"{NOON - DAY_SECS:.0f},currentPowerFlow.json\n")
+        ledger = ApiLedger(self.path, now=NOON)
+        ledger.record('currentPowerFlow.json', now=NOON)
+        ledger.record('energyDetails.json', now=NOON + 1)
+
+        ledger = ApiLedger(self.path, now=NOON)
+        self.assertEqual(ledger.count(now=NOON), 2)
+        self.assertEqual(ledger.last_call, NOON + 1)
+
+    def test_weight_changes_interval(self):
+        """Should wait longer for low-value updates than high-value ones."""
+        scheduler = ApiScheduler(ApiLedger(self.path, now=NOON), 300)
+        quiet = scheduler.next_interval(0.25, now=NOON)
+        busy = scheduler.next_interval(2., now=NOON)
+        self.assertGreater(quiet, busy)
+
+    def test_spent_budget_waits_for_midnight(self):
+        """Should not call again once the day's budget is gone."""
+        ledger = ApiLedger(self.path, now=NOON)
+        scheduler = ApiScheduler(ledger, 5, reserve=2)
+        for ix in range(3):
+            ledger.record('currentPowerFlow.json', now=NOON + ix)
+        self.assertEqual(
+            scheduler.next_interval(2., now=NOON + 10), DAY_SECS / 2 - 9
+        )
+
+    def get_weight(self, when):
+        """Return 1 by day, 0.1 from 21:00 UTC (lights off)."""
+        return 1. if when % DAY_SECS < 21 * 60 * 60 else 0.1
+
+    def test_end_of_day_off_hours(self):
+        """Should not spend spare calls in off-hours before midnight UTC."""
+        scheduler = ApiScheduler(ApiLedger(self.path, now=NOON), 300)
+        late = NOON - DAY_SECS / 2 + DAY_SECS - 2 * 60
+        self.assertEqual(
+            scheduler.next_interval(0.1, now=late, get_weight=self.get_weight),
+            scheduler.off_interval
+        )
+
+    def test_spare_calls_go_to_daylight(self):
+        """Should poll sooner by day if the evening is off-hours."""
+        scheduler = ApiScheduler(ApiLedger(self.path, now=NOON), 300)
+        even = scheduler.next_interval(1., now=NOON)
+        scheduler = ApiScheduler(ApiLedger(self.path, now=NOON), 300)
+        weighted = scheduler.next_interval(
+            1., now=NOON, get_weight=self.get_weight
+        )
+        self.assertLess(weighted, even)
+        # 9 hours of daylight share the calls not kept for the evening.
+        self.assertEqual(weighted, int(9 * 60 * 60 / (298 - 6)))
@@ -0,0 +1,40 @@
+import threading
+from dataclasses import replace
+from datetime import datetime
+from unittest import TestCase
+
+from clock import VirtualClock
+from power import SolarLights
+
+
+class TestVirtualClock(TestCase):
+    """Test the clock replays run on."""
+
+    def test_wait(self):
+        """Should move on by the timeout, unless woken."""
+        clock = VirtualClock(1000.)
+        event = threading.Event()
+        self.assertFalse(clock.wait(event, 30))
+        self.assertEqual(clock.time(), 1030.)
+        self.assertEqual(clock.monotonic(), 30.)
+        event.set()
+        self.assertTrue(clock.wait(event, 30))
+        self.assertEqual(clock.time(), 1030.)
+
+    def test_never_goes_back(self):
+        """Should ignore being set to an earlier time."""
+        clock = VirtualClock(1000.)
+        clock.set(900.)
+        self.assertEqual(clock.time(), 1000.)
+
+    def test_lights_follow_clock(self):
+        """Should work the display out from the lights' clock."""
+        clock = VirtualClock(datetime(2026, 6, 1, 12).timestamp())
+        sl = SolarLights(with_blinkt=False, with_solaredge=False, clock=clock)
+        sl.settings = replace(
+            sl.settings, DIM_DOWN_TIME_NIGHT='21:00:00',
+            BRIGHTEN_UP_TIME_MORNING='07:00:00',
+        )
+        self.assertFalse(sl.should_dim)
+        clock.set(datetime(2026, 6, 1, 22).timestamp())
+        self.assertTrue(sl.should_dim)
@@ -0,0 +1,129 @@
+import os
+import runpy
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+import configurator
+from power import SolarLights
+from renderers import Frame
+from settings import COLOURS, load_settings
+from shared import SharedSnapshotFile
+
+
+class TestLights(TestCase):
+    """Test the shared lights state behind /lights."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        path = os.path.join(tmp_dir.name, 'lights.snapshot')
+        self.shared = SharedSnapshotFile(path, n_pixels=8)
+        self.addCleanup(self.shared.close)
+        self.write_data(1.5)
+        for patcher in (
+            patch('power.SHARED_PATH', path),
+            patch.object(
+                SolarLights, 'is_daylight', new_callable=PropertyMock,
+                return_value=True
+            ),
+            patch.object(SolarLights, 'get_refresh_interval', return_value=60),
+            patch.object(configurator, 'LIGHTS', configurator.LightsState()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = configurator.app.test_client()
+
+    def write_data(self, production):
+        """Share a reading, as power.py would."""
+        data = {
+            'production': production, 'consumption': 0.7,
+            'grid': production - 0.7, 'direction': 'export',
+        }
+        self.shared.write(
+            Frame(bytes(24), bytes(24), 0.5, data, None), True, {}
+        )
+
+    def test_etag(self):
+        """Should answer 304 until the lights change."""
+        response = self.client.get('/lights')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data']['production'], 1.5)
+        etag = response.headers['ETag']
+
+        response = self.client.get('/lights', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.write_data(2.5)
+        response = self.client.get('/lights', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['data']['production'], 2.5)
+
+    def test_recompute_only_on_change(self):
+        """Should work the lights out once for many requests."""
+        with patch.object(
+            SolarLights, 'get_pixels', autospec=True,
+            side_effect=SolarLights.get_pixels
+        ) as get_pixels:
+            for _ in range(5):
+                self.client.get('/lights')
+            self.assertEqual(get_pixels.call_count, 1)
+
+    def test_wait(self):
+        """Should hand back the current lights to a new listener."""
+        lights = configurator.LIGHTS
+        lights.update()
+        body, etag = lights.wait(None, timeout=1)
+        self.assertEqual(etag, lights.etag)
+        self.assertEqual(lights.wait(etag, timeout=0.01), (body, etag))
+
+
+class TestConfigForm(TestCase):
+    """Test saving config.py from the form."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'config.py')
+        settings = load_settings(configurator.power_config.__file__)
+        with open(self.path, 'w') as fp:
+            for key, val in settings.to_config().items():
+                fp.write(f"{key} = {val!r}\n")
+            fp.write("API_KEY = 'key'\nSITE_ID = '1'\n")
+            fp.write("LED_COUNT = 60\nMODBUS_HOST = '192.168.1.20'\n")
+        self.form = {'API_KEY': 'key', 'SITE_ID': '1'}
+        for key, val in settings.to_config().items():
+            if key in COLOURS:
+                for part, value in zip('RGB', val):
+                    self.form[f'{key}-{part}'] = str(value)
+            else:
+                self.form[key] = str(val)
+        for patcher in (
+            patch.object(configurator.power_config, '__file__', self.path),
+            # Reloading would point __file__ back at the real config.
+            patch.object(configurator, 'reload'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = configurator.app.test_client()
+
+    def test_other_settings_kept(self):
+        """Should keep settings the form doesn't show."""
+        response = self.client.post('/', data=dict(self.form, CAPACITY='4.2'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('updated=1', response.headers['Location'])
+        values = runpy.run_path(self.path)
+        self.assertEqual(values['CAPACITY'], 4.2)
+        self.assertEqual(values['LED_COUNT'], 60)
+        self.assertEqual(values['MODBUS_HOST'], '192.168.1.20')
+
+    def test_invalid_not_saved(self):
+        """Should leave config.py alone if the form isn't valid."""
+        with open(self.path) as fp:
+            before = fp.read()
+        response = self.client.post('/', data=dict(self.form, CAPACITY='0'))
+        self.assertIn('error=', response.headers['Location'])
+        with open(self.path) as fp:
+            self.assertEqual(fp.read(), before)
@@ -0,0 +1,48 @@
+from datetime import datetime
+from unittest import TestCase
+
+from energy import EnergyIntegrator
+
+MIDNIGHT = datetime(2021, 6, 21).timestamp()
+HOUR = 60 * 60
+
+
+class TestEnergy(TestCase):
+    """Test the local day summary integrator."""
+
+    def test_trapezoid(self):
+        """Should integrate irregular readings, splitting grid flows."""
+        energy = EnergyIntegrator(max_gap_secs=4 * HOUR)
+        energy.add(MIDNIGHT + 9 * HOUR, 0., 1.)
+        energy.add(MIDNIGHT + 10 * HOUR, 2., 1.)
+        energy.add(MIDNIGHT + 12 * HOUR, 2., 1.)
+        summary = energy.get_summary()
+        self.assertEqual(summary['Production'], 5000.)
+        self.assertEqual(summary['Consumption'], 3000.)
+        self.assertEqual(summary['FeedIn'], 2500.)
+        self.assertEqual(summary['Purchased'], 500.)
+        self.assertEqual(summary['SelfConsumption'], 2500.)
+
+    def test_gaps_and_coverage(self):
+        """Should skip long gaps, and say how much of the day is covered."""
+        energy = EnergyIntegrator()
+        energy.add(MIDNIGHT, 1., 1.)
+        energy.add(MIDNIGHT + 3 * HOUR, 1., 1.)
+        energy.add(MIDNIGHT + 3.5 * HOUR, 1., 1.)
+        self.assertEqual(energy.get_summary()['Production'], 500.)
+        self.assertEqual(energy.get_coverage(MIDNIGHT + 4 * HOUR), 0.125)
+
+    def test_replay_is_idempotent(self):
+        """Should ignore readings it has already seen."""
+        energy = EnergyIntegrator()
+        rows = [(MIDNIGHT + ix * 60, 1., 0.5, 0.5) for ix in range(61)]
+        energy.replay(rows)
+        energy.replay(rows)
+        self.assertAlmostEqual(energy.get_summary()['Production'], 1000.)
+
+    def test_new_day(self):
+        """Should start again at local midnight."""
+        energy = EnergyIntegrator()
+        energy.add(MIDNIGHT - 60, 1., 1.)
+        energy.add(MIDNIGHT + 60, 1., 1.)
+        self.assertEqual(energy.get_summary()['Production'], 0.)
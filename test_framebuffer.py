@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from framebuffer import FrameBuffer, FrameTable
+
+
+class TestFrameBuffer(TestCase):
+    """Test drawing into the frame buffer."""
+
+    def test_spread_reversed(self):
+        """Should fill from the far end when reversed."""
+        frame = FrameBuffer(4)
+        frame.put(1, 2, 3)
+        frame.spread(3, [200, 100, 0], 0.5, reverse=True)
+        self.assertEqual(
+            frame.to_lists(),
+            [[1, 2, 3], [0, 0, 0], [100, 50, 0], [200, 100, 0]]
+        )
+
+    def test_drops_past_end_and_clamps(self):
+        """Should ignore pixels past the end and clamp values."""
+        frame = FrameBuffer(2)
+        frame.put(300, -5, 10.7)
+        frame.skip(1)
+        frame.put(9, 9, 9)
+        self.assertEqual(frame.to_lists(), [[255, 0, 10], [0, 0, 0]])
+        frame.clear()
+        self.assertEqual(frame.cursor, 0)
+        self.assertEqual(bytes(frame.data), bytes(6))
+
+
+class TestFrameTable(TestCase):
+    """Test the table of drawn frames."""
+
+    def test_resolution(self):
+        """Should take data that rounds the same as its own."""
+        table = FrameTable(4, resolution=0.01)
+        data = {'production': 1.5, 'direction': 'export'}
+        table.reset(data, None, True)
+        close = dict(data, production=1.502)
+        self.assertTrue(table.is_for(close, None, True))
+        self.assertIs(table.data, close)
+        for other in (
+            dict(data, production=1.52), dict(data, direction='import')
+        ):
+            self.assertFalse(table.is_for(other, None, True))
+        self.assertFalse(table.is_for(close, None, False))
+
+    def test_no_resolution(self):
+        """Should only take the very same data without a resolution."""
+        table = FrameTable(4)
+        data = {'production': 1.5}
+        table.reset(data, None, True)
+        self.assertTrue(table.is_for(data, None, True))
+        self.assertFalse(table.is_for(dict(data), None, True))
@@ -0,0 +1,49 @@
+from unittest import TestCase
+
+from framebuffer import FrameBuffer
+from layout import StripLayout, get_segment_sizes
+
+
+class TestSegments(TestCase):
+    """Test splitting a strip into segments."""
+
+    def test_sizes(self):
+        """Should keep proportions, add up, and give everything a pixel."""
+        self.assertEqual(get_segment_sizes([3, 1, 1, 3], 8), [3, 1, 1, 3])
+        self.assertEqual(get_segment_sizes([3, 1, 1, 3], 60), [23, 8, 7, 22])
+        self.assertEqual(get_segment_sizes([7, 1], 4), [3, 1])
+        self.assertEqual(sum(get_segment_sizes([3, 1, 1, 3], 301)), 301)
+
+
+class TestStripLayout(TestCase):
+    """Test drawing segments with NumPy."""
+
+    def test_fill_and_solid(self):
+        """Should fill bars and solid segments into the frame buffer."""
+        frame = FrameBuffer(16)
+        layout = StripLayout(frame)
+        layout.start(True)
+        layout.fill('production', [200, 100, 0], 0.5)
+        layout.solid('indicator', [0, 0, 255], 0.5)
+        layout.fill('consumption', [10, 10, 10], 1 / 6., reverse=True)
+        layout.write()
+        pixels = frame.to_lists()
+        self.assertEqual(
+            pixels[:6],
+            [[200, 100, 0]] * 3 + [[0, 0, 0]] * 3
+        )
+        self.assertEqual(pixels[6:8], [[0, 0, 127]] * 2)
+        self.assertEqual(pixels[8:10], [[0, 0, 0]] * 2)
+        self.assertEqual(pixels[-2:], [[0, 0, 0], [10, 10, 10]])
+
+    def test_split(self):
+        """Should show one colour for a share, then the other."""
+        frame = FrameBuffer(8)
+        layout = StripLayout(frame)
+        layout.start(False)
+        layout.split('summary', [0, 255, 0], [0, 0, 255], 0.5)
+        layout.write()
+        self.assertEqual(
+            frame.to_lists()[:7],
+            [[0, 255, 0]] * 3 + [[0, 127, 127]] + [[0, 0, 255]] * 3
+        )
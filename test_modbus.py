@@ -0,0 +1,68 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from modbus import (
+    INVERTER_BLOCK, ModbusError, ModbusSimulator, ModbusTcpClient,
+    SolarEdgeModbus,
+)
+from power import SolarLights
+
+
+class TestModbus(TestCase):
+    """Test reading SunSpec power values from the simulator."""
+
+    def setUp(self):
+        self.simulator = ModbusSimulator()
+        threading.Thread(
+            target=self.simulator.serve_forever, daemon=True
+        ).start()
+        self.port = self.simulator.server_address[1]
+        self.client = ModbusTcpClient('127.0.0.1', self.port)
+
+    def tearDown(self):
+        self.client.close()
+        self.simulator.shutdown()
+        self.simulator.server_close()
+
+    def test_exporting(self):
+        """Should scale registers and work out consumption from the meter."""
+        self.simulator.set_power(2500, 1700)
+        power = SolarEdgeModbus(self.client).read_power()
+        self.assertEqual(power['production'], 2.5)
+        self.assertAlmostEqual(power['consumption'], 0.8)
+        self.assertEqual(power['grid'], 1.7)
+
+    def test_importing(self):
+        """Should handle negative meter power and other scale factors."""
+        self.simulator.set_power(0, -1234, scale_factor=0)
+        power = SolarEdgeModbus(self.client).read_power()
+        self.assertEqual(power['production'], 0)
+        self.assertAlmostEqual(power['consumption'], 1.234)
+
+    def test_reuses_socket(self):
+        """Should make one request per block over one connection."""
+        reader = SolarEdgeModbus(self.client)
+        for _ in range(5):
+            reader.read_power()
+        self.assertEqual(self.simulator.connections, 1)
+        self.assertEqual(self.simulator.requests, 10)
+
+    def test_illegal_address(self):
+        """Should raise for registers the device doesn't have."""
+        with self.assertRaises(ModbusError):
+            self.client.read_holding_registers(INVERTER_BLOCK[0] - 10, 5)
+
+    def test_source_chain(self):
+        """Should be used first by get_live_power_with_status."""
+        self.simulator.set_power(1000, -500)
+        with patch('power.MODBUS_HOST', '127.0.0.1'), \
+                patch('power.MODBUS_PORT', self.port):
+            sl = SolarLights(
+                with_blinkt=False, with_modbus=True, with_solaredge=False
+            )
+            data = sl.get_live_power_with_status()
+            sl.cleanup()
+        self.assertEqual(data['direction'], 'import')
+        self.assertEqual(data['import'], 0.5)
+        self.assertEqual(data['consumption'], 1.5)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch, PropertyMock
+
+from multisite import MultiSiteController
+from power import API_QUERY_LIMIT, SolarLights
+
+
+class TestMultiSite(TestCase):
+    """Test running several displays together."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir.name)
+        almanac = patch.object(
+            SolarLights, 'almanac', new_callable=PropertyMock
+        )
+        self.almanac = almanac.start()
+        self.addCleanup(almanac.stop)
+
+    def get_controller(self):
+        """Return a controller for two displays of one site and another."""
+        defaults = {
+            'with_blinkt': False, 'with_solaredge': False, 'with_mock': True
+        }
+        return MultiSiteController.from_config([
+            {'name': 'a', 'site_id': '1', 'api_key': 'key'},
+            {'name': 'b', 'site_id': '1', 'api_key': 'key'},
+            {'name': 'c', 'site_id': '2', 'api_key': 'key'},
+        ], **defaults)
+
+    def test_sites_share_fetches_and_split_budget(self):
+        """Should fetch once per site, and split a shared key's budget."""
+        controller = self.get_controller()
+        a, b, c = controller.displays
+        self.assertEqual(controller.primaries, [a, c])
+        self.assertEqual(a.followers, [b])
+        self.assertEqual(a.api_limit, API_QUERY_LIMIT // 2)
+        self.assertIs(a._wake, c._wake)
+
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ):
+            a.set_next_update()
+            a.update_data()
+        self.assertIsNotNone(a._snapshot.data)
+        self.assertIs(b._snapshot, a._snapshot)
+        self.assertIsNone(c._snapshot.data)
+        self.assertEqual(b.stats['fetches'], 0)
+
+    def test_site_paths(self):
+        """Should keep config's site on the usual paths, others apart."""
+        controller = self.get_controller()
+        self.assertEqual(
+            controller.displays[2].get_site_path('cache.json'),
+            'cache-2.json'
+        )
+        self.assertEqual(
+            SolarLights(with_blinkt=False).get_site_path('cache.json'),
+            'cache.json'
+        )
@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from nowcast import Nowcaster, get_clear_sky
+
+
+class TestNowcast(TestCase):
+    """Test estimating readings between polls."""
+
+    def setUp(self):
+        # Sun climbs a degree a minute from the horizon.
+        self.nowcast = Nowcaster(lambda when: when / 60., max_production=3.)
+
+    def test_production_follows_sun(self):
+        """Should scale production by the clear-sky curve."""
+        self.nowcast.observe(1800, 1., 0.5)
+        production, consumption = self.nowcast.predict(2400)
+        self.assertAlmostEqual(
+            production, get_clear_sky(40) / get_clear_sky(30)
+        )
+        self.assertEqual(consumption, 0.5)
+
+    def test_no_production_at_night(self):
+        """Should drop production to nothing once the sun has set."""
+        self.assertEqual(Nowcaster(lambda when: -5).predict(0), (None, None))
+        nowcast = Nowcaster(lambda when: 10 - when / 60.)
+        nowcast.observe(0, 0.2, 0.5)
+        self.assertEqual(nowcast.predict(1200)[0], 0)
+
+    def test_scores_predictions(self):
+        """Should track error against the next real reading."""
+        self.nowcast.observe(1800, 1., 0.5)
+        self.nowcast.observe(2400, 1.5, 1.)
+        stats = self.nowcast.stats
+        self.assertEqual(stats['readings'], 2)
+        self.assertLess(
+            stats['production_error'], stats['persistence_production_error']
+        )
+        self.assertEqual(stats['consumption_error'], 0.5)
+        self.assertGreater(self.nowcast.predict(3000)[1], 1.)
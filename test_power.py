@@ -1,10 +1,18 @@
+import os
+import tempfile
+from dataclasses import replace
+from datetime import datetime
 from unittest import TestCase
-from unittest.mock import patch, PropertyMock
+from unittest.mock import Mock, patch, PropertyMock
 
 
 from parameterized import parameterized
 
-from power import SolarLights
+from cache import ResponseCache
+from clock import VirtualClock
+from power import NOWCAST_STEP_SECS, SolarLights, Snapshot
+from shared import SharedSnapshotFile
+from renderers import Output
 
 class TestPixels(TestCase):
     """Test pixel production."""
@@ -20,13 +28,261 @@ class TestPixels(TestCase):
     def test_multi_pixel_split(self, prod, result):
         """Should split into multi pixels."""
         pulse = PropertyMock(return_value=1)
-        with patch(
-            'power.PRODUCTION_COLOUR', [255, 255, 255]
+        sl = SolarLights()
+        sl.settings = replace(sl.settings, PRODUCTION_COLOUR=[255, 255, 255])
+        type(sl).pulse_percent = pulse
+        sl._data = {
+            'production': prod
+        }
+        pixels = sl.get_production_percent_pixels(multi=3)
+        self.assertEqual(pixels, result)
+
+
+class TestSnapshot(TestCase):
+    """Test data snapshots published for the render loop."""
+
+    def test_failed_fetch_keeps_last_data(self):
+        """Should keep rendering the previous data when sources fail."""
+        sl = SolarLights(with_blinkt=False, with_solaredge=False)
+        sl._snapshot = Snapshot({'production': 1}, None, None, None)
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ):
+            sl.set_next_update()
+            sl.update_data()
+            sl.apply_snapshot()
+        self.assertEqual(sl._data, {'production': 1})
+        self.assertEqual(sl.stats['fetch_failures'], 1)
+        self.assertIsNotNone(sl.stats['fetch_latency_secs'])
+
+    def test_warm_start_from_cache(self):
+        """Should render cached data at once and not fetch until stale."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(os.path.join(tmp_dir, 'cache.json'))
+            cache.put('power', {'production': 2}, 60)
+            sl = SolarLights(with_blinkt=False)
+            sl.cache = ResponseCache(cache.path)
+            sl.warm_start()
+            sl.apply_snapshot()
+        self.assertEqual(sl._data, {'production': 2})
+        self.assertGreater(sl._next_update, datetime.utcnow())
+
+    def test_cache_on_clock(self):
+        """Should save to the cache at the lights' clock's time."""
+        clock = VirtualClock(datetime(2026, 6, 1, 12).timestamp())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sl = SolarLights(with_blinkt=False, clock=clock)
+            sl.cache = ResponseCache(os.path.join(tmp_dir, 'cache.json'))
+            sl._data_source = 'solaredge'
+            sl.save_to_cache({'production': 2}, sl._snapshot)
+            sl.save_summary_to_cache({'production': 10})
+        for key, ttl in (
+            ('power', sl._refresh_secs), ('summary', 12 * 60 * 60)
+        ):
+            entry = sl.cache.entries[key]
+            self.assertEqual(entry['saved_at'], clock.time())
+            self.assertAlmostEqual(entry['expires_at'], clock.time() + ttl)
+
+
+class TestRefreshInterval(TestCase):
+    """Test spreading the API budget over the day."""
+
+    def test_own_api_limit(self):
+        """Should refresh about half as often on half the API limit."""
+        intervals = []
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ), patch.object(
+            SolarLights, 'get_daylight_seconds', return_value=12 * 60 * 60
+        ), patch.object(
+            SolarLights, 'get_on_seconds', return_value=18 * 60 * 60
+        ):
+            for api_limit in (300, 150):
+                sl = SolarLights(with_blinkt=False, api_limit=api_limit)
+                intervals.append(sl.get_refresh_interval())
+        self.assertEqual(intervals, [
+            int(12 * 60 * 60 / 285), int(12 * 60 * 60 / 142)
+        ])
+
+
+class TestDailyEvents(TestCase):
+    """Test the display changing with the daily timeline."""
+
+    def test_lit_at_on_time(self):
+        """Should light up as soon as the 'on' event fires."""
+        on_time = datetime(2026, 6, 1, 6).timestamp()
+        clock = VirtualClock(on_time - 60)
+        sl = SolarLights(
+            with_blinkt=False, with_solaredge=False, renderers=[],
+            clock=clock
+        )
+        sl._snapshot = Snapshot({
+            'production': 2, 'consumption': 1, 'grid': 1,
+            'direction': 'export', 'import': None, 'export': 1,
+        }, None, None, None)
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ):
+            sl.almanac_path = os.path.join(tmp_dir, 'almanac.json')
+            sl.start(fetch=False, watch=False, share=False)
+            while clock.time() < on_time:
+                sl.step()
+                self.assertFalse(any(sl.output.data))
+                clock.set(sl._timeline.get_next_time())
+            self.assertEqual(clock.time(), on_time)
+            sl.step()
+            sl.cleanup()
+        self.assertTrue(any(sl.output.data))
+
+
+class TestFrameTable(TestCase):
+    """Test reusing drawn animation frames."""
+
+    def test_frames_redrawn_for_new_data(self):
+        """Should draw each step once per data, fading to new data."""
+        sl = SolarLights(with_blinkt=False, with_solaredge=False)
+        sl._data = {
+            'production': 1, 'consumption': 1, 'grid': 0,
+            'direction': 'neutral',
+        }
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ), patch.object(
+            sl, 'draw_frame', wraps=sl.draw_frame
+        ) as draw_frame:
+            for _ in range(2 * sl._pulse_max_renders):
+                sl.update_frame()
+                sl._step += 1
+            self.assertEqual(draw_frame.call_count, sl._pulse_max_renders)
+            sl._data = dict(sl._data, production=0)
+            sl.update_frame()
+            self.assertEqual(
+                draw_frame.call_count, sl._pulse_max_renders + 1
+            )
+        self.assertIsNotNone(sl._fade_from)
+
+    def test_table_kept_over_nowcast_step(self):
+        """Should keep the frames when a nowcast step changes nothing."""
+        clock = VirtualClock(1000 * NOWCAST_STEP_SECS)
+        sl = SolarLights(
+            with_blinkt=False, with_solaredge=False, with_nowcast=True,
+            clock=clock
+        )
+        sl._snapshot = Snapshot({
+            'production': 1, 'consumption': 1, 'grid': 0,
+            'direction': 'neutral',
+        }, None, None, None)
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ), patch.object(sl.nowcast, 'predict', return_value=(1.5, 0.5)):
+            sl.apply_snapshot()
+            sl.update_frame()
+            data = sl._data
+            clock.advance(NOWCAST_STEP_SECS)
+            sl.apply_snapshot()
+            sl.update_frame()
+        self.assertIs(sl._data, data)
+        self.assertIs(sl._frame_table.data, data)
+        self.assertIsNone(sl._fade_from)
+
+    def test_table_kept_while_nowcast_creeps(self):
+        """Should only redraw when the estimate moves a visible amount."""
+        clock = VirtualClock(1000 * NOWCAST_STEP_SECS)
+        sl = SolarLights(
+            with_blinkt=False, with_solaredge=False, with_nowcast=True,
+            clock=clock
+        )
+        sl._snapshot = Snapshot({
+            'production': 1, 'consumption': 1, 'grid': 0,
+            'direction': 'neutral',
+        }, None, None, None)
+        estimates = [(1.5 + 0.0005 * step, 0.5) for step in range(30)]
+        with patch.object(
+            SolarLights, 'is_daylight', new_callable=PropertyMock,
+            return_value=True
+        ), patch.object(
+            sl.nowcast, 'predict', side_effect=estimates + [(2., 0.5)]
+        ), patch.object(
+            sl, 'draw_frame', wraps=sl.draw_frame
+        ) as draw_frame:
+            for _ in estimates:
+                sl.apply_snapshot()
+                sl.update_frame()
+                clock.advance(NOWCAST_STEP_SECS)
+            self.assertLessEqual(draw_frame.call_count, 3)
+            sl.apply_snapshot()
+            sl.update_frame()
+        self.assertEqual(sl._frame_table.data['production'], 2.)
+        self.assertIsNotNone(sl._fade_from)
+
+
+class TestRender(TestCase):
+    """Test pushing frames to renderers."""
+
+    def test_identical_frames_skipped(self):
+        """Should only push frames that differ from the last one shown."""
+        sl = SolarLights(with_blinkt=False, with_solaredge=False)
+        renderer = Mock(name='renderer', threaded=False, fps=None)
+        renderer.name = 'test'
+        sl._outputs = [Output(renderer)]
+        with patch.multiple(
+            SolarLights,
+            is_daylight=PropertyMock(return_value=True),
+            should_dim=PropertyMock(return_value=False),
+            should_off=PropertyMock(return_value=False),
+        ):
+            sl.render()
+            sl.render()
+            sl.frame.set(0, 9, 9, 9)
+            sl.render()
+            with patch.object(
+                SolarLights, 'should_off', new_callable=PropertyMock,
+                return_value=True
+            ):
+                sl.render()
+                sl.frame.set(0, 50, 50, 50)
+                sl.render()
+        self.assertEqual(renderer.show.call_count, 3)
+        self.assertEqual(renderer.setup.call_count, 1)
+        stats = sl._outputs[0].stats
+        self.assertEqual((stats['pushed'], stats['skipped']), (3, 2))
+
+    def test_new_data_shared_while_off(self):
+        """Should share new readings even when the output stays dark."""
+        sl = SolarLights(with_blinkt=False, with_solaredge=False)
+        sl._outputs = []
+        data = {
+            'production': 1., 'consumption': 1., 'grid': 0.,
+            'direction': 'neutral', 'import': None, 'export': None,
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.multiple(
+            SolarLights,
+            is_daylight=PropertyMock(return_value=False),
+            should_off=PropertyMock(return_value=True),
         ):
-            sl = SolarLights()
-            type(sl).pulse_percent = pulse
-            sl._data = {
-                'production': prod
+            path = os.path.join(tmp_dir, 'lights.snapshot')
+            sl.shared = SharedSnapshotFile(path, len(sl.frame))
+            reader = SharedSnapshotFile(path)
+            sl.publish(Snapshot(data, None, None, None))
+            sl.apply_snapshot()
+            sl.render()
+            version = reader.get_version()
+            data = {
+                'production': 0., 'consumption': 0.5, 'grid': 0.5,
+                'direction': 'import', 'import': 0.5, 'export': None,
             }
-            pixels = sl.get_production_percent_pixels(multi=3)
-            self.assertEqual(pixels, result)
+            sl.publish(Snapshot(data, {'Production': 9000.}, None, None))
+            sl.apply_snapshot()
+            sl.render()
+            shared = reader.read()
+            reader.close()
+            sl.shared.close()
+        self.assertFalse(any(shared.output))
+        self.assertEqual(shared.version, version + 1)
+        self.assertEqual(shared.data, data)
+        self.assertEqual(shared.summary['Production'], 9000.)
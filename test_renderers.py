@@ -0,0 +1,107 @@
+from threading import Event
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from renderers import (
+    ENTRY_POINT_GROUP, Output, RenderMethodFailed, get_renderer_class
+)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 100.
+
+    def __call__(self):
+        return self.now
+
+
+def get_renderer(fps=None):
+    """Return a mock render loop renderer."""
+    renderer = Mock(threaded=False, fps=fps)
+    renderer.name = 'test'
+    return renderer
+
+
+class TestOutput(TestCase):
+    """Test feeding frames to a renderer."""
+
+    def test_rate_limited_keeps_latest(self):
+        """Should show at most fps frames a second, dropping stale ones."""
+        clock = FakeClock()
+        renderer = get_renderer(fps=2)
+        output = Output(renderer, clock=clock)
+        for frame in ('a', 'b', 'c'):
+            output.submit(frame)
+            output.update()
+            clock.now += 0.2
+        output.update()
+        self.assertEqual(
+            [call.args[0] for call in renderer.show.call_args_list],
+            ['a', 'c']
+        )
+        self.assertEqual(output.stats['dropped'], 1)
+
+    def test_failures_backed_off(self):
+        """Should retry a failing renderer less and less often."""
+        clock = FakeClock()
+        renderer = get_renderer()
+        renderer.setup.side_effect = RenderMethodFailed("No blinkt!")
+        output = Output(renderer, backoff_secs=1, clock=clock)
+        output.submit('a')
+        for _ in range(8):
+            output.update()
+            clock.now += 1
+        # Tried at 0, 1, 3 and 7 seconds.
+        self.assertEqual(renderer.setup.call_count, 4)
+        self.assertEqual(output.stats['backoff_secs'], 8)
+
+        renderer.setup.side_effect = None
+        clock.now += 8
+        output.update()
+        renderer.show.assert_called_once_with('a')
+        self.assertEqual(output.stats['backoff_secs'], 0)
+
+    def test_threaded(self):
+        """Should show frames on the renderer's own thread."""
+        renderer = get_renderer()
+        renderer.threaded = True
+        shown = Event()
+        renderer.show.side_effect = lambda frame: shown.set()
+        output = Output(renderer)
+        output.start()
+        output.submit('a')
+        self.assertTrue(shown.wait(1))
+        output.close()
+        renderer.show.assert_called_once_with('a')
+        renderer.close.assert_called_once_with()
+
+
+class TestGetRendererClass(TestCase):
+    """Test finding plugin renderers."""
+
+    def get_entry_point(self):
+        entry_point = Mock()
+        entry_point.name = 'mqtt'
+        return entry_point
+
+    def test_select(self):
+        """Should find plugins where entry points have select (3.10+)."""
+        entry_point = self.get_entry_point()
+        eps = Mock()
+        eps.select.return_value = [entry_point]
+        with patch('importlib.metadata.entry_points', return_value=eps):
+            cls = get_renderer_class('mqtt')
+        eps.select.assert_called_once_with(group=ENTRY_POINT_GROUP)
+        self.assertIs(cls, entry_point.load.return_value)
+
+    def test_dict(self):
+        """Should find plugins where entry points are a dict (3.8, 3.9)."""
+        entry_point = self.get_entry_point()
+        eps = {ENTRY_POINT_GROUP: [entry_point]}
+        with patch('importlib.metadata.entry_points', return_value=eps):
+            self.assertIs(
+                get_renderer_class('mqtt'), entry_point.load.return_value
+            )
+            self.assertRaises(KeyError, get_renderer_class, 'other')
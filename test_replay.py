@@ -0,0 +1,105 @@
+import math
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from power import ALMANAC_PATH
+from replay import Replay, read_csv
+
+START = datetime(2026, 6, 1).timestamp()
+
+
+def get_file_state(path):
+    """Return a file's size and modified time, or None if it's missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class TestReplay(TestCase):
+    """Test replaying readings on a virtual clock."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        # The lights' own sun times table, which a replay mustn't touch.
+        self.almanac_path = os.path.abspath(ALMANAC_PATH)
+        os.chdir(tmp_dir.name)
+        # A sunny day, a reading every five minutes.
+        with open('readings.csv', 'w') as fp:
+            fp.write('time,production,consumption\n')
+            for secs in range(0, 24 * 60 * 60, 300):
+                hour = secs / 3600.
+                production = max(math.sin(math.pi * (hour - 5) / 16), 0)
+                fp.write(f'{START + secs},{2.5 * production:.3f},0.5\n')
+
+    def test_day(self):
+        """Should run a day through the lights within the API budget."""
+        replay = Replay(read_csv('readings.csv'), fps=0.01, api_limit=300)
+        almanac = get_file_state(self.almanac_path)
+        report = replay.run()
+
+        self.assertGreater(report['replayed_secs'], 23 * 60 * 60)
+        self.assertEqual(sum(report['api_calls'].values()), len(
+            replay.client.calls
+        ))
+        for calls in report['api_calls'].values():
+            self.assertLessEqual(calls, 300)
+        self.assertEqual(
+            set(report['stages']), {'fetch', 'schedule', 'draw', 'render'}
+        )
+        self.assertGreater(report['stages']['fetch']['calls'], 100)
+        self.assertEqual(
+            os.path.dirname(replay.lights.almanac_path), replay._tmp_dir.name
+        )
+        self.assertEqual(get_file_state(self.almanac_path), almanac)
+
+        noon = datetime(2026, 6, 1, 12).timestamp()
+        shown = [
+            frame for when, frame in replay.recorder.frames
+            if abs(when - noon) < 60 * 60
+        ]
+        self.assertTrue(shown)
+        self.assertTrue(all(any(frame.pixels) for frame in shown))
+
+    def test_realistic_fps(self):
+        """Should move the clock on every frame at a real frame rate."""
+        fps = 20
+        readings = read_csv('readings.csv')
+        noon = datetime(2026, 6, 1, 12).timestamp()
+        start = [row[0] for row in readings].index(noon)
+        replay = Replay(readings[start:start + 2], fps=fps)
+        secs = replay.end - replay.start
+        step = replay.lights.step
+        steps = []
+
+        def counted_step():
+            steps.append(replay.clock.time())
+            if len(steps) > 2 * fps * secs:
+                raise AssertionError("The clock isn't moving on.")
+            return step()
+
+        replay.lights.step = counted_step
+        report = replay.run()
+        self.assertEqual(report['replayed_secs'], secs)
+        self.assertGreater(len(steps), 0.9 * fps * secs)
+        self.assertEqual(len(set(steps)), len(steps))
+
+    def test_write(self):
+        """Should write out the frames shown and the calls made."""
+        replay = Replay(read_csv('readings.csv')[:48], fps=0.01)
+        replay.run()
+        replay.write_frames('frames.csv')
+        replay.write_calls('calls.csv')
+        with open('calls.csv') as fp:
+            lines = fp.read().splitlines()
+        self.assertEqual(lines[0], 'time,kind')
+        self.assertEqual(len(lines), len(replay.client.calls) + 1)
+        with open('frames.csv') as fp:
+            self.assertEqual(
+                len(fp.read().splitlines()), len(replay.recorder.frames) + 1
+            )
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from dataclasses import FrozenInstanceError, replace
+from unittest import TestCase
+from unittest.mock import Mock
+
+from power import SolarLights
+from settings import (
+    ConfigWatcher, SettingsError, compile_settings, load_settings
+)
+
+CONFIG = """
+IMPORT_COLOUR = [255, 0, 0]
+EXPORT_COLOUR = [0, 0, 255]
+NEUTRAL_COLOUR = [0, 255, 0]
+PRODUCTION_COLOUR = [255, 255, 255]
+CONSUMPTION_COLOUR = [255, 0, 255]
+REFRESH_RATE_SECS = 0.05
+CAPACITY = 2.97
+MAX_IDEAL_POWER = 3.0
+MAX_IDEAL_CONSUMPTION = 10.0
+DIM_DOWN_TIME_NIGHT = '21:00:00'
+BRIGHTEN_UP_TIME_MORNING = '7:00:00'
+OFF_TIMES = 1.0
+OFF_TIME_NIGHT = '23:00:00'
+ON_TIME_MORNING = '06:00:00'
+"""
+
+
+class TestSettings(TestCase):
+    """Test compiling and reloading settings."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'config.py')
+        self.write(CONFIG)
+
+    def write(self, text):
+        """Write a config file, with a new mtime."""
+        with open(self.path, 'w') as fp:
+            fp.write(text)
+        stat = os.stat(self.path)
+        os.utime(
+            self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9)
+        )
+
+    def test_load(self):
+        """Should compile colours to tuples and pad times."""
+        settings = load_settings(self.path)
+        self.assertEqual(settings.IMPORT_COLOUR, (255, 0, 0))
+        self.assertEqual(settings.BRIGHTEN_UP_TIME_MORNING, '07:00:00')
+        self.assertEqual(settings.CAPACITY, 2.97)
+        self.assertIs(settings.OFF_TIMES, True)
+
+    def test_derived(self):
+        """Should parse times to seconds since midnight once."""
+        settings = load_settings(self.path)
+        self.assertEqual(settings.dim_secs, 21 * 60 * 60)
+        self.assertEqual(settings.brighten_secs, 7 * 60 * 60)
+        self.assertEqual(settings.on_seconds, 17 * 60 * 60)
+        settings = replace(settings, ON_TIME_MORNING='06:30:00')
+        self.assertEqual(settings.on_seconds, 16.5 * 60 * 60)
+        with self.assertRaises(FrozenInstanceError):
+            settings.CAPACITY = 1
+        with self.assertRaises(SettingsError):
+            replace(settings, DIM_DOWN_TIME_NIGHT='late')
+
+    def test_invalid(self):
+        """Should refuse bad colours, amounts, times and missing values."""
+        values = load_settings(self.path).to_config()
+        for name, value in (
+            ('IMPORT_COLOUR', [256, 0, 0]),
+            ('EXPORT_COLOUR', [0, 0]),
+            ('CAPACITY', 0),
+            ('MAX_IDEAL_POWER', 'lots'),
+            ('OFF_TIME_NIGHT', '25:00:00'),
+        ):
+            with self.assertRaises(SettingsError):
+                compile_settings(dict(values, **{name: value}))
+        del values['CAPACITY']
+        with self.assertRaises(SettingsError):
+            compile_settings(values)
+
+    def test_watcher(self):
+        """Should pass on changed settings, and keep the old if invalid."""
+        on_change = Mock()
+        watcher = ConfigWatcher(self.path, on_change)
+        self.assertFalse(watcher.check())
+
+        self.write(CONFIG.replace('2.97', '4.0'))
+        self.assertTrue(watcher.check())
+        self.assertEqual(on_change.call_args[0][0].CAPACITY, 4.0)
+
+        self.write(CONFIG.replace('2.97', '-1'))
+        self.assertFalse(watcher.check())
+        self.write(CONFIG + 'oops(')
+        self.assertFalse(watcher.check())
+        self.assertEqual(on_change.call_count, 1)
+        self.assertFalse(watcher.check(force=True))
+
+    def test_lights_swap_settings(self):
+        """Should redraw with new settings on the next step."""
+        sl = SolarLights(with_blinkt=False, with_solaredge=False)
+        sl._frame_table.reset({'production': 1}, None, True)
+        sl._frame_table.frames[0] = b'drawn'
+        new = replace(load_settings(self.path), REFRESH_RATE_SECS=2.)
+        sl.set_settings(new)
+        self.assertTrue(sl._wake.is_set())
+        self.assertIsNot(sl.settings, new)
+
+        sl.apply_settings(new)
+        self.assertIs(sl.settings, new)
+        self.assertEqual(sl.animator.step_secs, 2.)
+        self.assertEqual(sl.animator.frame_secs, 2.)
+        self.assertIsNone(sl._frame_table.frames[0])
+        self.assertIsNotNone(sl._fade_from)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from renderers import Frame
+from shared import HEADER, SharedSnapshotFile
+
+DATA = {
+    'production': 1.5, 'consumption': 0.7, 'grid': 0.8,
+    'direction': 'export', 'import': None, 'export': 0.8,
+}
+SUMMARY = {
+    'Production': 9000., 'Consumption': 4000., 'FeedIn': 6000.,
+    'Purchased': 1000., 'SelfConsumption': 3000.,
+}
+
+
+class TestSharedSnapshot(TestCase):
+    """Test sharing snapshots through a memory-mapped file."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'lights.snapshot')
+        self.writer = SharedSnapshotFile(self.path, n_pixels=2)
+        self.reader = SharedSnapshotFile(self.path)
+        self.addCleanup(self.writer.close)
+        self.addCleanup(self.reader.close)
+
+    def test_round_trip(self):
+        """Should read back what was written."""
+        self.assertIsNone(self.reader.read())
+        frame = Frame(
+            bytes([1, 2, 3, 4, 5, 6]), bytes([0, 1, 1, 2, 2, 3]), 0.5, DATA,
+            SUMMARY
+        )
+        self.writer.write(frame, True, {'fps': 20., 'frames': 7})
+
+        snapshot = self.reader.read()
+        self.assertEqual(snapshot.data, DATA)
+        self.assertEqual(snapshot.summary, SUMMARY)
+        self.assertEqual(snapshot.frame, bytes([1, 2, 3, 4, 5, 6]))
+        self.assertEqual(snapshot.output, bytes([0, 1, 1, 2, 2, 3]))
+        self.assertTrue(snapshot.daylight)
+        self.assertEqual(snapshot.brightness, 0.5)
+        self.assertEqual(snapshot.stats['fps'], 20.)
+        self.assertEqual(snapshot.stats['frames'], 7)
+        self.assertIsNone(snapshot.stats['fetched_at'])
+
+    def test_version(self):
+        """Should only move the version on for new data."""
+        frame = Frame(bytes(6), bytes(6), 0.5, DATA, None)
+        self.writer.write(frame, True, {})
+        version = self.reader.get_version()
+        self.writer.write(frame._replace(pixels=bytes([9] * 6)), True, {})
+        self.assertEqual(self.reader.get_version(), version)
+        self.assertIsNone(self.reader.read().summary)
+
+        self.writer.write(frame._replace(data=None), False, {})
+        self.assertEqual(self.reader.get_version(), version + 1)
+        self.assertIsNone(self.reader.read().data)
+
+    def test_torn_read(self):
+        """Should not hand back a snapshot while it's being written."""
+        self.writer.write(Frame(bytes(6), bytes(6), 0.5, DATA, None), True, {})
+        seq, version = HEADER.unpack_from(self.writer._map)
+        HEADER.pack_into(self.writer._map, 0, seq + 1, version)
+        self.assertIsNone(self.reader.read())
+
+    def test_writer_restart(self):
+        """Should carry on the version, and grow the file for more pixels."""
+        self.writer.write(Frame(bytes(6), bytes(6), 0.5, DATA, None), True, {})
+        version = self.reader.get_version()
+        self.writer.close()
+
+        writer = SharedSnapshotFile(self.path, n_pixels=4)
+        self.addCleanup(writer.close)
+        writer.write(Frame(
+            bytes(range(12)), bytes(range(12, 24)), 0.5, DATA, None
+        ), True, {})
+        snapshot = self.reader.read()
+        self.assertEqual(snapshot.version, version + 1)
+        self.assertEqual(snapshot.frame, bytes(range(12)))
+        self.assertEqual(snapshot.output, bytes(range(12, 24)))
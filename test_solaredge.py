@@ -0,0 +1,93 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from unittest.mock import Mock
+
+from solaredge import SolarEdgeClient, SolarEdgeError
+
+
+class FakeSolarEdge(BaseHTTPRequestHandler):
+    """Serve gzipped JSON over keep-alive, failing when told to."""
+
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    delay_secs = 0
+
+    def do_GET(self):
+        time.sleep(self.delay_secs)
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = gzip.compress(json.dumps({'path': self.path}).encode())
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestClient(TestCase):
+    """Test the pooled API client."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSolarEdge)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = SolarEdgeClient(
+            base_url=f"http://127.0.0.1:{self.server.server_port}/",
+            backoff_secs=0.01,
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        FakeSolarEdge.statuses = []
+        FakeSolarEdge.delay_secs = 0
+
+    def test_reuses_connection(self):
+        """Should only open one connection for repeated requests."""
+        for _ in range(3):
+            data = self.client.get_current_power_flow('1', 'key')
+        self.assertTrue(data['path'].startswith('/site/1/currentPowerFlow'))
+        self.assertEqual(self.client.stats['requests'], 3)
+        self.assertEqual(self.client.stats['new_connections'], 1)
+        self.assertGreater(self.client.stats['bytes'], 0)
+
+    def test_retries_server_errors(self):
+        """Should retry a 503 and then succeed."""
+        FakeSolarEdge.statuses = [503]
+        self.client.get_json('site/1/overview')
+        self.assertEqual(
+            [stat.status for stat in self.client.history], [503, 200]
+        )
+
+    def test_gives_up_on_client_errors(self):
+        """Should not retry a 403."""
+        FakeSolarEdge.statuses = [403]
+        with self.assertRaises(SolarEdgeError):
+            self.client.get_json('site/1/overview')
+        self.assertEqual(self.client.stats['requests'], 1)
+
+    def test_gives_up_on_rate_limit(self):
+        """Should not retry a 429, which would only spend more calls."""
+        FakeSolarEdge.statuses = [429]
+        with self.assertRaises(SolarEdgeError):
+            self.client.get_json('site/1/overview')
+        self.assertEqual(self.client.stats['requests'], 1)
+        self.assertEqual(self.client.stats['failures'], 1)
+
+    def test_records_timeouts(self):
+        """Should record requests that time out in the ledger."""
+        FakeSolarEdge.delay_secs = 0.2
+        self.client.timeout = (1, 0.05)
+        self.client.retries = 1
+        ledger = Mock()
+        with self.assertRaises(SolarEdgeError):
+            self.client.get_current_power_flow('1', 'key', ledger=ledger)
+        self.assertEqual(ledger.record.call_count, 2)
+        ledger.record.assert_called_with('currentPowerFlow.json')
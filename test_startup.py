@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, skipUnless
+
+# Generous, so a slow Pi or busy CI box passes; a heavy import won't.
+MAX_IMPORT_SECS = 1.5
+MAX_IMPORT_RSS_KB = 40 * 1024
+# From the process starting to the first frame, as --startup-profile does
+# it; the first start also works out a year of sun times.
+MAX_FIRST_FRAME_SECS = 3.
+# Only needed once a source or renderer that uses them is turned on.
+LAZY_MODULES = ('requests', 'astral', 'numpy', 'pygame', 'blinkt', 'flask')
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_report(code, cwd=ROOT):
+    """Return the startup report printed last by running code afresh."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT] + sys.path))
+    output = subprocess.run(
+        [sys.executable, '-c', code], env=env, check=True,
+        capture_output=True, text=True, cwd=cwd,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+@skipUnless(os.path.exists('/proc/self/stat'), "needs /proc")
+class TestStartup(TestCase):
+    """Test importing power.py stays quick and small."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.report = get_report(
+            "import json, power, startup; "
+            "print(json.dumps(startup.get_report()))"
+        )
+
+    def test_lazy_modules(self):
+        """Should not import what only some setups need."""
+        loaded = self.report['heavy_modules']
+        self.assertEqual(
+            [name for name in LAZY_MODULES if name in loaded], []
+        )
+
+    def test_time(self):
+        """Should import within the time budget."""
+        self.assertLess(self.report['process_secs'], MAX_IMPORT_SECS)
+
+    def test_rss(self):
+        """Should import within the memory budget."""
+        self.assertLess(self.report['rss_kb'], MAX_IMPORT_RSS_KB)
+
+
+@skipUnless(os.path.exists('/proc/self/stat'), "needs /proc")
+class TestFirstFrame(TestCase):
+    """Test the lights show their first frame quickly."""
+
+    def test_time(self):
+        """Should show the first frame within the budget, cold or warm."""
+        code = (
+            "import json, power, startup; "
+            "lights = power.SolarLights("
+            "with_blinkt=False, with_cache=True, with_history=True, "
+            "with_nowcast=True); "
+            "lights.show_first_frame(); "
+            "print(json.dumps(startup.get_report())); "
+            "lights.cleanup()"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # The first start has no almanac, cache or history yet.
+            for start in ('cold', 'warm'):
+                with self.subTest(start):
+                    report = get_report(code, cwd=tmp_dir)
+                    self.assertLess(
+                        report['process_secs'], MAX_FIRST_FRAME_SECS
+                    )
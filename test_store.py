@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from store import DAY_SECS, ReadingStore
+
+START = 19000 * DAY_SECS
+
+
+class TestStore(TestCase):
+    """Test the reading history store."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = ReadingStore(
+            os.path.join(self.dir.name, 'history.db'), flush_every=10
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def add(self, when, production, consumption):
+        direction = 'export' if production > consumption else 'import'
+        self.store.append({
+            'production': production,
+            'consumption': consumption,
+            'grid': abs(production - consumption),
+            'direction': direction,
+        }, when=when)
+
+    def test_rollups(self):
+        """Should average readings into 15 minute and daily buckets."""
+        for minute in range(30):
+            self.add(START + minute * 60, minute < 15 and 2. or 4., 1.)
+        self.store.flush()
+
+        raw = self.store.get_range(START, START + DAY_SECS)
+        self.assertEqual(len(raw), 30)
+        self.assertEqual(raw[0], (START, 2., 1., 1.))
+
+        quarters = self.store.get_range(START, START + DAY_SECS, '15m')
+        self.assertEqual([row[1] for row in quarters], [2., 4.])
+        self.assertEqual(quarters[0][-1], 15)
+
+        days = self.store.get_range(START, START + DAY_SECS, 'day')
+        self.assertEqual(days, [(START, 3., 1., 2., 4., 1., 30)])
+
+    def test_pending_readings_in_range(self):
+        """Should include readings not yet written to disk."""
+        self.add(START, 1., 2.)
+        self.assertEqual(
+            self.store.get_range(START, START + 1), [(START, 1., 2., -1.)]
+        )
+
+    def test_retention(self):
+        """Should drop raw readings older than two weeks."""
+        self.add(START, 1., 1.)
+        self.store.flush(now=START)
+        self.add(START + 15 * DAY_SECS, 1., 1.)
+        self.store.flush(now=START + 15 * DAY_SECS)
+        self.assertEqual(len(self.store.get_range(0, START * 2)), 1)
+        self.assertEqual(len(self.store.get_range(0, START * 2, 'day')), 2)
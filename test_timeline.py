@@ -0,0 +1,39 @@
+from datetime import datetime
+from unittest import TestCase
+
+from timeline import Timeline, get_day_secs, get_next_daily, parse_time
+
+
+class TestTimeline(TestCase):
+    """Test the event timeline."""
+
+    def test_parse_time(self):
+        """Should turn config times into seconds since midnight."""
+        self.assertEqual(parse_time('23:30:15'), 84615)
+
+    def test_day_secs(self):
+        """Should give the local time of day in seconds."""
+        now = datetime(2021, 6, 21, 23, 30, 15).timestamp()
+        self.assertEqual(get_day_secs(now), 84615)
+
+    def test_next_daily(self):
+        """Should find the next occurrence, today or tomorrow."""
+        now = datetime(2021, 6, 21, 12).timestamp()
+        self.assertEqual(
+            get_next_daily(now, parse_time('13:00:00')),
+            datetime(2021, 6, 21, 13).timestamp()
+        )
+        self.assertEqual(
+            get_next_daily(now, parse_time('06:00:00')),
+            datetime(2021, 6, 22, 6).timestamp()
+        )
+
+    def test_pop_due(self):
+        """Should hand back due events in time order."""
+        timeline = Timeline()
+        timeline.add(30, 'off')
+        timeline.add(10, 'frame')
+        timeline.add(20, 'dim')
+        self.assertEqual(timeline.pop_due(25), ['frame', 'dim'])
+        self.assertTrue(timeline.has('off'))
+        self.assertEqual(timeline.get_next_time(), 30)
@@ -0,0 +1,63 @@
+"""A heap of upcoming events, so the render loop can sleep until the next."""
+import heapq
+import itertools
+from datetime import datetime, timedelta
+
+
+def parse_time(value):
+    """Return seconds since midnight for an "HH:MM:SS" string."""
+    hours, minutes, seconds = [int(part) for part in value.split(':')]
+    return hours * 60 * 60 + minutes * 60 + seconds
+
+
+def get_day_secs(now):
+    """Return seconds since local midnight at an epoch time."""
+    moment = datetime.fromtimestamp(now)
+    return moment.hour * 60 * 60 + moment.minute * 60 + moment.second
+
+
+def get_next_daily(now, secs):
+    """Return the next epoch time (after now) that's secs past local midnight.
+
+    Works from calendar dates rather than adding 86400, so DST changes
+    don't shift the time of day.
+    """
+    today = datetime.fromtimestamp(now).date()
+    for days in range(3):
+        when = datetime.combine(
+            today + timedelta(days=days), datetime.min.time()
+        ) + timedelta(seconds=secs)
+        if when.timestamp() > now:
+            return when.timestamp()
+
+
+class Timeline:
+    """Events ordered by time; equal times come out in the order added."""
+
+    def __init__(self):
+        """Set up."""
+        self._events = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        """Return the number of pending events."""
+        return len(self._events)
+
+    def add(self, when, kind):
+        """Schedule an event of some kind at epoch time when."""
+        heapq.heappush(self._events, (when, next(self._counter), kind))
+
+    def has(self, kind):
+        """Return True if an event of this kind is pending."""
+        return any(event[2] == kind for event in self._events)
+
+    def get_next_time(self):
+        """Return when the next event is, or None."""
+        return self._events[0][0] if self._events else None
+
+    def pop_due(self, now):
+        """Remove and return the kinds of all events due by now."""
+        due = []
+        while self._events and self._events[0][0] <= now:
+            due.append(heapq.heappop(self._events)[2])
+        return due